@@ -0,0 +1,104 @@
+"""
+Compares a brute force haversine scan of every place with the grid
+index of the places (src/indexes/geo.py), for radius searches around
+random places
+
+    python -m benchmarks.geo_search [number of places]
+"""
+
+import random
+import sys
+import timeit
+import uuid
+from types import SimpleNamespace
+from src.indexes.geo import PlaceGrid, haversine_km
+from src.persistence.memory import MemoryRepository
+
+RADIUS_KM = 5.0
+SEARCHES = 20
+
+
+class EmptyRepository(MemoryRepository):
+    """MemoryRepository without the dummy data"""
+
+    def reload(self) -> None:
+        """Starts empty"""
+
+
+def make_places(count: int) -> list[SimpleNamespace]:
+    """Builds places spread around a hundred cities of the world"""
+    random.seed(0)
+    cities = [
+        (random.uniform(-60.0, 70.0), random.uniform(-180.0, 180.0))
+        for _ in range(100)
+    ]
+    places = []
+
+    for _ in range(count):
+        lat, lon = random.choice(cities)
+        places.append(
+            SimpleNamespace(
+                id=str(uuid.uuid4()),
+                latitude=lat + random.gauss(0, 0.2),
+                longitude=(lon + random.gauss(0, 0.2) + 180) % 360 - 180,
+            )
+        )
+
+    return places
+
+
+def scan(places: list, lat: float, lon: float) -> list[tuple[float, str]]:
+    """Measures the distance to every place"""
+    return sorted(
+        (distance, place.id)
+        for place in places
+        if (
+            distance := haversine_km(lat, lon, place.latitude, place.longitude)
+        ) <= RADIUS_KM
+    )
+
+
+def best_ms(func, number: int) -> float:
+    """Returns the best time of a call, in milliseconds"""
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e3
+
+
+def main() -> None:
+    """Runs the benchmark and prints the results"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    places = make_places(count)
+    grid = PlaceGrid(EmptyRepository())
+
+    for place in places:
+        grid.add(place)
+
+    centers = [
+        (place.latitude, place.longitude)
+        for place in random.sample(places, SEARCHES)
+    ]
+    matches = 0
+
+    for lat, lon in centers[:3]:
+        total, nearest = grid.nearby(lat, lon, RADIUS_KM)
+        assert nearest == scan(places, lat, lon)
+        matches += total
+
+    print(
+        f"{count} places, {RADIUS_KM} km radius, "
+        f"{matches // 3} matches on average"
+    )
+    print(
+        f"{'brute force':<20}"
+        f"{best_ms(lambda: scan(places, *centers[0]), 1):10.2f} ms"
+    )
+
+    def searches():
+        """Runs a search around every center"""
+        for lat, lon in centers:
+            grid.nearby(lat, lon, RADIUS_KM, 0, 100)
+
+    print(f"{'grid':<20}{best_ms(searches, 1) / SEARCHES:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Reports the memory used per review by the in-memory repositories, with
+the plain and the compact (slotted) representation of the objects
+
+The reviews are loaded the way FileRepository.reload does, from JSON,
+so their foreign keys start as separate strings.
+
+    python -m benchmarks.memory [number of reviews]
+"""
+
+import json
+import sys
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from src.persistence.memory import MemoryRepository
+
+
+class EmptyRepository(MemoryRepository):
+    """MemoryRepository without the dummy data"""
+
+    def reload(self) -> None:
+        """Starts empty"""
+
+
+def review_rows(count: int) -> list[str]:
+    """Returns JSON rows of reviews spread over places and users"""
+    places = [str(uuid.uuid4()) for _ in range(max(count // 50, 1))]
+    users = [str(uuid.uuid4()) for _ in range(max(count // 20, 1))]
+    start = datetime(2024, 1, 1)
+    rows = []
+
+    for i in range(count):
+        created_at = (start + timedelta(seconds=i)).isoformat()
+        rows.append(
+            json.dumps(
+                {
+                    "id": str(uuid.uuid4()),
+                    "place_id": places[i % len(places)],
+                    "user_id": users[i % len(users)],
+                    "comment": "Great place",
+                    "rating": float(1 + i % 5),
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+            )
+        )
+
+    return rows
+
+
+def measure(rows: list[str], compact: bool) -> tuple[float, float]:
+    """
+    Returns the bytes per review of the objects alone, and of the
+    objects along with the repository indexes
+    """
+    repo = EmptyRepository(compact=compact)
+
+    tracemalloc.start()
+    objs = [repo._instantiate("review", json.loads(row)) for row in rows]
+    objects_size, _ = tracemalloc.get_traced_memory()
+    repo.save_many(objs)
+    del objs
+    total_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return objects_size / len(rows), total_size / len(rows)
+
+
+def main() -> None:
+    """Runs the benchmark and prints the results"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rows = review_rows(count)
+
+    print(f"{count} reviews, bytes per review")
+    print(f"{'':<10}{'objects':>10}{'with indexes':>15}")
+
+    for name, compact in (("plain", False), ("compact", True)):
+        objects_size, total_size = measure(rows, compact)
+        print(f"{name:<10}{objects_size:>10.0f}{total_size:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compares filtering places object by object, as the query builder does,
+with the vectorized search of the columnar store (src/indexes/columnar.py)
+
+    python -m benchmarks.place_search [number of places]
+"""
+
+import random
+import sys
+import timeit
+import uuid
+from types import SimpleNamespace
+from src.indexes.columnar import PlaceColumns, np
+from src.persistence.memory import MemoryRepository
+from src.persistence.query import Query
+
+CONDITIONS = [
+    ("price_per_night", "lte", 100),
+    ("max_guests", "gte", 4),
+    ("latitude", "gt", -35.0),
+    ("latitude", "lt", -34.0),
+]
+
+
+class EmptyRepository(MemoryRepository):
+    """MemoryRepository without the dummy data"""
+
+    def reload(self) -> None:
+        """Starts empty"""
+
+
+def make_places(count: int) -> list[SimpleNamespace]:
+    """Builds objects with the searchable attributes of places"""
+    random.seed(0)
+
+    return [
+        SimpleNamespace(
+            id=str(uuid.uuid4()),
+            price_per_night=random.randint(20, 1000),
+            number_of_rooms=random.randint(1, 6),
+            number_of_bathrooms=random.randint(1, 4),
+            max_guests=random.randint(1, 12),
+            latitude=random.uniform(-56.0, -30.0),
+            longitude=random.uniform(-74.0, -53.0),
+        )
+        for _ in range(count)
+    ]
+
+
+def best_ms(func, number: int) -> float:
+    """Returns the best time of a call, in milliseconds"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e3
+
+
+def main() -> None:
+    """Runs the benchmark and prints the results"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    places = make_places(count)
+    columns = PlaceColumns(EmptyRepository())
+
+    for place in places:
+        columns.add(place)
+
+    query = Query("place").where(
+        **{f"{field}__{op}": value for field, op, value in CONDITIONS}
+    )
+    total, _ = columns.search(CONDITIONS, 0, 100)
+
+    assert total == len(query.apply(places))
+
+    print(f"{count} places, {total} matches, numpy {np is not None}")
+    print(
+        f"{'object by object':<20}"
+        f"{best_ms(lambda: query.apply(places), 1):10.2f} ms"
+    )
+    print(
+        f"{'columnar':<20}"
+        f"{best_ms(lambda: columns.search(CONDITIONS, 0, 100), 20):10.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Micro-benchmark of the per object cost of encoding a Place as JSON
+
+Compares the hand written `to_dict` the models used to have, encoded
+by Flask's default (stdlib) JSON provider, with the generated
+serializer encoded by `src.json_provider.JSONProvider`.
+
+    python -m benchmarks.serialization [number of objects]
+"""
+
+import sys
+import timeit
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from src.json_provider import JSONProvider, orjson
+from src.models.place import Place
+from src.models.serializer import serializer
+
+
+def handwritten_to_dict(place: Place) -> dict:
+    """The former Place.to_dict"""
+    return {
+        "id": place.id,
+        "name": place.name,
+        "description": place.description,
+        "address": place.address,
+        "latitude": place.latitude,
+        "longitude": place.longitude,
+        "city_id": place.city_id,
+        "host_id": place.host_id,
+        "price_per_night": place.price_per_night,
+        "number_of_rooms": place.number_of_rooms,
+        "number_of_bathrooms": place.number_of_bathrooms,
+        "max_guests": place.max_guests,
+        "created_at": place.created_at.isoformat(),
+        "updated_at": place.updated_at.isoformat(),
+    }
+
+
+def make_places(count: int) -> list[Place]:
+    """Builds places with plausible values"""
+    return [
+        Place(
+            {
+                "name": f"Place {i}",
+                "description": "A nice place to stay " * 4,
+                "address": f"{i} Main Street",
+                "city_id": "0b5a6c2e-1c43-4c1f-9b8e-6a1d8f1e2c3d",
+                "host_id": "7f3e2d1c-5b4a-4c3b-8a9d-1e2f3a4b5c6d",
+                "latitude": -34.9 + i / 1e4,
+                "longitude": -56.1 - i / 1e4,
+                "price_per_night": 100 + i % 50,
+                "number_of_rooms": 1 + i % 4,
+                "number_of_bathrooms": 1 + i % 2,
+                "max_guests": 2 + i % 6,
+            }
+        )
+        for i in range(count)
+    ]
+
+
+def per_object(func, count: int) -> float:
+    """Returns the best time per object, in microseconds"""
+    return min(timeit.repeat(func, number=5, repeat=5)) / 5 / count * 1e6
+
+
+def main() -> None:
+    """Runs the benchmark and prints the results"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    places = make_places(count)
+    app = Flask(__name__)
+    stdlib = DefaultJSONProvider(app)
+    fast = JSONProvider(app)
+    to_dict = serializer(Place)
+
+    assert handwritten_to_dict(places[0]) == to_dict(places[0])
+
+    results = {
+        "handwritten to_dict": lambda: [
+            handwritten_to_dict(p) for p in places
+        ],
+        "generated to_dict": lambda: [to_dict(p) for p in places],
+        "before: handwritten + stdlib": lambda: [
+            stdlib.dumps(handwritten_to_dict(p)).encode() for p in places
+        ],
+        "after: generated + provider": lambda: [
+            fast.encode(to_dict(p)) for p in places
+        ],
+    }
+
+    print(f"{count} places, orjson {'installed' if orjson else 'missing'}")
+
+    for name, func in results.items():
+        print(f"{name:<32}{per_object(func, count):8.2f} us/object")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Compares scanning the text of every place and review with the BM25
+inverted index (src/indexes/text.py), and loading the saved index with
+building it again
+
+    python -m benchmarks.text_search [number of documents]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import timeit
+import uuid
+from types import SimpleNamespace
+from src.indexes import text
+from src.indexes.text import TextIndex, tokenize
+from src.persistence.memory import MemoryRepository
+
+VOCABULARY = 50000
+QUERIES = {
+    "common word": "w3",
+    "rare word": "w20000",
+    "three words": "w10 w200 w3000",
+}
+
+
+class EmptyRepository(MemoryRepository):
+    """MemoryRepository without the dummy data, saving to a temporary file"""
+
+    def __init__(self, path: str) -> None:
+        """Sets the snapshot file"""
+        self.path = path
+        super().__init__()
+
+    def reload(self) -> None:
+        """Starts empty"""
+
+    def snapshot_path(self) -> str:
+        """Returns the temporary file"""
+        return self.path
+
+
+class Place(SimpleNamespace):
+    """Indexed as a place"""
+
+
+class Review(SimpleNamespace):
+    """Indexed as a review"""
+
+
+def sentence(words: int) -> str:
+    """Builds a text with a Zipf-like word distribution"""
+    return " ".join(
+        f"w{int(VOCABULARY ** random.random()) - 1}" for _ in range(words)
+    )
+
+
+def make_documents(count: int) -> list:
+    """Builds as many places, with a name and description, as reviews"""
+    random.seed(0)
+    documents = []
+
+    for i in range(count):
+        if i % 2:
+            documents.append(
+                Review(id=str(uuid.uuid4()), comment=sentence(15))
+            )
+        else:
+            documents.append(
+                Place(
+                    id=str(uuid.uuid4()),
+                    name=sentence(3),
+                    description=sentence(30),
+                )
+            )
+
+    return documents
+
+
+def scan(documents: list, query: str) -> int:
+    """Counts the documents containing any word of the query"""
+    words = set(tokenize(query))
+
+    return sum(
+        not words.isdisjoint(
+            tokenize(
+                " ".join(
+                    getattr(document, field, "")
+                    for field in ("name", "description", "comment")
+                )
+            )
+        )
+        for document in documents
+    )
+
+
+def best_ms(func, number: int) -> float:
+    """Returns the best time of a call, in milliseconds"""
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e3
+
+
+def main() -> None:
+    """Runs the benchmark and prints the results"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    documents = make_documents(count)
+    path = os.path.join(tempfile.mkdtemp(), "data.pkl")
+    index = TextIndex(EmptyRepository(path))
+
+    started = time.perf_counter()
+
+    for document in documents:
+        index.add(document)
+
+    built = time.perf_counter() - started
+    print(f"{count} documents, {len(index.words)} words")
+    print(f"{'build':<24}{built * 1e3:10.0f} ms")
+    print(
+        f"{'scan (common word)':<24}"
+        f"{best_ms(lambda: scan(documents, 'w3'), 1):10.0f} ms"
+    )
+
+    for name, query in QUERIES.items():
+        total, _ = index.search(query, 0, 20)
+        numpy_ms = best_ms(lambda: index.search(query, 0, 20), 5)
+        numpy, text.np = text.np, None
+        python_ms = best_ms(lambda: index.search(query, 0, 20), 1)
+        text.np = numpy
+        print(
+            f"{name:<24}{numpy_ms:10.2f} ms, {python_ms:.2f} ms without "
+            f"NumPy, {total} matches"
+        )
+
+    started = time.perf_counter()
+    index.save(path)
+    saved = time.perf_counter() - started
+    started = time.perf_counter()
+    loaded = TextIndex(EmptyRepository(path))
+    load = time.perf_counter() - started
+    assert loaded.search("w10 w200", 0, 20) == index.search("w10 w200", 0, 20)
+    print(f"{'save':<24}{saved * 1e3:10.0f} ms")
+    print(f"{'load':<24}{load * 1e3:10.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
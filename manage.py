@@ -1,10 +1,47 @@
 """ Entry point for the application. """
 
+import json
+import urllib.error
+import urllib.request
+import click
 from flask.cli import FlaskGroup
 from src import create_app
 
 cli = FlaskGroup(create_app=create_app)
 
 
+@cli.command("repair-ratings")
+@click.option(
+    "--url",
+    default="http://localhost:5000",
+    envvar="HBNB_URL",
+    help="Base URL of the running server",
+)
+@click.option(
+    "--token",
+    required=True,
+    envvar="HBNB_ADMIN_TOKEN",
+    help="Access token of an admin, from /login",
+)
+def repair_ratings(url: str, token: str):
+    """
+    Asks the running server to rebuild its rating aggregates from the
+    reviews, they live in its memory
+    """
+    request = urllib.request.Request(
+        f"{url.rstrip('/')}/admin/ratings/repair",
+        method="POST",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    try:
+        with urllib.request.urlopen(request) as response:
+            drifted = json.load(response)["drifted"]
+    except urllib.error.URLError as e:
+        raise click.ClickException(f"Repair failed: {e}")
+
+    click.echo(f"Rating aggregates rebuilt, {drifted} had drifted")
+
+
 if __name__ == "__main__":
     cli()
@@ -22,6 +22,18 @@ class Config(ABC):
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Signs the access tokens of /login
+    JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+
+    # Connection pool of the DBRepository engine
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true") == "true",
+    }
+
 
 class DevelopmentConfig(Config):
     """
@@ -42,6 +54,8 @@ class DevelopmentConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.getenv(
         "DATABASE_URL", "sqlite:///hbnb_dev.db")
     DEBUG = True
+    JWT_SECRET_KEY = os.getenv(
+        "JWT_SECRET_KEY", "development-secret-do-not-use-in-production")
 
 
 class TestingConfig(Config):
@@ -62,6 +76,9 @@ class TestingConfig(Config):
 
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    JWT_SECRET_KEY = "testing-secret-do-not-use-in-production"
+    # In memory SQLite uses a single connection, it has no pool to size
+    SQLALCHEMY_ENGINE_OPTIONS: dict = {}
 
 
 class ProductionConfig(Config):
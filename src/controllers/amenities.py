@@ -3,14 +3,14 @@ Amenity controller module
 """
 
 from flask import abort, request
+from src.controllers.conditional import entity_response
+from src.controllers.listing import list_response
 from src.models.amenity import Amenity
 
 
 def get_amenities():
-    """Returns all amenities"""
-    amenities: list[Amenity] = Amenity.get_all()
-
-    return [amenity.to_dict() for amenity in amenities]
+    """Returns a page of amenities"""
+    return list_response(Amenity.query())
 
 
 def create_amenity():
@@ -34,7 +34,7 @@ def get_amenity_by_id(amenity_id: str):
     if not amenity:
         abort(404, f"Amenity with ID {amenity_id} not found")
 
-    return amenity.to_dict()
+    return entity_response(amenity)
 
 
 def update_amenity(amenity_id: str):
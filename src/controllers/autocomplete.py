@@ -0,0 +1,53 @@
+"""
+Autocomplete controller module
+"""
+
+from flask import abort, request
+from src.controllers.conditional import collection_etag, conditional
+from src.controllers.encoded import encode, json_response
+from src.indexes import derived_index
+from src.indexes.autocomplete import MODELS, NameAutocomplete, normalize
+from utils.constants import AUTOCOMPLETE_DEFAULT_LIMIT, AUTOCOMPLETE_MAX_LIMIT
+
+
+def autocomplete():
+    """
+    Returns the best `?limit=` cities, by number of places, and places,
+    by rating, with a word starting with `?q=`. `?type=city` or
+    `?type=place` only completes one of them
+    """
+    query = request.args.get("q", "")
+
+    if not normalize(query):
+        abort(400, "q must have at least one letter or digit")
+
+    try:
+        limit = int(request.args.get("limit", AUTOCOMPLETE_DEFAULT_LIMIT))
+    except ValueError:
+        abort(400, "limit must be a number")
+
+    if not 1 <= limit <= AUTOCOMPLETE_MAX_LIMIT:
+        abort(400, f"limit must be between 1 and {AUTOCOMPLETE_MAX_LIMIT}")
+
+    kind = request.args.get("type")
+
+    if kind is not None and kind not in MODELS:
+        abort(400, f"type must be one of {', '.join(MODELS)}")
+
+    from src.persistence import repo
+
+    models = (kind,) if kind else MODELS
+    # Places depend on the reviews, the cities are added as a variant
+    etag, last_modified = collection_etag(
+        "place", "autocomplete", repo.version("city")[0]
+    )
+
+    def build():
+        """Completes the query"""
+        matches = derived_index(NameAutocomplete).complete(
+            query, limit, models
+        )
+
+        return json_response(encode(matches))
+
+    return conditional(etag, last_modified, build)
@@ -3,14 +3,22 @@ Cities controller module
 """
 
 from flask import request, abort
+from src.controllers.conditional import (
+    collection_etag,
+    conditional,
+    entity_response,
+)
+from src.controllers.encoded import encode_with, json_response
+from src.controllers.listing import list_response, objects_by_id
+from src.indexes import derived_index
+from src.indexes.rankings import SCORES, CityRankings
 from src.models.city import City
+from utils.constants import MAX_PAGE_SIZE, TOP_PLACES_DEFAULT
 
 
 def get_cities():
-    """Returns all cities"""
-    cities: list[City] = City.get_all()
-
-    return [city.to_dict() for city in cities]
+    """Returns a page of cities"""
+    return list_response(City.query())
 
 
 def create_city():
@@ -34,7 +42,45 @@ def get_city_by_id(city_id: str):
     if not city:
         abort(404, f"City with ID {city_id} not found")
 
-    return city.to_dict()
+    return entity_response(city)
+
+
+def get_top_places(city_id: str):
+    """
+    Returns the `?k=` best places of a city, by the Bayesian average of
+    their ratings or, with `?score=count`, by their number of reviews
+    """
+    if not City.get(city_id):
+        abort(404, f"City with ID {city_id} not found")
+
+    try:
+        k = int(request.args.get("k", TOP_PLACES_DEFAULT))
+    except ValueError:
+        abort(400, "k must be a number")
+
+    if not 1 <= k <= MAX_PAGE_SIZE:
+        abort(400, f"k must be between 1 and {MAX_PAGE_SIZE}")
+
+    score = request.args.get("score", "bayesian")
+
+    if score not in SCORES:
+        abort(400, f"score must be one of {', '.join(SCORES)}")
+
+    etag, last_modified = collection_etag("place", "top")
+
+    def build():
+        """Encodes the best places with their score"""
+        top = derived_index(CityRankings).top(city_id, k, score)
+        scores = {place_id: value for place_id, value, _ in top}
+        places = objects_by_id("place", list(scores))
+        body = b"[" + b",".join(
+            encode_with(place, {"score": round(scores[place.id], 6)})
+            for place in places
+        ) + b"]"
+
+        return json_response(body)
+
+    return conditional(etag, last_modified, build)
 
 
 def update_city(city_id: str):
@@ -0,0 +1,109 @@
+"""
+Helpers for conditional GET requests
+
+Single objects are tagged with their id and `updated_at`, collections
+with the version of their model kept by the repository. Objects showing
+derived data (see `Place.derived_version`) and models listing other
+ones in `version_dependencies` include those versions too. A request whose
+`If-None-Match` or `If-Modified-Since` header still matches gets an
+empty `304 Not Modified` before anything is serialized.
+"""
+
+from datetime import datetime, timezone
+import hashlib
+from typing import Callable
+from flask import Response, make_response, request
+from src.controllers.encoded import encode_object, json_response
+from src.persistence.repository import model_classes, model_key, object_key
+
+
+def http_time(moment: datetime | None) -> datetime | None:
+    """Converts a local time to UTC, at the precision of HTTP dates"""
+    if moment is None:
+        return None
+
+    return moment.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def latest(*moments: datetime | None) -> datetime | None:
+    """Returns the latest of some times, None if there is none"""
+    return max(filter(None, moments), default=None)
+
+
+def not_modified(etag: str, last_modified: datetime | None) -> bool:
+    """Checks if the client's copy, told by the request headers, is fresh"""
+    if request.if_none_match:
+        # If-Modified-Since is ignored when If-None-Match is sent
+        return request.if_none_match.contains_weak(etag)
+
+    if last_modified and request.if_modified_since:
+        return http_time(last_modified) <= request.if_modified_since
+
+    return False
+
+
+def conditional(
+    etag: str, last_modified: datetime | None, build: Callable
+) -> Response:
+    """
+    Returns a 304 if the client's copy is still fresh, else the response
+    returned by `build`, with the `ETag` and `Last-Modified` headers
+    """
+    if not_modified(etag, last_modified):
+        response = Response(status=304)
+    else:
+        response = make_response(build())
+
+    response.set_etag(etag)
+
+    if last_modified:
+        response.last_modified = http_time(last_modified)
+
+    return response
+
+
+def entity_response(obj) -> Response:
+    """Returns an object as JSON, tagged by its id and update time"""
+    updated_at = getattr(obj, "updated_at", None)
+
+    if updated_at is None:
+        # Countries are never updated, they only change with the model
+        from src.persistence import repo
+
+        version, _ = repo.version(model_key(obj.__class__))
+        etag = f"{object_key(obj)}-{version}"
+    else:
+        etag = f"{object_key(obj)}-{updated_at.timestamp()}"
+
+    if hasattr(obj, "derived_version"):
+        revision, changed = obj.derived_version()
+        etag = f"{etag}-{revision}"
+        updated_at = latest(updated_at, changed)
+
+    return conditional(
+        etag, updated_at, lambda: json_response(encode_object(obj))
+    )
+
+
+def collection_etag(model: str, *variant: str) -> tuple[str, datetime | None]:
+    """
+    Returns the ETag of a collection response of a model, and its last
+    change. The ETag also depends on the URL and the given variant, so
+    every filter and page gets its own
+    """
+    from src.persistence import repo
+
+    version, modified = repo.version(model)
+    versions = [version]
+
+    # Models whose responses also show data of other models
+    for dependency in getattr(
+        model_classes()[model], "version_dependencies", ()
+    ):
+        version, changed = repo.version(dependency)
+        versions.append(version)
+        modified = latest(modified, changed)
+
+    key = "\n".join((model, *versions, request.full_path) + variant)
+
+    return hashlib.sha1(key.encode()).hexdigest(), modified
@@ -1,40 +1,71 @@
 """
 Countries controller module
+
+The countries never change (see `src/models/country.py`), so they are
+encoded once and served with their hash as ETag and a `Cache-Control`
+letting clients and proxies keep them for `COUNTRIES_MAX_AGE` seconds
 """
 
-from flask import abort
+import hashlib
+from flask import Response, abort
+from src.controllers.conditional import conditional
+from src.controllers.encoded import encode, json_response
+from src.controllers.listing import list_response
 from src.models.city import City
 from src.models.country import Country
+from utils.constants import COUNTRIES_MAX_AGE
+
+# Country code, or None for the list -> (ETag, JSON)
+_encoded: dict[str | None, tuple[str, bytes]] | None = None
+
+
+def encoded_countries() -> dict[str | None, tuple[str, bytes]]:
+    """Returns the ETag and JSON of the countries, encoded the first time"""
+    global _encoded
+
+    if _encoded is None:
+        countries = {
+            country.code: encode(country.to_dict())
+            for country in Country.get_all()
+        }
+        countries[None] = b"[" + b",".join(countries.values()) + b"]"
+        # Assigned at once, a concurrent request sees all of it or nothing
+        _encoded = {
+            code: (hashlib.sha1(body).hexdigest(), body)
+            for code, body in countries.items()
+        }
+
+    return _encoded
+
+
+def static_response(code: str | None) -> Response:
+    """Returns the encoded country, or list, cacheable by the clients"""
+    etag, body = encoded_countries()[code]
+    response = conditional(etag, None, lambda: json_response(body))
+    response.cache_control.public = True
+    response.cache_control.max_age = COUNTRIES_MAX_AGE
+
+    return response
 
 
 def get_countries():
     """Returns all countries"""
-    countries: list[Country] = Country.get_all()
-
-    return [country.to_dict() for country in countries]
+    return static_response(None)
 
 
 def get_country_by_code(code: str):
     """Returns a country by code"""
-    country: Country | None = Country.get(code)
-
-    if not country:
+    if not Country.get(code):
         abort(404, f"Country with ID {code} not found")
 
-    return country.to_dict()
+    return static_response(code)
 
 
 def get_country_cities(code: str):
-    """Returns all cities for a specific country by code"""
+    """Returns a page of the cities of a specific country by code"""
     country: Country | None = Country.get(code)
 
     if not country:
         abort(404, f"Country with ID {code} not found")
 
-    cities: list[City] = City.get_all()
-
-    country_cities = [
-        city.to_dict() for city in cities if city.country_code == country.code
-    ]
-
-    return country_cities
+    return list_response(City.query().where(country_code=country.code))
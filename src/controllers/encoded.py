@@ -0,0 +1,133 @@
+"""
+Cache of the JSON encoding of the objects returned by the controllers
+
+Objects are kept encoded, as bytes, along with the `updated_at` they were
+encoded at. As long as an object isn't updated its cached bytes are
+spliced into the responses, so `to_dict` and the JSON encoder only run
+for the objects that changed. The least recently used objects are evicted
+once the cache holds more than `ENCODED_CACHE_MAX_BYTES`.
+"""
+
+from collections import OrderedDict
+import threading
+from flask import Response, current_app
+from src.persistence.repository import model_key, object_key
+from utils.constants import ENCODED_CACHE_MAX_BYTES
+
+
+def encode(value) -> bytes:
+    """Encodes a value with the JSON provider of the app"""
+    provider = current_app.json
+
+    if hasattr(provider, "encode"):
+        return provider.encode(value)
+
+    return provider.dumps(value).encode()
+
+
+class EncodedCache:
+    """Memory bounded LRU of encoded objects"""
+
+    def __init__(self, max_bytes: int = ENCODED_CACHE_MAX_BYTES) -> None:
+        """Creates an empty cache holding at most `max_bytes`"""
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._lock = threading.Lock()
+        # (model, key) -> (updated_at, encoded object)
+        self._entries: OrderedDict[tuple, tuple] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def encode(self, obj) -> bytes:
+        """Returns the JSON encoding of an object, from the cache if fresh"""
+        version = getattr(obj, "updated_at", None)
+
+        # Objects that are never updated (countries) are cheap to encode
+        if version is None:
+            return encode(obj.to_dict())
+
+        # Derived attributes (ratings) change without updating the object
+        if hasattr(obj, "derived_version"):
+            version = (version, obj.derived_version()[0])
+
+        key = (model_key(obj.__class__), object_key(obj))
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+
+        encoded = encode(obj.to_dict())
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+
+            if old is not None:
+                self.size -= len(old[1])
+
+            self._entries[key] = (version, encoded)
+            self.size += len(encoded)
+
+            while self.size > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+        return encoded
+
+    def clear(self) -> None:
+        """Empties the cache"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        """Returns the cache counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+cache = EncodedCache()
+
+
+def json_response(body: bytes, status: int = 200, headers=None) -> Response:
+    """Returns already encoded JSON as a response"""
+    return Response(
+        body, status=status, headers=headers, mimetype="application/json"
+    )
+
+
+def encode_object(obj) -> bytes:
+    """Returns the JSON encoding of an object"""
+    return cache.encode(obj)
+
+
+def encode_list(objs) -> bytes:
+    """Returns the JSON array of the objects, spliced from the cache"""
+    return b"[" + b",".join(cache.encode(obj) for obj in objs) + b"]"
+
+
+def encode_with(obj, fields: dict) -> bytes:
+    """
+    Returns the JSON encoding of an object with extra fields spliced in
+    front of its cached encoding
+    """
+    encoded = cache.encode(obj)
+
+    if not fields or encoded == b"{}":
+        return encode(obj.to_dict() | fields)
+
+    return encode(fields)[:-1] + b"," + encoded[1:]
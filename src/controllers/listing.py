@@ -0,0 +1,205 @@
+"""
+Helpers shared by the controllers that return collections
+
+Collections are paginated by keyset: pages are sorted by
+`(created_at, id)` and `?after=` takes the opaque cursor of the last
+object of the previous page. The link to the next page is sent in the
+`Link` response header, `?limit=` sets the page size.
+
+Requests accepting `application/x-ndjson`, or passing `?stream=true`,
+get the whole collection instead, streamed as NDJSON or as a JSON array
+while it is read from the repository in batches.
+
+Searches served by the derived indexes (see `src/indexes/`) are
+paginated with `?limit=` and `?offset=` instead, the total count of
+results is sent in the `X-Total-Count` header.
+
+All of them are tagged with the version of the model (see `conditional.py`),
+so polling an unchanged collection gets a `304` without reading it.
+"""
+
+import base64
+from datetime import datetime
+import json
+from urllib.parse import urlencode
+from flask import Response, abort, request, stream_with_context
+from src.controllers.conditional import collection_etag, conditional
+from src.controllers.encoded import encode_list, encode_object, json_response
+from src.persistence.query import Query
+from utils.constants import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    STREAM_BATCH_SIZE,
+)
+
+LISTING_ARGS = ("limit", "after", "stream")
+# Searches, which are ranked or filtered outside of the repository,
+# are paginated by offset instead
+OFFSET_ARGS = ("limit", "offset")
+NDJSON = "application/x-ndjson"
+
+
+def encode_cursor(obj) -> str:
+    """Returns the opaque cursor pointing right after an object"""
+    raw = json.dumps([obj.created_at.isoformat(), obj.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Returns the (created_at, id) values of a cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, obj_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), obj_id
+    except (ValueError, TypeError):
+        abort(400, "Invalid cursor")
+
+
+def page_size() -> int:
+    """Returns the page size requested with `?limit=`"""
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        abort(400, "limit must be a number")
+
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        abort(400, f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    return limit
+
+
+def page_offset() -> int:
+    """Returns the offset requested with `?offset=`"""
+    try:
+        offset = int(request.args.get("offset", 0))
+    except ValueError:
+        abort(400, "offset must be a number")
+
+    if offset < 0:
+        abort(400, "offset can't be negative")
+
+    return offset
+
+
+def offset_headers(total: int, offset: int, limit: int) -> dict:
+    """
+    Returns the headers of a page of search results: the total count
+    and the `Link` to the next page, if any
+    """
+    headers = {"X-Total-Count": str(total)}
+
+    if offset + limit < total:
+        args = request.args.to_dict() | {
+            "limit": limit,
+            "offset": offset + limit,
+        }
+        headers["Link"] = f'<{request.path}?{urlencode(args)}>; rel="next"'
+
+    return headers
+
+
+def objects_by_id(model: str, ids: list[str]) -> list:
+    """Fetches the objects of the ids with one query, in the same order"""
+    if not ids:
+        return []
+
+    objs = {obj.id: obj for obj in Query(model).where(id__in=ids).all()}
+
+    return [objs[obj_id] for obj_id in ids if obj_id in objs]
+
+
+def paginate(query: Query):
+    """
+    Returns the page of the query requested by the query string,
+    with the `Link` header pointing to the next one
+    """
+    limit = page_size()
+    query = query.order_by("created_at", "id")
+
+    if "after" in request.args:
+        query = query.after(*decode_cursor(request.args["after"]))
+
+    # One more than needed, to know if there is a next page
+    objs = query.limit(limit + 1).all()
+    headers = {}
+
+    if len(objs) > limit:
+        objs = objs[:limit]
+        args = request.args.to_dict() | {
+            "limit": limit,
+            "after": encode_cursor(objs[-1]),
+        }
+        headers["Link"] = f'<{request.path}?{urlencode(args)}>; rel="next"'
+
+    return json_response(encode_list(objs), 200, headers)
+
+
+def streaming_format() -> str | None:
+    """Returns "ndjson" or "json" if the request asks for a stream"""
+    best = request.accept_mimetypes.best_match(["application/json", NDJSON])
+
+    if best == NDJSON:
+        return "ndjson"
+
+    if request.args.get("stream", "").lower() in ("1", "true"):
+        return "json"
+
+    return None
+
+
+def stream(query: Query, fmt: str) -> Response:
+    """
+    Streams every object of the query, encoding one batch at a time
+
+    The response is a JSON array for the "json" format, and one JSON
+    document per line for "ndjson"
+    """
+    if "after" in request.args:
+        query = query.order_by("created_at", "id").after(
+            *decode_cursor(request.args["after"])
+        )
+
+    def generate():
+        """Yields the encoded batches"""
+        first = True
+
+        if fmt == "json":
+            yield b"["
+
+        for objs in query.batches(STREAM_BATCH_SIZE):
+            encoded = [encode_object(obj) for obj in objs]
+
+            if fmt == "ndjson":
+                yield b"\n".join(encoded) + b"\n"
+            else:
+                yield (b"" if first else b",") + b",".join(encoded)
+
+            first = False
+
+        if fmt == "json":
+            yield b"]"
+
+    mimetype = NDJSON if fmt == "ndjson" else "application/json"
+
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+
+def list_response(query: Query, *variant: str) -> Response:
+    """
+    Returns the collection of the query, streamed or paginated, or a 304
+    if the model didn't change since the client got it. The variant is
+    added to the ETag, for queries depending on other models
+    """
+    fmt = streaming_format()
+    etag, last_modified = collection_etag(
+        query.model, fmt or "page", *variant
+    )
+
+    def build():
+        """Builds the full response"""
+        return stream(query, fmt) if fmt else paginate(query)
+
+    response = conditional(etag, last_modified, build)
+    response.vary.add("Accept")
+
+    return response
@@ -2,15 +2,307 @@
 Places controller module
 """
 
-from flask import abort, request
+from flask import Response, abort, request
+from src.controllers.conditional import (
+    collection_etag,
+    conditional,
+    entity_response,
+    latest,
+)
+from src.controllers.encoded import (
+    encode,
+    encode_list,
+    encode_with,
+    json_response,
+)
+from src.models.amenity import Amenity
 from src.models.place import Place
+from src.controllers.listing import (
+    LISTING_ARGS,
+    OFFSET_ARGS,
+    list_response,
+    objects_by_id,
+    offset_headers,
+    page_offset,
+    page_size,
+)
+from src.indexes import derived_index
+from src.indexes.amenities import PlaceAmenities
+from src.indexes.clusters import PlaceClusters
+from src.indexes.columnar import PlaceColumns
+from src.indexes.geo import PlaceGrid
+from src.indexes.ratings import RatingAggregates
+from src.persistence.query import args_conditions
+from utils.constants import (
+    CLUSTER_ZOOM_OFFSET,
+    GEO_MAX_RADIUS_KM,
+    MAX_MAP_ZOOM,
+)
 
 
 def get_places():
-    """Returns all places"""
-    places: list[Place] = Place.get_all()
+    """
+    Returns a page of places, filtered by the query string, for example
+    `?city_id=...&price_per_night__lte=100`
+    """
+    try:
+        query = Place.query().where(
+            **args_conditions(
+                "place", request.args, LISTING_ARGS + ("amenities",)
+            )
+        )
+    except ValueError as e:
+        abort(400, str(e))
+
+    if "amenities" not in request.args:
+        return list_response(query)
+
+    from src.persistence import repo
+
+    amenity_ids = _amenity_ids(request.args["amenities"])
+    place_ids = derived_index(PlaceAmenities).places_with(amenity_ids)
+
+    return list_response(
+        query.where(id__in=frozenset(place_ids)),
+        repo.version("placeamenity")[0],
+    )
+
+
+def _amenity_ids(amenities: str) -> list[str]:
+    """
+    Returns the ids of a comma separated list of amenities, given by id
+    or by name
+    """
+    from src.persistence import repo
+
+    ids = []
+
+    for amenity in filter(None, amenities.split(",")):
+        if Amenity.get(amenity):
+            ids.append(amenity)
+            continue
+
+        named = repo.find_by("amenity", name=amenity)
+
+        if not named:
+            abort(400, f"Unknown amenity: {amenity}")
+
+        ids.append(named[0].id)
+
+    if not ids:
+        abort(400, "amenities can't be empty")
+
+    return ids
+
+
+def search_places():
+    """
+    Returns a page of the places whose numeric attributes meet the
+    filters of the query string, evaluated over the columnar store of
+    the places, for example `?price_per_night__lte=100&max_guests__gte=4`
+    """
+    try:
+        conditions = [
+            (field, op or "eq", value)
+            for condition, value in args_conditions(
+                "place", request.args, OFFSET_ARGS
+            ).items()
+            for field, _, op in [condition.partition("__")]
+        ]
+    except ValueError as e:
+        abort(400, str(e))
+
+    limit, offset = page_size(), page_offset()
+    etag, last_modified = collection_etag("place", "search")
+
+    def build():
+        """Runs the search"""
+        try:
+            total, ids = derived_index(PlaceColumns).search(
+                conditions, offset, limit
+            )
+        except ValueError as e:
+            abort(400, str(e))
+
+        places = objects_by_id("place", ids)
+        headers = offset_headers(total, offset, limit)
+
+        return json_response(encode_list(places), 200, headers)
+
+    return conditional(etag, last_modified, build)
+
+
+def _coordinate(value: str | None, name: str, low: float, high: float):
+    """Parses a coordinate of the query string, between `low` and `high`"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        abort(400, f"{name} must be a number")
+
+    if not low <= number <= high:
+        abort(400, f"{name} must be between {low:g} and {high:g}")
+
+    return number
+
+
+def _bbox() -> tuple[float, float, float, float]:
+    """Parses the `?bbox=west,south,east,north` of the query string"""
+    bbox = request.args.get("bbox", "").split(",")
+
+    if len(bbox) != 4:
+        abort(400, "bbox must be west,south,east,north")
+
+    west = _coordinate(bbox[0], "west", -180, 180)
+    south = _coordinate(bbox[1], "south", -90, 90)
+    east = _coordinate(bbox[2], "east", -180, 180)
+    north = _coordinate(bbox[3], "north", -90, 90)
+
+    if south > north:
+        abort(400, "south can't be greater than north")
+
+    return west, south, east, north
+
 
-    return [place.to_dict() for place in places], 200
+def _distance_response(search) -> Response:
+    """
+    Returns a page of the places found by a geo search, nearest first
+    and with their `distance_km`, tagged with the version of the places
+    """
+    limit, offset = page_size(), page_offset()
+    etag, last_modified = collection_etag("place", "geo")
+
+    def build():
+        """Runs the search"""
+        total, nearest = search(derived_index(PlaceGrid), offset, limit)
+        places = objects_by_id("place", [place_id for _, place_id in nearest])
+        distances = {place_id: distance for distance, place_id in nearest}
+        body = b"[" + b",".join(
+            encode_with(place, {"distance_km": round(distances[place.id], 3)})
+            for place in places
+        ) + b"]"
+
+        return json_response(body, 200, offset_headers(total, offset, limit))
+
+    return conditional(etag, last_modified, build)
+
+
+def nearby_places():
+    """
+    Returns the places within `radius_km` of a point, nearest first, for
+    example `?lat=-34.9&lon=-56.16&radius_km=5`
+    """
+    lat = _coordinate(request.args.get("lat"), "lat", -90, 90)
+    lon = _coordinate(request.args.get("lon"), "lon", -180, 180)
+    radius = _coordinate(
+        request.args.get("radius_km"), "radius_km", 0, GEO_MAX_RADIUS_KM
+    )
+
+    return _distance_response(
+        lambda grid, offset, limit: grid.nearby(
+            lat, lon, radius, offset, limit
+        )
+    )
+
+
+def places_within():
+    """
+    Returns the places inside a bounding box given as
+    `?bbox=west,south,east,north` (a west greater than east crosses the
+    antimeridian), nearest to the center of the box first, or to
+    `?lat=&lon=` if given
+    """
+    west, south, east, north = _bbox()
+    center = None
+
+    if "lat" in request.args or "lon" in request.args:
+        center = (
+            _coordinate(request.args.get("lat"), "lat", -90, 90),
+            _coordinate(request.args.get("lon"), "lon", -180, 180),
+        )
+
+    return _distance_response(
+        lambda grid, offset, limit: grid.within(
+            west, south, east, north, offset, limit, center
+        )
+    )
+
+
+def place_clusters():
+    """
+    Returns the clusters of the places inside a map view given as
+    `?bbox=west,south,east,north&zoom=`, each with its count, centroid
+    and the tile it covers. Every map tile of the view is split in
+    2^CLUSTER_ZOOM_OFFSET by 2^CLUSTER_ZOOM_OFFSET clusters
+    """
+    west, south, east, north = _bbox()
+
+    try:
+        zoom = int(request.args.get("zoom", 0))
+    except ValueError:
+        abort(400, "zoom must be a number")
+
+    if not 0 <= zoom <= MAX_MAP_ZOOM:
+        abort(400, f"zoom must be between 0 and {MAX_MAP_ZOOM}")
+
+    etag, last_modified = collection_etag("place", "clusters")
+
+    def build():
+        """Collects the clusters"""
+        clusters = derived_index(PlaceClusters).clusters(
+            west, south, east, north, zoom + CLUSTER_ZOOM_OFFSET
+        )
+
+        return json_response(encode(clusters))
+
+    return conditional(etag, last_modified, build)
+
+
+def get_place_amenities(place_id: str):
+    """Returns the amenities of a place, by name"""
+    from src.persistence import repo
+
+    if not Place.get(place_id):
+        abort(404, f"Place with ID {place_id} not found")
+
+    etag, last_modified = collection_etag(
+        "placeamenity", repo.version("amenity")[0]
+    )
+
+    def build():
+        """Fetches the amenities"""
+        amenity_ids = derived_index(PlaceAmenities).amenities_of(place_id)
+        amenities = objects_by_id("amenity", list(amenity_ids))
+        amenities.sort(key=lambda amenity: (amenity.name, amenity.id))
+
+        return json_response(encode_list(amenities))
+
+    return conditional(etag, last_modified, build)
+
+
+def get_place_rating(place_id: str):
+    """
+    Returns the rating aggregate of a place (count, sum, mean and
+    histogram) and the one of its host
+    """
+    place: Place | None = Place.get(place_id)
+
+    if not place:
+        abort(404, f"Place with ID {place_id} not found")
+
+    rating = place.rating()
+    host = derived_index(RatingAggregates).host(place.host_id)
+    etag = f"{place_id}-{rating.revision}-{host.revision}"
+
+    def build():
+        """Encodes the aggregates"""
+        return json_response(
+            encode(
+                {"place_id": place_id, **rating.to_dict()}
+                | {"host": {"host_id": place.host_id, **host.to_dict()}}
+            )
+        )
+
+    return conditional(etag, latest(rating.modified, host.modified), build)
 
 
 def create_place():
@@ -34,7 +326,7 @@ def get_place_by_id(place_id: str):
     if not place:
         abort(404, f"Place with ID {place_id} not found")
 
-    return place.to_dict(), 200
+    return entity_response(place)
 
 
 def update_place(place_id: str):
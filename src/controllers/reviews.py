@@ -3,14 +3,16 @@ Reviews controller module
 """
 
 from flask import abort, request
+from src.controllers.conditional import entity_response
+from src.controllers.listing import list_response
+from src.indexes import derived_index
+from src.indexes.ratings import RatingAggregates
 from src.models.review import Review
 
 
 def get_reviews():
-    """Returns all reviews"""
-    reviews = Review.get_all()
-
-    return [review.to_dict() for review in reviews], 200
+    """Returns a page of reviews"""
+    return list_response(Review.query())
 
 
 def create_review(place_id: str):
@@ -31,21 +33,13 @@ def create_review(place_id: str):
 
 
 def get_reviews_from_place(place_id: str):
-    """Returns all reviews from a specific place"""
-    reviews = Review.get_all()
-
-    return [
-        review.to_dict() for review in reviews if review.place_id == place_id
-    ], 200
+    """Returns a page of reviews from a specific place"""
+    return list_response(Review.query().where(place_id=place_id))
 
 
 def get_reviews_from_user(user_id: str):
-    """Returns all reviews from a specific user"""
-    reviews = Review.get_all()
-
-    return [
-        review.to_dict() for review in reviews if review.user_id == user_id
-    ], 200
+    """Returns a page of reviews from a specific user"""
+    return list_response(Review.query().where(user_id=user_id))
 
 
 def get_review_by_id(review_id: str):
@@ -55,7 +49,7 @@ def get_review_by_id(review_id: str):
     if not review:
         abort(404, f"Review with ID {review_id} not found")
 
-    return review.to_dict(), 200
+    return entity_response(review)
 
 
 def update_review(review_id: str):
@@ -79,3 +73,11 @@ def delete_review(review_id: str):
         abort(404, f"Review with ID {review_id} not found")
 
     return "", 204
+
+
+def repair_ratings():
+    """
+    Rebuilds the rating aggregates of this process from the reviews,
+    returns how many of them had drifted
+    """
+    return {"drifted": derived_index(RatingAggregates).rebuild()}, 200
@@ -0,0 +1,62 @@
+"""
+Full-text search controller module
+"""
+
+from flask import abort, request
+from src.controllers.conditional import collection_etag, conditional
+from src.controllers.encoded import encode, encode_object, json_response
+from src.controllers.listing import (
+    objects_by_id,
+    offset_headers,
+    page_offset,
+    page_size,
+)
+from src.indexes import derived_index
+from src.indexes.text import MODELS, TextIndex
+
+
+def search():
+    """
+    Returns a page of the places and reviews matching the words of `?q=`,
+    best match first, each one with its type and BM25 score. `?type=place`
+    or `?type=review` only searches one of them
+    """
+    query = request.args.get("q", "").strip()
+
+    if not query:
+        abort(400, "q is required")
+
+    kind = request.args.get("type")
+
+    if kind is not None and kind not in MODELS:
+        abort(400, f"type must be one of {', '.join(MODELS)}")
+
+    models = (kind,) if kind else MODELS
+    limit, offset = page_size(), page_offset()
+    # Places depend on the reviews, so their version covers both models
+    etag, last_modified = collection_etag("place", "text")
+
+    def build():
+        """Runs the search"""
+        total, found = derived_index(TextIndex).search(
+            query, offset, limit, models
+        )
+        objs = {
+            (model, obj.id): obj
+            for model in models
+            for obj in objects_by_id(
+                model, [obj_id for _, of, obj_id in found if of == model]
+            )
+        }
+        body = b"[" + b",".join(
+            encode({"type": model, "score": round(score, 6)})[:-1]
+            + b',"object":'
+            + encode_object(objs[(model, obj_id)])
+            + b"}"
+            for score, model, obj_id in found
+            if (model, obj_id) in objs
+        ) + b"]"
+
+        return json_response(body, 200, offset_headers(total, offset, limit))
+
+    return conditional(etag, last_modified, build)
@@ -0,0 +1,89 @@
+"""
+Derived indexes, in-process structures built from the objects of a
+model and kept in sync with the repository through its listeners
+(see ``Repository.add_listener``)
+
+```
+from src.indexes import derived_index
+from src.indexes.columnar import PlaceColumns
+
+ids = derived_index(PlaceColumns).search(...)
+```
+
+Every index is built the first time it is asked for, from the objects
+the repository already has, and then follows the changes made through
+the repository of this process.
+"""
+
+import threading
+
+_instances: dict[type, "DerivedIndex"] = {}
+# Reentrant, building an index can build the ones it depends on
+_instances_lock = threading.RLock()
+
+
+class DerivedIndex:
+    """
+    Base class of the derived indexes
+
+    Subclasses set `model` and implement `add` and `remove`, an update
+    is a remove followed by an add unless they override `update`
+    """
+
+    model: str = ""
+
+    def __init__(self, repo) -> None:
+        """Follows the changes of the repository and loads its objects"""
+        self.repo = repo
+        self.lock = threading.RLock()
+
+        with self.lock:
+            repo.add_listener(self.changed)
+            self.load()
+
+    def load(self) -> None:
+        """Indexes the objects the repository already has"""
+        for obj in self.repo.get_all(self.model):
+            self.add(obj)
+
+    def add(self, obj) -> None:
+        """Indexes an object"""
+        raise NotImplementedError
+
+    def remove(self, obj) -> None:
+        """Removes an object from the index, if it is there"""
+        raise NotImplementedError
+
+    def update(self, obj) -> None:
+        """Reindexes an updated object"""
+        self.remove(obj)
+        self.add(obj)
+
+    def changed(self, op: str, model: str, objs: list) -> None:
+        """Repository listener, applies the changes of the model"""
+        if model != self.model:
+            return
+
+        with self.lock:
+            for obj in objs:
+                if op == "delete":
+                    self.remove(obj)
+                else:
+                    # A save can also replace an existing object
+                    self.update(obj)
+
+
+def derived_index(cls: type) -> DerivedIndex:
+    """Returns the index of the given class, building it the first time"""
+    index = _instances.get(cls)
+
+    if index is None:
+        with _instances_lock:
+            index = _instances.get(cls)
+
+            if index is None:
+                from src.persistence import repo
+
+                index = _instances[cls] = cls(repo)
+
+    return index
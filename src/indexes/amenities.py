@@ -0,0 +1,91 @@
+"""
+Inverted index of the amenities of the places
+
+Every amenity has a posting set with the ids of the places that have
+it, and every place the set of its amenity ids. Places having all of
+several amenities are found by intersecting the posting sets, starting
+from the smallest one, so the cost is bound by the rarest amenity and
+not by the number of places.
+"""
+
+from src.indexes import DerivedIndex
+
+
+class PlaceAmenities(DerivedIndex):
+    """Posting sets of the places per amenity, and amenities per place"""
+
+    model = "placeamenity"
+
+    def __init__(self, repo) -> None:
+        """Creates the empty sets and loads the place amenities"""
+        # amenity id -> place ids
+        self.postings: dict[str, set[str]] = {}
+        # place id -> amenity ids
+        self.amenities: dict[str, set[str]] = {}
+        # placeamenity id -> (place id, amenity id)
+        self.links: dict[str, tuple[str, str]] = {}
+        # (place id, amenity id) -> number of placeamenities linking them
+        self.counts: dict[tuple[str, str], int] = {}
+        super().__init__(repo)
+
+    def add(self, obj) -> None:
+        """Links a place to an amenity"""
+        pair = (obj.place_id, obj.amenity_id)
+        self.links[obj.id] = pair
+        self.counts[pair] = self.counts.get(pair, 0) + 1
+        self.postings.setdefault(obj.amenity_id, set()).add(obj.place_id)
+        self.amenities.setdefault(obj.place_id, set()).add(obj.amenity_id)
+
+    def remove(self, obj) -> None:
+        """Unlinks a place from an amenity, once nothing else links them"""
+        pair = self.links.pop(obj.id, None)
+
+        if pair is None:
+            return
+
+        if self.counts[pair] > 1:
+            self.counts[pair] -= 1
+            return
+
+        del self.counts[pair]
+        place_id, amenity_id = pair
+
+        for sets, key, value in (
+            (self.postings, amenity_id, place_id),
+            (self.amenities, place_id, amenity_id),
+        ):
+            sets[key].discard(value)
+
+            if not sets[key]:
+                del sets[key]
+
+    def places_with(self, amenity_ids) -> set[str]:
+        """Returns the ids of the places having every given amenity"""
+        with self.lock:
+            postings = [
+                self.postings.get(amenity_id, set())
+                for amenity_id in set(amenity_ids)
+            ]
+            postings.sort(key=len)
+
+            if not postings:
+                return set()
+
+            places = set(postings[0])
+
+            for posting in postings[1:]:
+                if not places:
+                    break
+
+                places &= posting
+
+            return places
+
+    def amenities_of(self, place_id: str) -> set[str]:
+        """Returns the ids of the amenities of a place"""
+        with self.lock:
+            return set(self.amenities.get(place_id, ()))
+
+    def has(self, place_id: str, amenity_id: str) -> bool:
+        """Checks if a place has an amenity"""
+        return (place_id, amenity_id) in self.counts
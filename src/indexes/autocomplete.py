@@ -0,0 +1,299 @@
+"""
+Prefix index of the names of the cities and the places, for type-ahead
+
+Every name is normalized like the words of the full-text index
+(lowercase, without accents or punctuation) and kept in a sorted list
+once from each of its words on, so "New York" is found both by "new y"
+and by "yo". The names starting with a prefix are a range of the list,
+found with two binary searches.
+
+Cities are ranked by their number of places and places by the Bayesian
+average of their ratings (see `src/indexes/rankings.py`). Short prefixes
+match too many names to rank them on every keystroke, the ranking of
+those with more than `AUTOCOMPLETE_SCAN_LIMIT` names is kept until a
+name starting with the prefix, or its place count or rating, changes.
+"""
+
+from bisect import bisect_left, insort
+import heapq
+from src.indexes import DerivedIndex, derived_index
+from src.indexes.rankings import bayesian
+from src.indexes.ratings import RatingAggregates
+from src.indexes.text import tokenize
+from src.persistence.repository import model_key
+from utils.constants import (
+    AUTOCOMPLETE_CACHE_SIZE,
+    AUTOCOMPLETE_MAX_LIMIT,
+    AUTOCOMPLETE_SCAN_LIMIT,
+)
+
+MODELS = ("city", "place")
+# Changes with more entries rebuild the list instead of moving it
+BULK_ENTRIES = 64
+# Sorts after every character a normalized name can have
+_LAST = "\U0010ffff"
+
+
+def normalize(name: str) -> str:
+    """Returns the words of a name, lowercase and without accents"""
+    return " ".join(tokenize(name))
+
+
+class NameAutocomplete(DerivedIndex):
+    """Sorted suffixes of the names of the cities and the places"""
+
+    def __init__(self, repo) -> None:
+        """Creates the empty index and loads the cities and places"""
+        # Built first so its listeners run before the ones of the index
+        self.ratings: RatingAggregates = derived_index(RatingAggregates)
+        # Sorted (name from one of its words on, model, id)
+        self.entries: list[tuple[str, str, str]] = []
+        # (model, id) -> (name, city id or country code, entries)
+        self.names: dict[tuple[str, str], tuple[str, str, list]] = {}
+        # city id -> number of places
+        self.places: dict[str, int] = {}
+        # (prefix, model) -> best (model, id) of the prefix
+        self.rankings: dict[tuple[str, str], list[tuple[str, str]]] = {}
+        # review id -> place id, to find the place a review moved from
+        self.reviews: dict[str, str] = {}
+        super().__init__(repo)
+
+    def load(self) -> None:
+        """Indexes the cities and the places"""
+        for model in MODELS:
+            self._insert(
+                [
+                    entry
+                    for obj in self.repo.get_all(model)
+                    for entry in self._name(obj)
+                ]
+            )
+
+        for review in self.repo.get_all("review"):
+            self.reviews[review.id] = review.place_id
+
+    def changed(self, op: str, model: str, objs: list) -> None:
+        """
+        Repository listener, reindexes the cities and places and forgets
+        the rankings of the prefixes of the names whose place count or
+        rating changed
+        """
+        if model not in MODELS and model != "review":
+            return
+
+        with self.lock:
+            if model == "review":
+                self._review_changed(op, objs)
+                return
+
+            # Entries of the changed names, before and after the change
+            touched: list[tuple[str, str, str]] = []
+            # Cities, or countries, the changed names belong to. Only the
+            # number of places of the cities depends on them
+            cities: set[str] = set()
+
+            for obj in objs:
+                name = self.names.get((model, obj.id))
+
+                if name is not None:
+                    touched.extend(name[2])
+                    cities.add(name[1])
+
+            self._delete(
+                [entry for obj in objs for entry in self._forget(obj)]
+            )
+
+            if op != "delete":
+                entries = [entry for obj in objs for entry in self._name(obj)]
+                self._insert(entries)
+                touched.extend(entries)
+                cities.update(
+                    self.names[(model, obj.id)][1] for obj in objs
+                )
+
+            self._invalidate(model, touched)
+
+            if model == "place":
+                for city_id in cities:
+                    self._invalidate("city", self._entries("city", city_id))
+
+    def _review_changed(self, op: str, objs: list) -> None:
+        """Forgets the rankings of the places whose rating changed"""
+        for obj in objs:
+            old = self.reviews.pop(obj.id, None)
+
+            if op != "delete":
+                self.reviews[obj.id] = obj.place_id
+
+            for place_id in {old, obj.place_id}:
+                self._invalidate("place", self._entries("place", place_id))
+
+    def _entries(self, model: str, obj_id: str | None) -> list:
+        """Returns the entries of a city or a place, if it is indexed"""
+        name = self.names.get((model, obj_id))
+
+        return name[2] if name is not None else []
+
+    def _invalidate(
+        self, model: str, entries: list[tuple[str, str, str]]
+    ) -> None:
+        """Forgets the kept rankings of the prefixes of some entries"""
+        if not self.rankings:
+            return
+
+        for name, _, _ in entries:
+            for end in range(len(name) + 1):
+                self.rankings.pop((name[:end], model), None)
+
+    def add(self, obj) -> None:
+        """Indexes the name of a city or a place"""
+        self._insert(self._name(obj))
+
+    def remove(self, obj) -> None:
+        """Removes the name of a city or a place"""
+        self._delete(self._forget(obj))
+
+    def _insert(self, entries: list[tuple[str, str, str]]) -> None:
+        """Adds entries to the sorted list"""
+        if len(entries) <= BULK_ENTRIES:
+            for entry in entries:
+                insort(self.entries, entry)
+        else:
+            # Sorting merges the sorted runs in linear time
+            self.entries.extend(sorted(entries))
+            self.entries.sort()
+
+    def _delete(self, entries: list[tuple[str, str, str]]) -> None:
+        """Removes entries from the sorted list"""
+        if len(entries) <= BULK_ENTRIES:
+            for entry in entries:
+                del self.entries[bisect_left(self.entries, entry)]
+        else:
+            deleted = set(entries)
+            self.entries = [
+                entry for entry in self.entries if entry not in deleted
+            ]
+
+    def _name(self, obj) -> list[tuple[str, str, str]]:
+        """
+        Records the name of a city or a place and its number of places,
+        returns its entries
+        """
+        model = model_key(obj.__class__)
+        words = tokenize(obj.name or "")
+        entries = [
+            (" ".join(words[start:]), model, obj.id)
+            for start in range(len(words))
+        ]
+        parent = obj.city_id if model == "place" else obj.country_code
+        self.names[(model, obj.id)] = (obj.name, parent, entries)
+
+        if model == "place":
+            self.places[parent] = self.places.get(parent, 0) + 1
+
+        return entries
+
+    def _forget(self, obj) -> list[tuple[str, str, str]]:
+        """
+        Forgets the name of a city or a place and discounts it from its
+        city, returns its entries
+        """
+        model = model_key(obj.__class__)
+        name = self.names.pop((model, obj.id), None)
+
+        if name is None:
+            return []
+
+        _, parent, entries = name
+
+        if model == "place":
+            self.places[parent] -= 1
+
+            if not self.places[parent]:
+                del self.places[parent]
+
+        return entries
+
+    def _weight(self, model: str, obj_id: str) -> float:
+        """Returns the place count of a city or the score of a place"""
+        if model == "city":
+            return self.places.get(obj_id, 0)
+
+        return bayesian(self.ratings.place(obj_id))
+
+    def _rank(
+        self, model: str, lo: int, hi: int, limit: int
+    ) -> list[tuple[str, str]]:
+        """Returns the best `limit` names of a model in a range"""
+        found = {
+            (entry_model, obj_id)
+            for _, entry_model, obj_id in self.entries[lo:hi]
+            if entry_model == model
+        }
+
+        return [
+            key
+            for *_, key in heapq.nsmallest(
+                limit,
+                (
+                    (
+                        -self._weight(*key),
+                        (self.names[key][0] or "").lower(),
+                        key[1],
+                        key,
+                    )
+                    for key in found
+                ),
+            )
+        ]
+
+    def complete(
+        self, query: str, limit: int, models: tuple[str, ...] = MODELS
+    ) -> dict[str, list[dict]]:
+        """
+        Returns the best `limit` cities and places with a word starting
+        with the query, or with the last words of the query
+        """
+        prefix = normalize(query)
+        matches: dict[str, list[dict]] = {}
+
+        with self.lock:
+            lo = bisect_left(self.entries, (prefix,))
+            hi = bisect_left(self.entries, (prefix + _LAST,))
+
+            for model in models:
+                if hi - lo <= AUTOCOMPLETE_SCAN_LIMIT:
+                    best = self._rank(model, lo, hi, limit)
+                else:
+                    best = self.rankings.get((prefix, model))
+
+                    if best is None:
+                        if len(self.rankings) >= AUTOCOMPLETE_CACHE_SIZE:
+                            self.rankings.clear()
+
+                        best = self.rankings[(prefix, model)] = self._rank(
+                            model, lo, hi, AUTOCOMPLETE_MAX_LIMIT
+                        )
+
+                matches[model] = [self._match(*key) for key in best[:limit]]
+
+        return matches
+
+    def _match(self, model: str, obj_id: str) -> dict:
+        """Returns what the type-ahead shows of a city or a place"""
+        name, parent, _ = self.names[(model, obj_id)]
+
+        if model == "city":
+            return {
+                "id": obj_id,
+                "name": name,
+                "country_code": parent,
+                "places": self.places.get(obj_id, 0),
+            }
+
+        return {
+            "id": obj_id,
+            "name": name,
+            "city_id": parent,
+            "rating": self.ratings.place(obj_id).summary()["mean"],
+        }
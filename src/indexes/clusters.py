@@ -0,0 +1,171 @@
+"""
+Quadtree of the places for map clustering
+
+The nodes of the quadtree are the Web Mercator map tiles: node `(x, y)`
+of zoom `z` covers that tile and its children are the four tiles of zoom
+`z + 1` inside it. Every node keeps how many places it holds and the sum
+of their coordinates, so its count and centroid are known without
+visiting the places. Adding, moving or removing a place updates one node
+per zoom, from the root down to `CLUSTER_MAX_ZOOM`.
+
+A map view is clustered by returning the nodes of a single zoom that
+overlap it, so its cost depends on the size of the view and not on the
+number of places.
+"""
+
+from math import atan, cos, degrees, floor, log, pi, radians, sinh, tan
+from src.indexes import DerivedIndex
+from utils.constants import CLUSTER_MAX_ZOOM
+
+# Latitude limit of the Web Mercator projection
+MAX_LATITUDE = 85.05112878
+
+
+def mercator(lat: float, lon: float) -> tuple[float, float]:
+    """Returns the position of a point on the map, from 0 to 1 each way"""
+    lat = radians(min(MAX_LATITUDE, max(-MAX_LATITUDE, lat)))
+    x = (lon + 180.0) / 360.0
+    y = (1.0 - log(tan(lat) + 1.0 / cos(lat)) / pi) / 2.0
+
+    return min(max(x, 0.0), 1.0), min(max(y, 0.0), 1.0)
+
+
+def tile_bbox(zoom: int, x: int, y: int) -> list[float]:
+    """Returns the [west, south, east, north] of a tile"""
+    size = 1 << zoom
+
+    def latitude(row: int) -> float:
+        """Returns the latitude of the top edge of a row of tiles"""
+        return degrees(atan(sinh(pi * (1 - 2 * row / size))))
+
+    return [
+        x / size * 360.0 - 180.0,
+        latitude(y + 1),
+        (x + 1) / size * 360.0 - 180.0,
+        latitude(y),
+    ]
+
+
+class PlaceClusters(DerivedIndex):
+    """Counts and centroids of the places per map tile, for every zoom"""
+
+    model = "place"
+
+    def __init__(self, repo, max_zoom: int = CLUSTER_MAX_ZOOM) -> None:
+        """Creates the empty quadtree and loads the places"""
+        self.max_zoom = max_zoom
+        # zoom -> (x, y) -> [count, latitude sum, longitude sum]
+        self.levels: list[dict[tuple[int, int], list]] = [
+            {} for _ in range(max_zoom + 1)
+        ]
+        # id -> (x, y of the deepest tile, latitude, longitude)
+        self.places: dict[str, tuple[int, int, float, float]] = {}
+        super().__init__(repo)
+
+    def _tile(self, lat: float, lon: float) -> tuple[int, int]:
+        """Returns the tile of a point at the deepest zoom"""
+        size = 1 << self.max_zoom
+        x, y = mercator(lat, lon)
+
+        return min(size - 1, floor(x * size)), min(size - 1, floor(y * size))
+
+    def add(self, obj) -> None:
+        """Counts a place in the nodes of its position"""
+        lat = getattr(obj, "latitude", None)
+        lon = getattr(obj, "longitude", None)
+
+        if lat is None or lon is None:
+            return
+
+        lat, lon = float(lat), float(lon)
+        x, y = self._tile(lat, lon)
+        self.places[obj.id] = (x, y, lat, lon)
+
+        for zoom, nodes in enumerate(self.levels):
+            shift = self.max_zoom - zoom
+            node = nodes.get((x >> shift, y >> shift))
+
+            if node is None:
+                nodes[(x >> shift, y >> shift)] = [1, lat, lon]
+            else:
+                node[0] += 1
+                node[1] += lat
+                node[2] += lon
+
+    def remove(self, obj) -> None:
+        """Takes a place out of the nodes it was counted in"""
+        position = self.places.pop(obj.id, None)
+
+        if position is None:
+            return
+
+        x, y, lat, lon = position
+
+        for zoom, nodes in enumerate(self.levels):
+            shift = self.max_zoom - zoom
+            key = (x >> shift, y >> shift)
+            node = nodes[key]
+
+            if node[0] == 1:
+                del nodes[key]
+            else:
+                node[0] -= 1
+                node[1] -= lat
+                node[2] -= lon
+
+    def clusters(
+        self, west: float, south: float, east: float, north: float, zoom: int
+    ) -> list[dict]:
+        """
+        Returns the nodes of a zoom (clamped to the deepest one) overlapping
+        a bounding box, with their count and centroid. A box with `west`
+        greater than `east` crosses the antimeridian
+        """
+        zoom = min(max(zoom, 0), self.max_zoom)
+        left, top = mercator(north, west)
+        right, bottom = mercator(south, east)
+        crosses = west > east
+        found = [((0, 0), None)]
+
+        with self.lock:
+            # Descends from the root, only into the nodes that exist and
+            # overlap the box
+            for depth in range(zoom + 1):
+                size = 1 << depth
+                first_x = min(size - 1, floor(left * size))
+                last_x = min(size - 1, floor(right * size))
+                first_y = min(size - 1, floor(top * size))
+                last_y = min(size - 1, floor(bottom * size))
+                nodes = self.levels[depth]
+                children = (
+                    [(0, 0)]
+                    if depth == 0
+                    else [
+                        (2 * x + dx, 2 * y + dy)
+                        for (x, y), _ in found
+                        for dx in (0, 1)
+                        for dy in (0, 1)
+                    ]
+                )
+                found = [
+                    ((x, y), node)
+                    for x, y in children
+                    if first_y <= y <= last_y
+                    and (
+                        (x >= first_x or x <= last_x)
+                        if crosses
+                        else first_x <= x <= last_x
+                    )
+                    and (node := nodes.get((x, y))) is not None
+                ]
+
+            return [
+                {
+                    "tile": f"{zoom}/{x}/{y}",
+                    "bbox": tile_bbox(zoom, x, y),
+                    "count": count,
+                    "latitude": lat_sum / count,
+                    "longitude": lon_sum / count,
+                }
+                for (x, y), (count, lat_sum, lon_sum) in found
+            ]
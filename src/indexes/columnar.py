@@ -0,0 +1,237 @@
+"""
+Columnar copy of the numeric attributes of the places
+
+Every attribute is kept in its own array, row `i` of every array
+belongs to the place `ids[i]`. Range filters are evaluated over whole
+columns as NumPy boolean masks, so filtering a million places takes a
+few vectorized comparisons instead of a million attribute lookups.
+
+Rows are appended in the order the places are added and deleted rows are
+only marked dead, so the matches come out in insertion order without
+sorting. The columns are compacted once half of the rows are dead.
+
+NumPy is optional, without it the columns are stdlib `array`s and the
+same filters run row by row.
+"""
+
+from array import array
+from src.indexes import DerivedIndex
+from src.persistence.query import OPERATORS
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+# Column -> array type code ("q" integers, "d" floats)
+COLUMNS = {
+    "price_per_night": "q",
+    "number_of_rooms": "q",
+    "number_of_bathrooms": "q",
+    "max_guests": "q",
+    "latitude": "d",
+    "longitude": "d",
+}
+
+INITIAL_CAPACITY = 1024
+# Rows scanned at a time looking for the rows of the requested page
+PAGE_SCAN_ROWS = 65536
+
+# NumPy comparisons writing to a reused buffer
+NUMPY_OPERATORS = (
+    {
+        "eq": np.equal,
+        "ne": np.not_equal,
+        "lt": np.less,
+        "lte": np.less_equal,
+        "gt": np.greater,
+        "gte": np.greater_equal,
+    }
+    if np is not None
+    else {}
+)
+
+
+def _column(code: str, capacity: int):
+    """Returns an empty column of the given type"""
+    if np is not None:
+        dtype = {"b": "?", "d": "f8", "q": "i8"}[code]
+        return np.zeros(capacity, dtype=dtype)
+
+    return array(code)
+
+
+def _number(code: str, value) -> int | float:
+    """Converts an attribute to the type of its column"""
+    if code == "d":
+        return float(value or 0.0)
+
+    return int(value or 0)
+
+
+class PlaceColumns(DerivedIndex):
+    """Columnar store of the places, filtered with range predicates"""
+
+    model = "place"
+
+    def __init__(self, repo) -> None:
+        """Creates the empty columns and loads the places"""
+        self._reset(INITIAL_CAPACITY)
+        super().__init__(repo)
+
+    def _reset(self, capacity: int) -> None:
+        """Empties the columns"""
+        # Row -> id, None for the dead rows
+        self.ids: list[str | None] = []
+        self.rows: dict[str, int] = {}
+        self.dead = 0
+        self.alive = _column("b", capacity)
+        self.columns = {
+            field: _column(code, capacity) for field, code in COLUMNS.items()
+        }
+
+    def _append_row(self, obj) -> int:
+        """Adds a row for a new place"""
+        row = len(self.ids)
+        self.ids.append(obj.id)
+        self.rows[obj.id] = row
+
+        if np is None:
+            self.alive.append(1)
+
+            for field, code in COLUMNS.items():
+                self.columns[field].append(0)
+        elif row == len(self.alive):
+            for column in [self.alive, *self.columns.values()]:
+                column.resize(2 * len(column), refcheck=False)
+
+        self.alive[row] = 1
+
+        return row
+
+    def add(self, obj) -> None:
+        """Writes the attributes of a place to its row, adding it if new"""
+        row = self.rows.get(obj.id)
+
+        if row is None:
+            row = self._append_row(obj)
+
+        for field, code in COLUMNS.items():
+            value = _number(code, getattr(obj, field, None))
+            self.columns[field][row] = value
+
+    def update(self, obj) -> None:
+        """Rewrites the row of an updated place"""
+        self.add(obj)
+
+    def remove(self, obj) -> None:
+        """Marks the row of a place dead"""
+        row = self.rows.pop(obj.id, None)
+
+        if row is None:
+            return
+
+        self.alive[row] = 0
+        self.ids[row] = None
+        self.dead += 1
+
+        if self.dead > max(INITIAL_CAPACITY, len(self.ids) // 2):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rewrites the columns without the dead rows"""
+        live = [row for row, obj_id in enumerate(self.ids) if obj_id]
+        ids = [self.ids[row] for row in live]
+        values = {
+            field: [self.columns[field][row] for row in live]
+            for field in COLUMNS
+        }
+
+        self._reset(max(INITIAL_CAPACITY, 2 * len(live)))
+
+        for row, obj_id in enumerate(ids):
+            self.ids.append(obj_id)
+            self.rows[obj_id] = row
+
+        if np is None:
+            self.alive.extend([1] * len(ids))
+
+            for field in COLUMNS:
+                self.columns[field].extend(values[field])
+        else:
+            self.alive[:len(ids)] = True
+
+            for field in COLUMNS:
+                self.columns[field][:len(ids)] = values[field]
+
+    def search(
+        self,
+        conditions: list[tuple[str, str, object]],
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> tuple[int, list[str]]:
+        """
+        Returns how many places meet every (field, op, value) condition
+        and the ids of the `limit` ones from `offset`, in insertion order.
+        The operators are the ones of the query builder: eq, ne, lt, lte,
+        gt, gte and in
+        """
+        end = None if limit is None else offset + limit
+
+        for field, op, _ in conditions:
+            if field not in COLUMNS:
+                raise ValueError(f"Can't search places by {field}")
+            if op not in OPERATORS:
+                raise ValueError(f"Unknown operator: {op}")
+
+        with self.lock:
+            size = len(self.ids)
+
+            if np is None:
+                rows = [row for row in range(size) if self.alive[row]]
+
+                for field, op, value in conditions:
+                    column, compare = self.columns[field], OPERATORS[op]
+                    rows = [i for i in rows if compare(column[i], value)]
+                return len(rows), [self.ids[i] for i in rows[offset:end]]
+
+            mask = self.alive[:size].copy()
+            matches = np.empty(size, dtype=bool)
+
+            for field, op, value in conditions:
+                column = self.columns[field][:size]
+
+                if op == "in":
+                    mask &= np.isin(column, list(value))
+                else:
+                    NUMPY_OPERATORS[op](column, value, out=matches)
+                    mask &= matches
+
+            total = int(np.count_nonzero(mask))
+            rows = self._page_rows(mask, offset, total if end is None else end)
+
+            return total, [self.ids[i] for i in rows]
+
+    @staticmethod
+    def _page_rows(mask, offset: int, end: int) -> list[int]:
+        """
+        Returns the rows from the `offset`th to the `end`th true value of
+        the mask, only looking at the part of the mask they are in
+        """
+        rows: list[int] = []
+        seen = 0
+
+        for start in range(0, len(mask), PAGE_SCAN_ROWS):
+            if seen >= end:
+                break
+
+            chunk = mask[start:start + PAGE_SCAN_ROWS]
+            count = int(np.count_nonzero(chunk))
+
+            if seen + count > offset:
+                found = np.flatnonzero(chunk) + start
+                rows.extend(found[max(offset - seen, 0):end - seen].tolist())
+
+            seen += count
+
+        return rows
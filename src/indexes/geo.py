@@ -0,0 +1,227 @@
+"""
+Grid index of the places by location
+
+The globe is divided into cells of `GEO_CELL_DEGREES` degrees of
+latitude and longitude, and every place is kept in the cell its
+coordinates fall into. A radius or bounding box search only looks at
+the cells that overlap it, measuring the haversine distance of the places
+in those cells, instead of every place.
+
+Longitudes wrap around the antimeridian and searches reaching a pole
+cover every longitude, so searches anywhere on the globe are exact.
+"""
+
+import heapq
+from math import asin, cos, degrees, floor, radians, sin, sqrt
+from src.indexes import DerivedIndex
+from utils.constants import GEO_CELL_DEGREES
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Returns the great circle distance between two points, in km"""
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = (
+        sin((lat2 - lat1) / 2) ** 2
+        + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    )
+
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a)))
+
+
+def _wrap(lon: float) -> float:
+    """Normalizes a longitude to [-180, 180)"""
+    if -180.0 <= lon < 180.0:
+        return lon
+
+    return (lon + 180.0) % 360.0 - 180.0
+
+
+class PlaceGrid(DerivedIndex):
+    """Places bucketed by grid cell, searched by radius or bounding box"""
+
+    model = "place"
+
+    def __init__(self, repo, cell_degrees: float = GEO_CELL_DEGREES) -> None:
+        """Creates the empty grid and loads the places"""
+        self.cell_degrees = cell_degrees
+        self.rows = int(180 // cell_degrees) + 1
+        self.cols = int(360 // cell_degrees)
+        # (row, col) -> {id: (latitude, longitude)}
+        self.cells: dict[tuple[int, int], dict[str, tuple]] = {}
+        # id -> cell
+        self.places: dict[str, tuple[int, int]] = {}
+        super().__init__(repo)
+
+    def _row(self, lat: float) -> int:
+        """Returns the grid row of a latitude"""
+        row = floor((lat + 90.0) / self.cell_degrees)
+
+        return min(self.rows - 1, max(0, row))
+
+    def _col(self, lon: float) -> int:
+        """Returns the grid column of a longitude"""
+        return floor((lon + 180.0) / self.cell_degrees) % self.cols
+
+    def add(self, obj) -> None:
+        """Puts a place in the cell of its coordinates"""
+        lat = getattr(obj, "latitude", None)
+        lon = getattr(obj, "longitude", None)
+
+        if lat is None or lon is None:
+            return
+
+        lat, lon = float(lat), _wrap(float(lon))
+        cell = (self._row(lat), self._col(lon))
+        self.places[obj.id] = cell
+        self.cells.setdefault(cell, {})[obj.id] = (lat, lon)
+
+    def remove(self, obj) -> None:
+        """Takes a place out of its cell"""
+        cell = self.places.pop(obj.id, None)
+
+        if cell is None:
+            return
+
+        places = self.cells[cell]
+        del places[obj.id]
+
+        if not places:
+            del self.cells[cell]
+
+    def _candidates(self, rows: range, cols: list[int] | None):
+        """
+        Yields the (id, (latitude, longitude)) of the places in the given
+        rows and columns (all of them if `cols` is None)
+        """
+        count = len(rows) * (self.cols if cols is None else len(cols))
+
+        # Large areas have fewer occupied cells than cells to look at
+        if count > len(self.cells):
+            wanted = None if cols is None else set(cols)
+
+            for (row, col), places in self.cells.items():
+                if row in rows and (wanted is None or col in wanted):
+                    yield from places.items()
+            return
+
+        for row in rows:
+            for col in range(self.cols) if cols is None else cols:
+                places = self.cells.get((row, col))
+
+                if places:
+                    yield from places.items()
+
+    def _columns(self, west: float, east: float) -> list[int] | None:
+        """
+        Returns the columns from the `west` longitude eastwards to the
+        `east` one (`east` >= `west`, past 180 to cross the antimeridian),
+        None if that is every column
+        """
+        first = floor((west + 180.0) / self.cell_degrees)
+        last = floor((east + 180.0) / self.cell_degrees)
+
+        if last - first + 1 >= self.cols:
+            return None
+
+        return [col % self.cols for col in range(first, last + 1)]
+
+    @staticmethod
+    def _page(
+        matches: list[tuple[float, str]], offset: int, limit: int | None
+    ) -> tuple[int, list[tuple[float, str]]]:
+        """Returns the number of matches and the requested nearest ones"""
+        if limit is None:
+            return len(matches), sorted(matches)[offset:]
+
+        nearest = heapq.nsmallest(offset + limit, matches)
+
+        return len(matches), nearest[offset:]
+
+    def nearby(
+        self,
+        lat: float,
+        lon: float,
+        radius_km: float,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> tuple[int, list[tuple[float, str]]]:
+        """
+        Returns how many places are within `radius_km` of a point and the
+        (distance in km, id) of the `limit` nearest ones from `offset`
+        """
+        lon = _wrap(lon)
+        # Angular radius, in degrees of latitude
+        reach = degrees(radius_km / EARTH_RADIUS_KM)
+        south, north = lat - reach, lat + reach
+        rows = range(self._row(south), self._row(north) + 1)
+
+        if south <= -90.0 or north >= 90.0 or reach >= 90.0:
+            cols = None
+        else:
+            # Widest longitude difference of the circle, reached off the
+            # latitude of the center on a sphere
+            width = degrees(
+                asin(min(1.0, sin(radians(reach)) / cos(radians(lat))))
+            )
+            cols = self._columns(lon - width, lon + width)
+
+        with self.lock:
+            matches = [
+                (distance, place_id)
+                for place_id, (place_lat, place_lon) in self._candidates(
+                    rows, cols
+                )
+                if (
+                    distance := haversine_km(lat, lon, place_lat, place_lon)
+                ) <= radius_km
+            ]
+
+        return self._page(matches, offset, limit)
+
+    def within(
+        self,
+        west: float,
+        south: float,
+        east: float,
+        north: float,
+        offset: int = 0,
+        limit: int | None = None,
+        center: tuple[float, float] | None = None,
+    ) -> tuple[int, list[tuple[float, str]]]:
+        """
+        Returns how many places are inside a bounding box and the
+        (distance in km, id) of the `limit` ones from `offset` nearest to
+        `center`, the center of the box by default. A box with `west`
+        greater than `east` crosses the antimeridian, the longitudes are
+        between -180 and 180
+        """
+        crosses = west > east
+        # East of the box past 180 when it crosses the antimeridian
+        reach = east + 360.0 if crosses else east
+
+        if center is None:
+            center = ((south + north) / 2, _wrap((west + reach) / 2))
+
+        rows = range(self._row(south), self._row(north) + 1)
+        cols = self._columns(west, reach)
+
+        def inside(lat: float, lon: float) -> bool:
+            """Checks if a point is inside the box"""
+            if not south <= lat <= north:
+                return False
+            if crosses:
+                return lon >= west or lon <= east
+            return west <= lon <= east
+
+        with self.lock:
+            matches = [
+                (haversine_km(*center, place_lat, place_lon), place_id)
+                for place_id, (place_lat, place_lon) in self._candidates(
+                    rows, cols
+                )
+                if inside(place_lat, place_lon)
+            ]
+
+        return self._page(matches, offset, limit)
@@ -0,0 +1,140 @@
+"""
+Rankings of the places of every city by their ratings
+
+Every city keeps, per score, the sorted list of the keys of its places
+`(-score, -review count, place id)`, so its best `k` places are the first
+`k` keys of the list. A review change reranks its place, a binary search
+and a move within the list of its city, using the aggregates of
+`src/indexes/ratings.py`, which are updated before.
+
+The scores are:
+
+- bayesian: the mean rating pulled towards `RANKING_PRIOR_MEAN` as if
+  every place had `RANKING_PRIOR_WEIGHT` more reviews of that rating, so
+  a single 5 star review doesn't top a hundred 4.8 star ones
+- count: the number of reviews
+"""
+
+from bisect import bisect_left, insort
+from src.indexes import DerivedIndex, derived_index
+from src.indexes.ratings import RatingAggregates, RatingStats
+from utils.constants import RANKING_PRIOR_MEAN, RANKING_PRIOR_WEIGHT
+
+
+def bayesian(stats: RatingStats) -> float:
+    """Returns the Bayesian average of the ratings"""
+    return (RANKING_PRIOR_MEAN * RANKING_PRIOR_WEIGHT + stats.total) / (
+        RANKING_PRIOR_WEIGHT + stats.count
+    )
+
+
+def review_count(stats: RatingStats) -> float:
+    """Returns the number of ratings"""
+    return stats.count
+
+
+SCORES = {"bayesian": bayesian, "count": review_count}
+
+
+class CityRankings(DerivedIndex):
+    """Places of every city sorted by each score"""
+
+    model = "place"
+
+    def __init__(self, repo) -> None:
+        """Creates the empty rankings and loads the places"""
+        # Built first so its listeners run before the ones of the rankings
+        self.ratings: RatingAggregates = derived_index(RatingAggregates)
+        # place id -> city id
+        self.cities: dict[str, str] = {}
+        # place id -> score -> key in the ranking of its city
+        self.keys: dict[str, dict[str, tuple]] = {}
+        # (score, city id) -> sorted keys
+        self.rankings: dict[tuple[str, str], list[tuple]] = {}
+        # review id -> place id
+        self.reviews: dict[str, str] = {}
+        super().__init__(repo)
+
+        with self.lock:
+            repo.add_listener(self.review_changed)
+
+            for review in repo.get_all("review"):
+                self.reviews[review.id] = review.place_id
+
+    def _rank(self, place_id: str, city_id: str) -> None:
+        """Puts a place in the rankings of a city"""
+        stats = self.ratings.place(place_id)
+        keys = self.keys[place_id] = {}
+        self.cities[place_id] = city_id
+
+        for name, score in SCORES.items():
+            key = keys[name] = (-score(stats), -stats.count, place_id)
+            insort(self.rankings.setdefault((name, city_id), []), key)
+
+    def _unrank(self, place_id: str) -> str | None:
+        """Takes a place out of the rankings of its city, returns the city"""
+        city_id = self.cities.pop(place_id, None)
+
+        for name, key in self.keys.pop(place_id, {}).items():
+            ranking = self.rankings[(name, city_id)]
+            del ranking[bisect_left(ranking, key)]
+
+            if not ranking:
+                del self.rankings[(name, city_id)]
+
+        return city_id
+
+    def add(self, obj) -> None:
+        """Ranks a place in its city"""
+        self._unrank(obj.id)
+        self._rank(obj.id, obj.city_id)
+
+    def remove(self, obj) -> None:
+        """Takes a place out of the rankings"""
+        self._unrank(obj.id)
+
+    def update(self, obj) -> None:
+        """Reranks an updated place, which may have moved to another city"""
+        self.add(obj)
+
+    def review_changed(self, op: str, model: str, objs: list) -> None:
+        """
+        Repository listener, reranks the places whose reviews changed,
+        both the old and the new one of a review moved to another place
+        """
+        if model != "review":
+            return
+
+        with self.lock:
+            places = set()
+
+            for review in objs:
+                places.add(self.reviews.pop(review.id, None))
+
+                if op != "delete":
+                    self.reviews[review.id] = review.place_id
+                    places.add(review.place_id)
+
+            for place_id in places:
+                city_id = self._unrank(place_id)
+
+                if city_id is not None:
+                    self._rank(place_id, city_id)
+
+    def top(
+        self, city_id: str, k: int, score: str = "bayesian"
+    ) -> list[tuple[str, float, int]]:
+        """
+        Returns the (place id, score, review count) of the `k` best places
+        of a city by a score
+        """
+        if score not in SCORES:
+            raise ValueError(f"Unknown score: {score}")
+
+        with self.lock:
+            ranking = self.rankings.get((score, city_id), [])
+
+            return [
+                (place_id, -value, -count)
+                for value, count, place_id in ranking[:k]
+            ]
@@ -0,0 +1,231 @@
+"""
+Running aggregates of the review ratings, per place and per host
+
+Every review adds its rating to the aggregate of its place and to the
+one of the host of the place: count, sum and a histogram of the ratings
+rounded to 1 to 5 stars, the mean being sum / count. Creating, updating
+or deleting a review changes two aggregates in constant time, so showing
+a rating never reads the reviews.
+
+Every change of an aggregate gives it a new `revision`, taken from a
+counter shared by all of them, that the caches of the encoded places and
+their ETags include.
+
+The aggregates live in the memory of the process and are built from the
+reviews when first used. `POST /admin/ratings/repair` (or `python
+manage.py repair-ratings`, which calls it) rebuilds them from scratch in
+the running server and reports the ones that had drifted.
+"""
+
+from datetime import datetime
+from itertools import count
+from src.indexes import DerivedIndex
+
+STARS = (1, 2, 3, 4, 5)
+
+_revisions = count(1)
+
+
+def stars(rating: float) -> int:
+    """Returns the histogram bucket of a rating"""
+    return min(STARS[-1], max(STARS[0], round(rating)))
+
+
+class RatingStats:
+    """Count, sum and histogram of a set of ratings"""
+
+    __slots__ = ("count", "total", "histogram", "revision", "modified")
+
+    def __init__(self) -> None:
+        """Creates an empty aggregate"""
+        self.count = 0
+        self.total = 0.0
+        self.histogram = [0] * len(STARS)
+        self.revision = 0
+        self.modified: datetime | None = None
+
+    def add(self, rating: float, weight: int = 1) -> None:
+        """Adds a rating, or removes it with a weight of -1"""
+        self.count += weight
+        self.total += weight * rating
+        self.histogram[stars(rating) - 1] += weight
+        self.revision = next(_revisions)
+        self.modified = datetime.now()
+
+    def merge(self, other: "RatingStats", weight: int = 1) -> None:
+        """Adds all the ratings of another aggregate, or removes them"""
+        self.count += weight * other.count
+        self.total += weight * other.total
+
+        for star, ratings in enumerate(other.histogram):
+            self.histogram[star] += weight * ratings
+
+        self.revision = next(_revisions)
+        self.modified = datetime.now()
+
+    def same(self, other: "RatingStats") -> bool:
+        """Checks if two aggregates hold the same ratings"""
+        return (
+            self.count == other.count
+            and self.histogram == other.histogram
+            and abs(self.total - other.total) < 1e-6
+        )
+
+    def summary(self) -> dict:
+        """Returns the count and mean"""
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 6) if self.count else None,
+        }
+
+    def to_dict(self) -> dict:
+        """Returns the count, sum, mean and histogram"""
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "mean": round(self.total / self.count, 6) if self.count else None,
+            "histogram": {
+                str(star): ratings
+                for star, ratings in zip(STARS, self.histogram)
+            },
+        }
+
+
+EMPTY = RatingStats()
+
+
+class RatingAggregates(DerivedIndex):
+    """Rating aggregates of every place and every host"""
+
+    model = "review"
+
+    def __init__(self, repo) -> None:
+        """Creates the empty aggregates and loads the reviews"""
+        self._reset()
+        super().__init__(repo)
+        repo.add_listener(self.place_changed)
+
+    def _reset(self) -> None:
+        """Forgets every aggregate"""
+        self.places: dict[str, RatingStats] = {}
+        self.hosts: dict[str, RatingStats] = {}
+        # place id -> host id, for the places with reviews
+        self.place_hosts: dict[str, str | None] = {}
+        # review id -> (place id, rating)
+        self.reviews: dict[str, tuple[str, float]] = {}
+
+    def _host(self, place_id: str) -> str | None:
+        """Returns the host of a place, looked up the first time"""
+        if place_id not in self.place_hosts:
+            place = self.repo.get("place", place_id)
+            self.place_hosts[place_id] = getattr(place, "host_id", None)
+
+        return self.place_hosts[place_id]
+
+    def _count(self, place_id: str, rating: float, weight: int) -> None:
+        """Adds a rating to its place and host, or removes it"""
+        host_id = self._host(place_id)
+
+        for stats, key in ((self.places, place_id), (self.hosts, host_id)):
+            if key is None:
+                continue
+
+            aggregate = stats.get(key)
+
+            if aggregate is None:
+                aggregate = stats[key] = RatingStats()
+
+            aggregate.add(rating, weight)
+
+            if not aggregate.count:
+                del stats[key]
+
+    def add(self, obj) -> None:
+        """Counts the rating of a review"""
+        if obj.rating is None:
+            return
+
+        rating = float(obj.rating)
+        self.reviews[obj.id] = (obj.place_id, rating)
+        self._count(obj.place_id, rating, 1)
+
+    def remove(self, obj) -> None:
+        """Discounts the rating of a review"""
+        review = self.reviews.pop(obj.id, None)
+
+        if review is not None:
+            self._count(*review, -1)
+
+    def update(self, obj) -> None:
+        """Moves the rating of an updated review"""
+        if self.reviews.get(obj.id) == (obj.place_id, obj.rating):
+            return
+
+        self.remove(obj)
+        self.add(obj)
+
+    def place_changed(self, op: str, model: str, objs: list) -> None:
+        """
+        Repository listener, moves the aggregate of a place whose host
+        changed to its new host
+        """
+        if model != "place":
+            return
+
+        with self.lock:
+            for place in objs:
+                if place.id not in self.place_hosts:
+                    continue
+
+                old = self.place_hosts[place.id]
+                new = None if op == "delete" else place.host_id
+                aggregate = self.places.get(place.id)
+
+                if old == new:
+                    continue
+
+                if aggregate is not None:
+                    self._move(aggregate, old, new)
+
+                self.place_hosts[place.id] = new
+
+    def _move(self, aggregate: RatingStats, old, new) -> None:
+        """Moves the ratings of a place from a host to another one"""
+        if old is not None and old in self.hosts:
+            self.hosts[old].merge(aggregate, -1)
+
+            if not self.hosts[old].count:
+                del self.hosts[old]
+
+        if new is not None:
+            self.hosts.setdefault(new, RatingStats()).merge(aggregate)
+
+    def place(self, place_id: str) -> RatingStats:
+        """Returns the aggregate of a place"""
+        return self.places.get(place_id, EMPTY)
+
+    def host(self, host_id: str) -> RatingStats:
+        """Returns the aggregate of a host"""
+        return self.hosts.get(host_id, EMPTY)
+
+    def rebuild(self) -> int:
+        """
+        Rebuilds every aggregate from the reviews, returns how many of
+        them were different
+        """
+        with self.lock:
+            places, hosts = self.places, self.hosts
+            self._reset()
+
+            for review in self.repo.get_all(self.model):
+                self.add(review)
+
+            return _drifted(places, self.places) + _drifted(hosts, self.hosts)
+
+
+def _drifted(old: dict, new: dict) -> int:
+    """Counts the keys whose aggregates differ between two dicts"""
+    return sum(
+        not old.get(key, EMPTY).same(new.get(key, EMPTY))
+        for key in old.keys() | new.keys()
+    )
@@ -0,0 +1,549 @@
+"""
+Full-text index of the places and the reviews, ranked with BM25
+
+The name and description of the places and the comment of the reviews
+are split in lowercase words without accents. Every word has a postings
+list with the documents containing it and how many times, kept in two
+stdlib arrays, and a query scores the documents of its words with BM25.
+
+Documents are numbered in the order they are indexed. A changed or
+deleted document is only marked dead, it keeps its entries in the
+postings until half of the documents are dead and everything is
+renumbered.
+
+With the `file` and `pickle` repositories the index is saved next to
+their snapshot (`data.json.text`, `data.pkl.text`), at most every
+`TEXT_INDEX_SAVE_INTERVAL` seconds and on exit, by a single writer
+thread, and loaded instead of tokenizing every document again when the
+versions of the places and reviews it was built from are the ones of
+the loaded data.
+
+NumPy, when installed, scores the postings as whole arrays.
+"""
+
+import atexit
+from array import array
+from copy import copy
+import logging
+from math import log
+import os
+import pickle
+import re
+import threading
+import time
+import unicodedata
+from src.indexes import DerivedIndex
+from src.persistence.repository import model_key
+from utils.constants import TEXT_INDEX_SAVE_INTERVAL
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Model -> indexed fields
+FIELDS = {"place": ("name", "description"), "review": ("comment",)}
+MODELS = tuple(FIELDS)
+
+# BM25 term frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+
+# Changed with the tokenizer or the layout, older snapshots are rebuilt
+FORMAT = 2
+# Dead documents tolerated before renumbering, at least
+MIN_COMPACT_DEAD = 1024
+# Attributes saved in the snapshots of the index
+SAVED = (
+    "keys",
+    "lengths",
+    "kinds",
+    "words",
+    "postings",
+    "frequencies",
+    "document_words",
+    "offsets",
+    "count",
+    "total_length",
+    "dead",
+)
+# Saved lists, pickled SAVE_CHUNK entries at a time
+CHUNKED = ("keys", "postings")
+SAVE_CHUNK = 4096
+
+_WORD = re.compile(r"\w+")
+_ACCENTS = re.compile(r"[\u0300-\u036f]")
+
+
+def tokenize(text: str) -> list[str]:
+    """Splits a text in lowercase words without accents"""
+    text = unicodedata.normalize("NFKD", text.lower())
+
+    return _WORD.findall(_ACCENTS.sub("", text))
+
+
+def document(obj, model: str) -> str:
+    """Returns the indexed text of an object"""
+    return " ".join(
+        value
+        for value in (getattr(obj, field, None) for field in FIELDS[model])
+        if isinstance(value, str)
+    )
+
+
+class TextIndex(DerivedIndex):
+    """BM25 inverted index of the places and the reviews"""
+
+    def __init__(self, repo) -> None:
+        """Creates the empty index and loads the documents"""
+        self._reset()
+        self.saved_at = 0.0
+        self.skipped = False
+        self.exiting = False
+        # Numbers of the last captured and the last written snapshot
+        self.captured = 0
+        self.written = 0
+        self.write_lock = threading.Lock()
+        # Latest captured snapshot the writer thread hasn't written yet,
+        # a newer one replaces it
+        self.pending: tuple[str, dict, int] | None = None
+        self.wakeup = threading.Condition()
+        self.writer: threading.Thread | None = None
+        super().__init__(repo)
+
+        if repo.snapshot_path():
+            repo.add_snapshot_listener(self.snapshot)
+            atexit.register(self._exit)
+
+    def _reset(self) -> None:
+        """Empties the index"""
+        # Document -> (model, id), None once dead
+        self.keys: list[tuple[str, str] | None] = []
+        self.documents: dict[tuple[str, str], int] = {}
+        # Document -> number of words, 0 once dead
+        self.lengths = array("I")
+        # Document -> position of its model in MODELS
+        self.kinds = array("B")
+        # Word -> word number
+        self.words: dict[str, int] = {}
+        # Word number -> (documents, occurrences in each)
+        self.postings: list[tuple[array, array]] = []
+        # Word number -> live documents containing it
+        self.frequencies = array("I")
+        # Word numbers of every document, from offsets[doc] on
+        self.document_words = array("I")
+        self.offsets = array("Q", [0])
+        self.count = 0
+        self.total_length = 0
+        self.dead = 0
+
+    def load(self) -> None:
+        """Loads the saved index if it is up to date, else builds it"""
+        if self._load_snapshot():
+            return
+
+        for model in MODELS:
+            for obj in self.repo.get_all(model):
+                self.add(obj)
+
+    def changed(self, op: str, model: str, objs: list) -> None:
+        """Repository listener, reindexes the places and reviews"""
+        if model not in FIELDS:
+            return
+
+        with self.lock:
+            for obj in objs:
+                if op == "delete":
+                    self.remove(obj)
+                else:
+                    self.add(obj)
+
+    def add(self, obj) -> None:
+        """Indexes an object, replacing its previous version"""
+        model = model_key(obj.__class__)
+        key = (model, obj.id)
+        self._discard(key)
+        words = tokenize(document(obj, model))
+
+        if not words:
+            return
+
+        occurrences: dict[str, int] = {}
+
+        for word in words:
+            occurrences[word] = occurrences.get(word, 0) + 1
+
+        doc = len(self.keys)
+        self.keys.append(key)
+        self.documents[key] = doc
+        self.lengths.append(len(words))
+        self.kinds.append(MODELS.index(model))
+
+        for word, times in occurrences.items():
+            number = self.words.get(word)
+
+            if number is None:
+                number = self.words[word] = len(self.postings)
+                self.postings.append((array("I"), array("H")))
+                self.frequencies.append(0)
+
+            docs, counts = self.postings[number]
+            docs.append(doc)
+            counts.append(min(times, 0xFFFF))
+            self.frequencies[number] += 1
+            self.document_words.append(number)
+
+        self.offsets.append(len(self.document_words))
+        self.count += 1
+        self.total_length += len(words)
+
+    def remove(self, obj) -> None:
+        """Removes an object from the index"""
+        self._discard((model_key(obj.__class__), obj.id))
+
+    def _discard(self, key: tuple[str, str]) -> None:
+        """Marks the document of an object dead"""
+        doc = self.documents.pop(key, None)
+
+        if doc is None:
+            return
+
+        start, end = self.offsets[doc], self.offsets[doc + 1]
+
+        for number in self.document_words[start:end]:
+            self.frequencies[number] -= 1
+
+        self.keys[doc] = None
+        self.count -= 1
+        self.total_length -= self.lengths[doc]
+        self.lengths[doc] = 0
+        self.dead += 1
+
+        if self.dead > max(MIN_COMPACT_DEAD, len(self.keys) // 2):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Renumbers the live documents, dropping the dead ones"""
+        live = [doc for doc, key in enumerate(self.keys) if key is not None]
+        renumbered = array("i", [-1]) * len(self.keys)
+
+        for new, doc in enumerate(live):
+            renumbered[doc] = new
+
+        for number, (docs, counts) in enumerate(self.postings):
+            kept = [
+                (renumbered[doc], times)
+                for doc, times in zip(docs, counts)
+                if renumbered[doc] >= 0
+            ]
+            # New arrays, a snapshot may be written from the old ones
+            self.postings[number] = (
+                array("I", (doc for doc, _ in kept)),
+                array("H", (times for _, times in kept)),
+            )
+
+        document_words, offsets = array("I"), array("Q", [0])
+
+        for doc in live:
+            start, end = self.offsets[doc], self.offsets[doc + 1]
+            document_words.extend(self.document_words[start:end])
+            offsets.append(len(document_words))
+
+        self.keys = [self.keys[doc] for doc in live]
+        self.documents = {key: doc for doc, key in enumerate(self.keys)}
+        self.lengths = array("I", (self.lengths[doc] for doc in live))
+        self.kinds = array("B", (self.kinds[doc] for doc in live))
+        self.document_words, self.offsets = document_words, offsets
+        self.dead = 0
+
+    def search(
+        self,
+        query: str,
+        offset: int = 0,
+        limit: int | None = None,
+        models: tuple[str, ...] = MODELS,
+    ) -> tuple[int, list[tuple[float, str, str]]]:
+        """
+        Returns how many documents of the models contain any word of the
+        query and the (score, model, id) of the `limit` best ones from
+        `offset`, best first
+        """
+        kinds = [MODELS.index(model) for model in models]
+        end = None if limit is None else offset + limit
+
+        with self.lock:
+            numbers = {
+                self.words[word]
+                for word in tokenize(query)
+                if word in self.words
+            }
+
+            if not numbers or not self.count:
+                return 0, []
+
+            if np is None:
+                total, best = self._scores(numbers, kinds, end)
+            else:
+                total, best = self._numpy_scores(numbers, kinds, end)
+
+            return total, [
+                (score, *self.keys[doc]) for score, doc in best[offset:end]
+            ]
+
+    def _weight(self, number: int) -> float:
+        """Returns the inverse document frequency of a word"""
+        frequency = self.frequencies[number]
+
+        return log(1 + (self.count - frequency + 0.5) / (frequency + 0.5))
+
+    def _scores(
+        self, numbers: set[int], kinds: list[int], end: int | None
+    ) -> tuple[int, list[tuple[float, int]]]:
+        """Scores the documents one posting at a time"""
+        average = self.total_length / self.count
+        scores: dict[int, float] = {}
+
+        for number in numbers:
+            idf = self._weight(number)
+            docs, counts = self.postings[number]
+
+            for doc, times in zip(docs, counts):
+                length = self.lengths[doc]
+
+                if not length or self.kinds[doc] not in kinds:
+                    continue
+
+                norm = K1 * (1 - B + B * length / average)
+                scores[doc] = scores.get(doc, 0.0) + idf * times * (K1 + 1) / (
+                    times + norm
+                )
+
+        ranked = sorted((-score, doc) for doc, score in scores.items())
+
+        return len(scores), [
+            (-score, doc) for score, doc in ranked[:end]
+        ]
+
+    def _numpy_scores(
+        self, numbers: set[int], kinds: list[int], end: int | None
+    ) -> tuple[int, list[tuple[float, int]]]:
+        """Scores the documents of every posting as whole arrays"""
+        average = self.total_length / self.count
+        lengths = np.frombuffer(self.lengths, dtype=np.uintc)
+        document_kinds = np.frombuffer(self.kinds, dtype=np.uint8)
+        found, weights = [], []
+
+        for number in numbers:
+            docs, counts = self.postings[number]
+            docs = np.frombuffer(docs, dtype=np.uintc)
+            counts = np.frombuffer(counts, dtype=np.ushort).astype(float)
+            length = lengths[docs]
+            live = length > 0
+
+            if len(kinds) < len(MODELS):
+                live &= np.isin(document_kinds[docs], kinds)
+
+            norm = K1 * (1 - B + B * length[live] / average)
+            found.append(docs[live])
+            weights.append(
+                self._weight(number)
+                * counts[live]
+                * (K1 + 1)
+                / (counts[live] + norm)
+            )
+
+        # Views of the arrays block their growth until released
+        del lengths, document_kinds, docs, counts
+
+        if len(found) == 1:
+            docs, scores = found[0], weights[0]
+        else:
+            docs, inverse = np.unique(
+                np.concatenate(found), return_inverse=True
+            )
+            scores = np.bincount(inverse, weights=np.concatenate(weights))
+
+        total = len(docs)
+
+        if end is not None and 0 < end < total:
+            # Keeps the ties of the last one, ranked by document below
+            threshold = np.partition(scores, total - end)[total - end]
+            best = scores >= threshold
+            docs, scores = docs[best], scores[best]
+
+        order = np.lexsort((docs, -scores))[:end]
+
+        return total, list(zip(scores[order].tolist(), docs[order].tolist()))
+
+    def _fingerprint(self) -> tuple:
+        """
+        Returns what identifies the data the index was built from, the
+        versions of its models, which change with every write and are
+        saved with the snapshots of the repository
+        """
+        return (
+            FORMAT,
+            FIELDS,
+            *(self.repo.version(model)[0] for model in MODELS),
+        )
+
+    def _load_snapshot(self) -> bool:
+        """Loads the saved index, if it was built from the current data"""
+        path = self.repo.snapshot_path()
+
+        if not path:
+            return False
+
+        try:
+            with open(f"{path}.text", "rb") as file:
+                state = pickle.load(file)
+
+                if state.pop("fingerprint", None) != self._fingerprint():
+                    return False
+
+                for name, size in state.pop("chunked").items():
+                    values: list = []
+
+                    while len(values) < size:
+                        values.extend(pickle.load(file))
+
+                    state[name] = values
+        except (
+            OSError,
+            EOFError,
+            pickle.UnpicklingError,
+            ValueError,
+            AttributeError,
+        ):
+            return False
+
+        vars(self).update(state)
+        self.documents = {
+            key: doc for doc, key in enumerate(self.keys) if key is not None
+        }
+
+        return True
+
+    def _capture(self) -> tuple[dict, int]:
+        """
+        Copies what is saved of the index, with the fingerprint of the
+        data, so it can be written while the index keeps changing.
+        Returns it with its number, later captures get higher ones
+        """
+        with self.lock:
+            state = {name: copy(getattr(self, name)) for name in SAVED}
+            # Postings only grow until compacting replaces them, their
+            # length now is enough to write them as they are now
+            state["postings"] = [
+                (docs, counts, len(docs)) for docs, counts in self.postings
+            ]
+            state["fingerprint"] = self._fingerprint()
+            self.captured += 1
+            self.saved_at = time.monotonic()
+            self.skipped = False
+
+            return state, self.captured
+
+    def _write(self, path: str, state: dict, number: int) -> None:
+        """Writes a captured state, unless a later one was written"""
+        with self.write_lock:
+            if number < self.written:
+                return
+
+            tmp_filename = f"{path}.text.tmp"
+            header = {
+                name: value
+                for name, value in state.items()
+                if name not in CHUNKED
+            }
+            header["chunked"] = {name: len(state[name]) for name in CHUNKED}
+
+            with open(tmp_filename, "wb") as file:
+                pickle.dump(header, file, pickle.HIGHEST_PROTOCOL)
+
+                # Pickled a piece at a time, a single call would hold the
+                # GIL, and so every other thread, for the whole dump
+                for name in CHUNKED:
+                    values = state[name]
+
+                    for start in range(0, len(values), SAVE_CHUNK):
+                        chunk = values[start:start + SAVE_CHUNK]
+
+                        if name == "postings":
+                            chunk = [
+                                (docs[:size], counts[:size])
+                                for docs, counts, size in chunk
+                            ]
+
+                        pickle.dump(chunk, file, pickle.HIGHEST_PROTOCOL)
+
+            os.replace(tmp_filename, f"{path}.text")
+            self.written = number
+
+    def save(self, path: str) -> None:
+        """Saves the index next to the snapshot of the repository"""
+        self._write(path, *self._capture())
+
+    def snapshot(self, path: str) -> None:
+        """
+        Repository snapshot listener, saves the index unless it was saved
+        less than `TEXT_INDEX_SAVE_INTERVAL` seconds ago. The repository
+        holds its lock while calling it, so the index is only copied here
+        and written from another thread
+        """
+        if self.exiting:
+            # No thread would be waited for anymore
+            self.save(path)
+            return
+
+        if time.monotonic() - self.saved_at < TEXT_INDEX_SAVE_INTERVAL:
+            self.skipped = True
+            return
+
+        pending = (path, *self._capture())
+
+        with self.wakeup:
+            self.pending = pending
+
+            if self.writer is None:
+                # Daemon, the pending snapshot is written by `_exit`
+                self.writer = threading.Thread(
+                    target=self._write_pending,
+                    name="text-index-save",
+                    daemon=True,
+                )
+                self.writer.start()
+
+            self.wakeup.notify()
+
+    def _write_pending(self) -> None:
+        """Writer thread, writes the latest captured snapshot"""
+        while True:
+            with self.wakeup:
+                while self.pending is None:
+                    self.wakeup.wait()
+
+                pending, self.pending = self.pending, None
+
+            try:
+                self._write(*pending)
+            except OSError:
+                logger.exception("Text index save failed")
+
+    def _exit(self) -> None:
+        """
+        Saves the skipped or not yet written snapshot on exit. Runs
+        before the repository writes its pending changes, which are then
+        saved too
+        """
+        self.exiting = True
+
+        with self.wakeup:
+            pending, self.pending = self.pending, None
+
+        if self.skipped:
+            self.save(self.repo.snapshot_path())
+        elif pending:
+            self._write(*pending)
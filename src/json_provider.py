@@ -0,0 +1,72 @@
+"""
+JSON provider of the Flask app
+
+Encodes with orjson when it is installed and falls back to the
+standard library encoder otherwise, the output is the same JSON either
+way: keys are sorted and the values orjson can't encode natively go
+through Flask's `default` (datetimes become HTTP dates, decimals and
+UUIDs strings...).
+"""
+
+from typing import Any
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider using orjson when available"""
+
+    def _options(self) -> int:
+        """Returns the orjson options matching the provider settings"""
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+
+        return options
+
+    def encode(self, obj: Any, options: int = 0) -> bytes:
+        """Serializes data as JSON bytes"""
+        if orjson is None:
+            return super().dumps(obj).encode()
+
+        try:
+            return orjson.dumps(
+                obj, default=self.default, option=self._options() | options
+            )
+        except TypeError:
+            # Integers over 64 bits and other values orjson refuses
+            return super().dumps(obj).encode()
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serializes data as JSON, the stdlib handles `json` arguments"""
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+
+        return self.encode(obj).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        """Deserializes data as JSON"""
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Serializes the arguments as JSON in a response"""
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        options = 0
+
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            options = orjson.OPT_INDENT_2
+
+        return self._app.response_class(
+            self.encode(obj, options) + b"\n", mimetype=self.mimetype
+        )
@@ -33,15 +33,6 @@ class Amenity(Base):
         """Dummy repr"""
         return f"<Amenity {self.id} ({self.name})>"
 
-    def to_dict(self) -> dict:
-        """Dictionary representation of the object"""
-        return {
-            "id": self.id,
-            "name": self.name,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
-        }
-
     @staticmethod
     def create(data: dict) -> "Amenity":
         """Create a new amenity"""
@@ -96,31 +87,16 @@ class PlaceAmenity(Base):
         """Dummy repr"""
         return f"<PlaceAmenity ({self.place_id} - {self.amenity_id})>"
 
-    def to_dict(self) -> dict:
-        """Dictionary representation of the object"""
-        return {
-            "id": self.id,
-            "place_id": self.place_id,
-            "amenity_id": self.amenity_id,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
-        }
-
     @staticmethod
     def get(place_id: str, amenity_id: str) -> "PlaceAmenity | None":
         """Get a PlaceAmenity object by place_id and amenity_id"""
         from src.persistence import repo
 
-        place_amenities: list[PlaceAmenity] = repo.get_all("placeamenity")
-
-        for place_amenity in place_amenities:
-            if (
-                place_amenity.place_id == place_id
-                and place_amenity.amenity_id == amenity_id
-            ):
-                return place_amenity
+        place_amenities: list[PlaceAmenity] = repo.find_by(
+            "placeamenity", place_id=place_id, amenity_id=amenity_id
+        )
 
-        return None
+        return place_amenities[0] if place_amenities else None
 
     @staticmethod
     def create(data: dict) -> "PlaceAmenity":
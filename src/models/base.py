@@ -5,6 +5,7 @@ from datetime import datetime
 from typing import Any, Optional
 import uuid
 from abc import ABC, abstractmethod
+from src.models.serializer import serializer
 
 
 class Base(ABC):
@@ -30,13 +31,15 @@ class Base(ABC):
 
         if kwargs:
             for key, value in kwargs.items():
-                if hasattr(self, key):
+                # Methods are kept, the columns are class attributes too
+                if callable(getattr(type(self), key, None)):
                     continue
                 setattr(self, key, value)
 
+        now = datetime.now()
         self.id = str(id or uuid.uuid4())
-        self.created_at = created_at or datetime.now()
-        self.updated_at = updated_at or datetime.now()
+        self.created_at = created_at or now
+        self.updated_at = updated_at or now
 
     @classmethod
     def get(cls, id) -> "Any | None":
@@ -63,6 +66,27 @@ class Base(ABC):
 
         return repo.get_all(text(cls.__name__))
 
+    @classmethod
+    def find_by(cls, **criteria) -> list["Any"]:
+        """
+        This is a common method to get all objects of a class
+        whose fields equal the given values, using the repository
+        secondary indexes when there is one for those fields
+        """
+        from src.persistence import repo
+
+        return repo.find_by(cls.__name__.lower(), **criteria)
+
+    @classmethod
+    def query(cls) -> "Query":
+        """
+        This is a common method to start a query over the objects
+        of a class, see src/persistence/query.py
+        """
+        from src.persistence.query import Query
+
+        return Query(cls.__name__.lower())
+
     @classmethod
     def delete(cls, id) -> bool:
         """
@@ -81,9 +105,13 @@ class Base(ABC):
 
         return repo.delete(obj)
 
-    @abstractmethod
     def to_dict(self) -> dict:
-        """Returns the dictionary representation of the object"""
+        """
+        Returns the dictionary representation of the object, made of
+        its columns by the serializer generated for its class
+        (see src/models/serializer.py)
+        """
+        return serializer(type(self))(self)
 
     @staticmethod
     @abstractmethod
@@ -37,16 +37,6 @@ class City(Base):
         """Dummy repr"""
         return f"<City {self.id} ({self.name})>"
 
-    def to_dict(self) -> dict:
-        """Dictionary representation of the object"""
-        return {
-            "id": self.id,
-            "name": self.name,
-            "country_code": self.country_code,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
-        }
-
     @staticmethod
     def create(data: dict) -> "City":
         """Create a new city"""
@@ -1,8 +1,12 @@
 """
 Country related functionality
 """
+from collections.abc import Mapping
+from types import MappingProxyType
 from sqlalchemy import Column, String
+from src.models.serializer import serializer
 from src.persistence.db import DBRepository
+from utils.countries import ISO_3166
 
 db = DBRepository
 
@@ -10,9 +14,11 @@ class Country:
     """
     Country representation
 
-    This class does NOT inherit from Base, you can't delete or update a country
+    This class does NOT inherit from Base, you can't create, delete or
+    update a country
 
-    This class is used to get and list countries
+    This class is used to get and list the countries of ISO 3166, from a
+    table built once and shared by every repository
     """
 
     name: str
@@ -20,6 +26,10 @@ class Country:
     cities: list
 
     __tablename__ = "country"
+
+    # Left out of to_dict, see src/models/serializer.py
+    serialize_exclude = ("cities",)
+    record_exclude = ("cities",)
     
     name = Column(String(256), unique=True, nullable=False)
     code = Column(String(2), primary_key=True, nullable=False)
@@ -37,35 +47,21 @@ class Country:
 
     def to_dict(self) -> dict:
         """Returns the dictionary representation of the country"""
-        return {
-            "name": self.name,
-            "code": self.code,
-        }
+        return serializer(Country)(self)
 
     @staticmethod
     def get_all() -> list["Country"]:
         """Get all countries"""
-        from src.persistence import repo
-
-        countries: list["Country"] = repo.get_all("country")
-
-        return countries
+        return list(COUNTRIES.values())
 
     @staticmethod
     def get(code: str) -> "Country | None":
         """Get a country by its code"""
-        for country in Country.get_all():
-            if country.code == code:
-                return country
-        return None
-
-    @staticmethod
-    def create(name: str, code: str) -> "Country":
-        """Create a new country"""
-        from src.persistence import repo
-
-        country = Country(name, code)
+        return COUNTRIES.get(code)
 
-        repo.save(country)
 
-        return country
+# Built once, a lookup never goes to the repository, which is only seeded
+# with the same countries (see utils/populate.py)
+COUNTRIES: Mapping[str, Country] = MappingProxyType(
+    {code: Country(name, code) for code, name in ISO_3166}
+)
@@ -3,7 +3,9 @@ Place related functionality
 """
 
 import uuid, os
+from datetime import datetime
 from src.models.base import Base
+from src.models.serializer import serializer
 from src.models.city import City
 from src.models.user import User
 from sqlalchemy import Column, String, Float, DateTime, func, ForeignKey, Integer
@@ -31,6 +33,9 @@ class Place(repo):
     
     __tablename__ = "Places"
 
+    # Listings of places also show the ratings of their reviews
+    version_dependencies = ("review",)
+
     id = Column(String(36), primary_key=True)
     name = Column(String(255), nullable=False)
     description = Column(String(420), nullable=False)
@@ -69,23 +74,29 @@ class Place(repo):
         """Dummy repr"""
         return f"<Place {self.id} ({self.name})>"
 
+    def rating(self):
+        """Returns the aggregate of the ratings of the place"""
+        from src.indexes import derived_index
+        from src.indexes.ratings import RatingAggregates
+
+        return derived_index(RatingAggregates).place(self.id)
+
+    def derived_version(self) -> tuple[int, datetime | None]:
+        """
+        Returns the revision and last change of the rating of the place,
+        which `to_dict` includes but doesn't change `updated_at`
+        """
+        rating = self.rating()
+
+        return rating.revision, rating.modified
+
     def to_dict(self) -> dict:
-        """Dictionary representation of the object"""
-        return {
-            "id": self.id,
-            "name": self.name,
-            "description": self.description,
-            "address": self.address,
-            "latitude": self.latitude,
-            "longitude": self.longitude,
-            "city_id": self.city_id,
-            "host_id": self.host_id,
-            "price_per_night": self.price_per_night,
-            "number_of_rooms": self.number_of_rooms,
-            "number_of_bathrooms": self.number_of_bathrooms,
-            "max_guests": self.max_guests,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
+        """
+        Returns the dictionary representation of the place, with the
+        count and mean of its ratings
+        """
+        return serializer(type(self))(self) | {
+            "rating": self.rating().summary()
         }
 
     @staticmethod
@@ -119,7 +130,7 @@ class Place(repo):
         if not place:
             return None
 
-        if data.user_id != place.host_id:
+        if data.get("user_id") != place.host_id:
             raise ValueError("Cannot update place details for other users")
         
         for key, value in data.items():
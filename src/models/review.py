@@ -27,7 +27,7 @@ class Review(Base):
     place_id = Column(String(36), ForeignKey("place.id"), nullable=False)
     user_id = Column(String(36), ForeignKey("user.id"), nullable=False)
     comment = Column(String(420), nullable=False)
-    ratng = Column(Float(), nullable=False)
+    rating = Column(Float(), nullable=False)
     created_at = Column(DateTime, default=func.current_timestamp())
     updated_at = Column(DateTime, onupdate=func.current_timestamp())
 
@@ -46,18 +46,6 @@ class Review(Base):
         """Dummy repr"""
         return f"<Review {self.id} - '{self.comment[:25]}...'>"
 
-    def to_dict(self) -> dict:
-        """Dictionary representation of the object"""
-        return {
-            "id": self.id,
-            "place_id": self.place_id,
-            "user_id": self.user_id,
-            "comment": self.comment,
-            "rating": self.rating,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
-        }
-
     @staticmethod
     def create(data: dict) -> "Review":
         """Create a new review"""
@@ -73,7 +61,7 @@ class Review(Base):
         if not place:
             raise ValueError(f"Place with ID {data['place_id']} not found")
 
-        if data.user_id == place.host_id:
+        if data["user_id"] == place.host_id:
             raise ValueError("Cannot review own place")
         
         new_review = Review(**data)
@@ -92,7 +80,7 @@ class Review(Base):
         if not review:
             raise ValueError("Review not found")
     
-        if data.user_id != review.user_id:       #Checks if og poster is the new poster
+        if data.get("user_id") != review.user_id:       #Checks if og poster is the new poster
             raise ValueError("Review cannot be edited by a different poster")
 
         for key, value in data.items():
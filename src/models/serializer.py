@@ -0,0 +1,98 @@
+"""
+This module builds the `to_dict` serializer of every model
+
+The serializer of a model is generated once, the first time it is
+needed, from its `Column` declarations: a single function returning a
+dict literal of the column attributes, minus the ones listed in the
+`serialize_exclude` attribute of the model. Datetimes are formatted with
+a cached `isoformat`, an object's timestamps rarely change between two
+reads.
+
+`record` is the same kind of function for the repositories that store
+dicts, it keeps the excluded columns and only leaves out the ones in
+`record_exclude`, which the instances don't have.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable
+from sqlalchemy import Column, DateTime
+
+_serializers: dict[type, Callable[[object], dict]] = {}
+_records: dict[type, Callable[[object], dict]] = {}
+
+
+@lru_cache(maxsize=65536)
+def _cached_isoformat(value: datetime) -> str:
+    """Formats a datetime, remembering the recent ones"""
+    return value.isoformat()
+
+
+def isoformat(value: datetime | None) -> str | None:
+    """Formats a datetime as ISO 8601, keeps None as is"""
+    if value is None:
+        return None
+
+    return _cached_isoformat(value)
+
+
+def columns(cls: type) -> dict[str, Column]:
+    """Returns the columns declared by a class, in declaration order"""
+    return {
+        name: column
+        for klass in reversed(cls.__mro__)
+        for name, column in vars(klass).items()
+        if isinstance(column, Column)
+    }
+
+
+def compile_serializer(
+    cls: type, exclude: tuple[str, ...] = ()
+) -> Callable[[object], dict]:
+    """Generates the serializer of a model from its columns"""
+    items = []
+
+    for name, column in columns(cls).items():
+        if name in exclude:
+            continue
+
+        if isinstance(column.type, DateTime):
+            items.append(f"{name!r}: isoformat(obj.{name})")
+        else:
+            items.append(f"{name!r}: obj.{name}")
+
+    source = f"def to_dict(obj):\n    return {{{', '.join(items)}}}\n"
+    namespace = {"isoformat": isoformat}
+
+    exec(compile(source, f"<{cls.__name__} serializer>", "exec"), namespace)
+
+    return namespace["to_dict"]
+
+
+def serializer(cls: type) -> Callable[[object], dict]:
+    """Returns the serializer of a model, generating it the first time"""
+    to_dict = _serializers.get(cls)
+
+    if to_dict is None:
+        to_dict = _serializers[cls] = compile_serializer(
+            cls, getattr(cls, "serialize_exclude", ())
+        )
+
+    return to_dict
+
+
+def record(obj) -> dict:
+    """
+    Returns every column of an object, excluded ones included, as the
+    repositories store it. Unlike `to_dict` it never holds more than
+    the columns
+    """
+    cls = type(obj)
+    to_record = _records.get(cls)
+
+    if to_record is None:
+        to_record = _records[cls] = compile_serializer(
+            cls, getattr(cls, "record_exclude", ())
+        )
+
+    return to_record(obj)
@@ -2,21 +2,23 @@
 User related functionality
 """
 
-import os
 from src.models.base import Base
 from sqlalchemy import Column, String, Boolean, DateTime, func
 from flask_bcrypt import Bcrypt as bcrypt
 
-if os.getenv("REPOSITORY_ENV_VAR") == "db":
-    from src.persistence.db import DBRepository
-    repo = DBRepository()
-else:
-    repo = Base
+
+def normalize_email(email: str) -> str:
+    """Returns the email as stored, trimmed and lowercase"""
+    return email.strip().lower()
+
 
 class User(Base):
     """User representation"""
 
     __tablename__ = "User"  # Ensure this matches your actual table name
+
+    # Left out of to_dict, see src/models/serializer.py
+    serialize_exclude = ("password_hash", "is_admin")
     
     id = Column(String(36), primary_key=True)
     email = Column(String(120), unique=True, nullable=False)
@@ -30,6 +32,8 @@ class User(Base):
     def __init__(self, email: str, first_name: str, last_name: str, **kw):
         """Initialize the user"""
         super().__init__(**kw)
+        # Stored by every backend, the column default isn't applied here
+        self.is_admin = kw.get("is_admin", False)
         self.email = email
         self.first_name = first_name
         self.last_name = last_name
@@ -38,38 +42,52 @@ class User(Base):
         """Representation of the user"""
         return f"<User {self.id} ({self.email})>"
 
-    def to_dict(self) -> dict:
-        """Dictionary representation of the object"""
-        return {
-            "id": self.id,
-            "email": self.email,
-            "first_name": self.first_name,
-            "last_name": self.last_name,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
-        }
-        
-    def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
-        
-    def check_password(self, password: str):
-        return bcrypt.check_password_hash(self.password_hash, password)
+    def set_password(self, password: str) -> None:
+        """Stores the hash of a new password"""
+        self.password_hash = bcrypt().generate_password_hash(
+            password
+        ).decode("utf-8")
+
+    def check_password(self, password: str) -> bool:
+        """Checks a password against the stored hash"""
+        # Without a password the class attribute, the column, is read
+        password_hash = getattr(self, "password_hash", None)
+
+        if not isinstance(password_hash, str):
+            return False
+
+        try:
+            return bcrypt().check_password_hash(password_hash, password)
+        except ValueError:
+            # Not a bcrypt hash, like the "!" of users without a password
+            return False
+
+    @staticmethod
+    def get_by_email(email: str) -> "User | None":
+        """
+        Get a user by email, through the unique index of the emails
+        every repository keeps
+        """
+        users: list[User] = User.find_by(email=normalize_email(email))
+
+        return users[0] if users else None
 
     @staticmethod
     def create(user_data: dict) -> "User":
         """Create a new user"""
-        # users: list["User"] = repo.get_all(User)
+        from src.persistence import repo
+
+        email = normalize_email(user_data["email"])
 
-        # for u in users:
-        #     if u.email == user_data["email"]:
-        #         raise ValueError("User already exists")
+        if User.get_by_email(email):
+            raise ValueError("User already exists")
 
         new_user = User(
-            email=user_data["email"],
+            email=email,
             first_name=user_data["first_name"],
             last_name=user_data["last_name"],
-            password_hash=bcrypt().generate_password_hash(user_data["password"]).decode('utf-8')
         )
+        new_user.set_password(user_data["password"])
 
         repo.save(new_user)
 
@@ -78,19 +96,28 @@ class User(Base):
     @staticmethod
     def update(user_id: str, data: dict) -> "User | None":
         """Update an existing user"""
-        user: User | None = repo.get(User, user_id)
+        from src.persistence import repo
+
+        user: User | None = User.get(user_id)
 
         if not user:
             return None
 
         if "email" in data:
-            user.email = data["email"]
+            email = normalize_email(data["email"])
+            owner = User.get_by_email(email)
+
+            # Checked before changing the user, which may be the stored one
+            if owner and owner.id != user.id:
+                raise ValueError("User already exists")
+
+            user.email = email
         if "first_name" in data:
             user.first_name = data["first_name"]
         if "last_name" in data:
             user.last_name = data["last_name"]
         if "password" in data:
-            user.password_hash = bcrypt.generate_password_hash(data["password"]).decode('utf-8')
+            user.set_password(data["password"])
 
         repo.update(user)
 
@@ -3,6 +3,12 @@ to be used based on the environment variable REPOSITORY_ENV_VAR."""
 
 import os
 from dotenv import load_dotenv
+from utils.constants import (
+    CACHE_MAX_ENTRIES,
+    CACHE_TTL,
+    FLUSH_DIRTY_THRESHOLD,
+    FLUSH_INTERVAL,
+)
 
 load_dotenv()
 
@@ -11,6 +17,21 @@ from src.persistence.repository import Repository
 
 repo: Repository
 
+# Used by the file backed repositories, see src/persistence/flusher.py
+flush_options = {
+    "durability": os.getenv("FILE_STORAGE_DURABILITY", "sync"),
+    "flush_interval": float(os.getenv("FILE_FLUSH_INTERVAL", FLUSH_INTERVAL)),
+    "flush_threshold": int(
+        os.getenv("FILE_FLUSH_THRESHOLD", FLUSH_DIRTY_THRESHOLD)
+    ),
+}
+
+# The in-memory backends store slotted objects, see src/persistence/compact.py
+compact_entities = os.getenv("COMPACT_ENTITIES", "true").lower() in (
+    "1",
+    "true",
+)
+
 if os.getenv("REPOSITORY_ENV_VAR") == "db":
     from src.persistence.db import DBRepository
 
@@ -18,14 +39,33 @@ if os.getenv("REPOSITORY_ENV_VAR") == "db":
 elif os.getenv("REPOSITORY_ENV_VAR") == "file":
     from src.persistence.file import FileRepository
 
-    repo = FileRepository()
+    repo = FileRepository(
+        journal=os.getenv("FILE_STORAGE_MODE") == "journal",
+        compact=compact_entities,
+        **flush_options,
+    )
 elif os.getenv("REPOSITORY_ENV_VAR") == "pickle":
     from src.persistence.pickled import PickleRepository
 
-    repo = PickleRepository()
+    repo = PickleRepository(compact=compact_entities, **flush_options)
+elif os.getenv("REPOSITORY_ENV_VAR") == "sqlite":
+    from src.persistence.sqlite import SQLiteRepository
+
+    repo = SQLiteRepository()
 else:
     from src.persistence.memory import MemoryRepository
 
-    repo = MemoryRepository()
+    repo = MemoryRepository(compact=compact_entities)
 
 print(f"Using {repo.__class__.__name__} as repository")
+
+# Reads can be cached in front of any of them, see src/persistence/cached.py
+if os.getenv("REPOSITORY_CACHE", "").lower() in ("1", "true"):
+    from src.persistence.cached import CachedRepository
+
+    repo = CachedRepository(
+        repo,
+        max_entries=int(os.getenv("CACHE_MAX_ENTRIES", CACHE_MAX_ENTRIES)),
+        ttl=float(os.getenv("CACHE_TTL", CACHE_TTL)),
+    )
+    print(f"Caching its reads with {repo!r}")
@@ -0,0 +1,274 @@
+"""
+This module exports a Repository that caches the reads of another one
+
+```
+repo = CachedRepository(SQLiteRepository(), max_entries=10000, ttl=30)
+```
+
+- `get`, `get_all`, `find_by` and `query` results are kept in a size
+  bounded LRU cache, optionally expiring `ttl` seconds after being read
+  from the backend
+- Saving, updating or deleting an object drops the cached `get` of that
+  object and the cached collections of its model, nothing else
+- Everything else is passed to the backend as is
+
+The cache lives in the process, changes made to a shared database by
+other processes are only seen once the entries expire.
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+import threading
+import time
+from src.persistence.repository import Repository, model_key, object_key
+from utils.constants import CACHE_MAX_ENTRIES, CACHE_TTL
+
+# Cached collection results start with one of these
+COLLECTION_KINDS = ("get_all", "find_by", "query")
+
+
+def _hashable(value):
+    """Converts the lists of `in` conditions to tuples"""
+    if isinstance(value, (list, set)):
+        return tuple(value)
+
+    return value
+
+
+class CachedRepository(Repository):
+    """Read-through LRU cache in front of a Repository"""
+
+    def __init__(
+        self,
+        backend: Repository,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        ttl: float = CACHE_TTL,
+    ) -> None:
+        """
+        Wraps the backend. The entries don't expire if `ttl` is 0,
+        the least recently used ones are evicted past `max_entries`
+        """
+        self.backend = backend
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (expiry time, value), in least recently used order
+        self._entries: OrderedDict[tuple, tuple[float, object]] = (
+            OrderedDict()
+        )
+        # model -> keys of its cached collections
+        self._collections: dict[str, set[tuple]] = {}
+        # model -> invalidations count, a read that raced with a change
+        # of its model isn't cached
+        self._generations: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __repr__(self) -> str:
+        """Shows the wrapped backend"""
+        return f"CachedRepository({self.backend.__class__.__name__})"
+
+    def __getattr__(self, name: str):
+        """Passes anything else (close, pool_stats...) through"""
+        if name == "backend":
+            raise AttributeError(name)
+
+        return getattr(self.backend, name)
+
+    def _lookup(self, key: tuple):
+        """Returns (True, value) for a fresh entry, else (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                expires, value = entry
+
+                if not expires or expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+
+                self._drop(key)
+
+            self.misses += 1
+
+        return False, None
+
+    def _store(self, key: tuple, value, generation: int) -> None:
+        """Caches a value, evicting the least recently used entries"""
+        expires = time.monotonic() + self.ttl if self.ttl else 0
+
+        with self._lock:
+            if self._generations.get(key[1], 0) != generation:
+                return
+
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+
+            if key[0] in COLLECTION_KINDS:
+                self._collections.setdefault(key[1], set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key: tuple) -> None:
+        """Removes an entry, the lock must be held"""
+        if self._entries.pop(key, None) is None:
+            return
+
+        if key[0] in COLLECTION_KINDS:
+            self._collections[key[1]].discard(key)
+
+    def _read(self, key: tuple, load):
+        """Returns the cached value of the key, or loads and caches it"""
+        generation = self._generations.get(key[1], 0)
+        found, value = self._lookup(key)
+
+        if not found:
+            value = load()
+            self._store(key, value, generation)
+
+        # Callers get their own list, the cached one stays untouched
+        return list(value) if isinstance(value, list) else value
+
+    def _invalidate(self, objs) -> None:
+        """Drops the cached reads the changed objects could be part of"""
+        with self._lock:
+            for obj in objs:
+                model = model_key(obj.__class__)
+                self._generations[model] = self._generations.get(model, 0) + 1
+                keys = [("get", model, object_key(obj))]
+                keys.extend(self._collections.get(model, ()))
+
+                for key in keys:
+                    if key in self._entries:
+                        self._drop(key)
+                        self.invalidations += 1
+
+    def clear(self) -> None:
+        """Empties the cache"""
+        with self._lock:
+            self._entries.clear()
+            self._collections.clear()
+
+    def stats(self) -> dict:
+        """Returns the cache counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def reload(self) -> None:
+        """Reloads the backend and empties the cache"""
+        self.backend.reload()
+        self.clear()
+
+    def get_all(self, model_name: str) -> list:
+        """Get all objects of a model"""
+        model = model_key(model_name)
+
+        return self._read(
+            ("get_all", model), lambda: self.backend.get_all(model)
+        )
+
+    def get(self, model_name: str, obj_id: str):
+        """Get an object by id"""
+        model = model_key(model_name)
+
+        return self._read(
+            ("get", model, obj_id), lambda: self.backend.get(model, obj_id)
+        )
+
+    def find_by(self, model_name: str, **criteria) -> list:
+        """Get all objects of a model whose fields equal the criteria"""
+        model = model_key(model_name)
+        key = (
+            "find_by",
+            model,
+            tuple(sorted((k, _hashable(v)) for k, v in criteria.items())),
+        )
+
+        return self._read(key, lambda: self.backend.find_by(model, **criteria))
+
+    def query(self, query) -> list:
+        """Run a Query"""
+        key = (
+            "query",
+            query.model,
+            tuple((f, op, _hashable(v)) for f, op, v in query.filters),
+            query.ordering,
+            query.limit_count,
+            query.offset_count,
+            query.cursor,
+        )
+
+        return self._read(key, lambda: self.backend.query(query))
+
+    def add_listener(self, listener) -> None:
+        """Registers the listener on the backend, which makes the changes"""
+        self.backend.add_listener(listener)
+
+    def snapshot_path(self) -> str | None:
+        """Returns the snapshot file of the backend"""
+        return self.backend.snapshot_path()
+
+    def add_snapshot_listener(self, listener) -> None:
+        """Registers the listener on the backend, which takes snapshots"""
+        self.backend.add_snapshot_listener(listener)
+
+    def version(self, model_name: str) -> tuple[str, datetime | None]:
+        """Returns the version of a model, it isn't cached"""
+        return self.backend.version(model_name)
+
+    def save(self, obj):
+        """Save an object"""
+        # Also when it fails, a rejected object may have been changed
+        try:
+            return self.backend.save(obj)
+        finally:
+            self._invalidate([obj])
+
+    def save_many(self, objs: list) -> list:
+        """Save several objects"""
+        try:
+            return self.backend.save_many(objs)
+        finally:
+            self._invalidate(objs)
+
+    def update(self, obj):
+        """Update an object"""
+        try:
+            return self.backend.update(obj)
+        finally:
+            self._invalidate([obj])
+
+    def update_many(self, objs: list) -> list:
+        """Update several objects"""
+        try:
+            return self.backend.update_many(objs)
+        finally:
+            self._invalidate(objs)
+
+    def delete(self, obj) -> bool:
+        """Delete an object"""
+        result = self.backend.delete(obj)
+        self._invalidate([obj])
+        return result
+
+    def delete_many(self, objs: list) -> int:
+        """Delete several objects"""
+        result = self.backend.delete_many(objs)
+        self._invalidate(objs)
+        return result
+
+    def flush(self) -> None:
+        """Flushes the backend"""
+        self.backend.flush()
@@ -0,0 +1,106 @@
+"""
+Compact representation of the objects kept by the in-memory backends
+
+Every model gets a slotted subclass, with the same name so it maps to
+the same repository model, storing the columns in slots instead of a
+per instance `__dict__`. Converting an object to it also:
+
+- interns the ids and the foreign keys, so every reference to an object
+  shares the string of its id instead of holding a copy
+- makes `updated_at` share the `created_at` object while they are equal,
+  which they are until the object is first updated
+
+The compact objects behave as the model instances they come from, and
+pickle as a plain tuple of their values.
+"""
+
+from datetime import datetime
+import sys
+from src.models.serializer import columns
+from src.persistence.repository import model_classes, model_key
+
+_compact_classes: dict[type, type] = {}
+
+
+def _interned(field: str) -> bool:
+    """Checks if a field holds an id, or a reference to one"""
+    return field in ("id", "code", "country_code") or field.endswith("_id")
+
+
+def compact_class(cls: type) -> type:
+    """Returns the slotted subclass of a model, creating it the first time"""
+    if "_compact_fields" in vars(cls):
+        return cls
+
+    compact = _compact_classes.get(cls)
+
+    if compact is None:
+        fields = tuple(columns(cls))
+        compact = _compact_classes[cls] = type(
+            cls.__name__,
+            (cls,),
+            {
+                "__slots__": fields,
+                "__module__": cls.__module__,
+                "__qualname__": cls.__qualname__,
+                "__reduce__": _reduce,
+                "_compact_fields": fields,
+                "_interned_fields": tuple(filter(_interned, fields)),
+            },
+        )
+
+    return compact
+
+
+def _reduce(obj) -> tuple:
+    """Pickles a compact object as its model name and values"""
+    cls = type(obj)
+    values = tuple(getattr(obj, field) for field in cls._compact_fields)
+
+    return restore, (model_key(cls), values)
+
+
+def restore(model: str, values: tuple):
+    """Unpickles a compact object"""
+    cls = compact_class(model_classes()[model])
+
+    return build(cls, dict(zip(cls._compact_fields, values)))
+
+
+def build(cls: type, values: dict):
+    """Builds a compact object of a model from its attribute values"""
+    cls = compact_class(cls)
+    obj = cls.__new__(cls)
+
+    for field in cls._interned_fields:
+        value = values.get(field)
+
+        if isinstance(value, str):
+            values[field] = sys.intern(value)
+
+    for key in ("created_at", "updated_at"):
+        if isinstance(values.get(key), str):
+            values[key] = datetime.fromisoformat(values[key])
+
+    if values.get("updated_at") == values.get("created_at"):
+        values["updated_at"] = values.get("created_at")
+
+    for field in cls._compact_fields:
+        setattr(obj, field, values.get(field))
+
+    for key, value in values.items():
+        # Attributes that aren't columns still go to a __dict__
+        if key not in cls._compact_fields:
+            setattr(obj, key, value)
+
+    return obj
+
+
+def compact(obj):
+    """Returns the compact version of an object, itself if it is one"""
+    cls = type(obj)
+
+    if "_compact_fields" in vars(cls):
+        return obj
+
+    return build(cls, dict(vars(obj)))
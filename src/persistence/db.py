@@ -16,9 +16,44 @@ from src.models.base import Base
 from datetime import datetime
 from typing import Optional
 import uuid
-from src.persistence.repository import Repository
+from src.persistence.query import OPERATORS, model_fields
+from src.persistence.repository import (
+    DuplicateError,
+    Repository,
+    model_classes,
+    model_key,
+    object_key,
+)
 from flask import current_app as app
+from sqlalchemy import (
+    bindparam,
+    column,
+    delete,
+    func,
+    insert,
+    table,
+    tuple_,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+
+
+def _bulk_table(model: str):
+    """
+    Returns a Core table of the columns of a model, the models are not
+    mapped so the ORM bulk methods can't be used with them
+    """
+    return table(
+        model_classes()[model].__tablename__,
+        *(column(field) for field in model_fields(model)),
+    )
+
+
+def _primary_key(bulk) -> str:
+    """Returns the primary key column of a Core table of a model"""
+    return "id" if "id" in bulk.c else "code"
 
 
 class DBRepository(Repository):
@@ -54,27 +89,227 @@ class DBRepository(Repository):
         session: Session = app.db
         return session.query(model).filter_by(id=obj_id).first()
 
+    def find_by(self, model_name: str, **criteria) -> list:
+        """Gets all values of a given model matching the criteria"""
+        session: Session = app.db
+        model = model_classes()[model_key(model_name)]
+        return session.query(model).filter_by(**criteria).all()
+
+    def query(self, query) -> list:
+        """Compiles a Query to SQL and runs it"""
+        session: Session = app.db
+        model = model_classes()[query.model]
+        conditions = []
+
+        for field, op, value in query.filters:
+            column = getattr(model, field)
+            if op == "in":
+                conditions.append(column.in_(value))
+            else:
+                conditions.append(OPERATORS[op](column, value))
+
+        if query.cursor is not None:
+            fields = tuple_(*(getattr(model, f) for f, _ in query.ordering))
+            values = tuple_(*query.cursor)
+            conditions.append(
+                fields < values if query.descending() else fields > values
+            )
+
+        result = session.query(model).filter(*conditions).order_by(
+            *(
+                getattr(model, field).desc()
+                if descending
+                else getattr(model, field)
+                for field, descending in query.ordering
+            )
+        )
+
+        if query.offset_count:
+            result = result.offset(query.offset_count)
+        if query.limit_count is not None:
+            result = result.limit(query.limit_count)
+
+        return result.all()
+
+    def version(self, model_name: str) -> tuple[str, datetime | None]:
+        """
+        Derives the version of a model from its rows count and latest
+        update, the database is shared so there is no counter to keep
+        """
+        session: Session = app.db
+        model = model_classes()[model_key(model_name)]
+
+        if "updated_at" not in model_fields(model_key(model_name)):
+            count = session.query(func.count()).select_from(model).scalar()
+            return str(count), None
+
+        count, modified = session.query(
+            func.count(), func.max(model.updated_at)
+        ).one()
+        stamp = modified.timestamp() if modified else 0
+
+        return f"{count}-{stamp}", modified
+
+    def _commit(
+        self, session: Session, objs: list, statements: list = ()
+    ) -> list[int]:
+        """
+        Runs the (statement, rows) pairs and commits the session, returns
+        the rowcount of every statement. A violated unique index of the
+        objects rolls it back and raises DuplicateError
+        """
+        try:
+            counts = [
+                session.execute(statement, rows).rowcount
+                for statement, rows in statements
+            ]
+
+            session.commit()
+        except IntegrityError as e:
+            session.rollback()
+            message = str(e.orig).lower()
+
+            # "Duplicate entry" in MySQL, "UNIQUE constraint" elsewhere
+            if "duplicate" in message or "unique" in message:
+                for obj in objs:
+                    model = model_key(obj.__class__)
+
+                    for fields in self.unique_indexes.get(model, ()):
+                        if any(field in message for field in fields):
+                            raise DuplicateError(model, fields) from e
+
+            raise
+
+        return counts
+
     def save(self, obj: Base) -> None:
         """Saves an instance of a given model"""
         session: Session = app.db
         session.add(obj)
-        session.commit()
+        self._commit(session, [obj])
+        self._notify("save", [obj])
+
+    def _row(self, obj) -> dict:
+        """Returns the column values of an object"""
+        # Read from the instance, the class attributes are the columns
+        return {
+            field: vars(obj).get(field)
+            for field in model_fields(model_key(obj.__class__))
+        }
+
+    def _bulk_rows(self, objs: list) -> dict[str, list[dict]]:
+        """Groups the column values of the objects by model"""
+        rows: dict[str, list[dict]] = {}
+
+        for obj in objs:
+            rows.setdefault(model_key(obj.__class__), []).append(
+                self._row(obj)
+            )
+
+        return rows
+
+    def save_many(self, objs: list) -> list:
+        """
+        Inserts several instances with one executemany per model, in a
+        single transaction
+        """
+        session: Session = app.db
+        statements = [
+            (insert(_bulk_table(model)), rows)
+            for model, rows in self._bulk_rows(objs).items()
+        ]
+
+        self._commit(session, objs, statements)
+        self._notify("save", objs)
+        return objs
 
     def update(self, obj: Base) -> Base | None:
         """Updates the data of a given model instance"""
         session: Session = app.db
         session.add(obj)
-        session.commit()
+        self._commit(session, [obj])
+        self._notify("update", [obj])
         return obj
 
-    def delete(self, obj: Base) -> bool:
-        """Deletes the data of a given model instance"""
+    def update_many(self, objs: list) -> list:
+        """
+        Updates several instances by primary key in a single transaction,
+        returns the ones that matched a row
+        """
+        session: Session = app.db
+        now = datetime.now()
+        statements = []
+
+        # Executed one by one (still one commit) to know which matched
+        for obj in objs:
+            obj.updated_at = now
+            bulk = _bulk_table(model_key(obj.__class__))
+            key = _primary_key(bulk)
+            row = self._row(obj)
+            # The SET clause takes every other key of the row
+            row["_key"] = row.pop(key)
+            statements.append(
+                (update(bulk).where(bulk.c[key] == bindparam("_key")), row)
+            )
+
+        counts = self._commit(session, objs, statements)
+        updated = [obj for obj, count in zip(objs, counts) if count]
+
+        self._notify("update", updated)
+        return updated
+
+    def delete_many(self, objs: list) -> int:
+        """
+        Deletes several instances in a single transaction, returns how
+        many rows were deleted
+        """
         session: Session = app.db
-        session.delete(obj)
-        session.commit()
-        return True
+        # Each object once, a repeated one would match no row the second time
+        unique = list(
+            {(model_key(obj.__class__), object_key(obj)): obj for obj in objs}
+            .values()
+        )
+        statements = []
+
+        for obj in unique:
+            bulk = _bulk_table(model_key(obj.__class__))
+            key = _primary_key(bulk)
+            statements.append(
+                (
+                    delete(bulk).where(bulk.c[key] == bindparam("_key")),
+                    {"_key": object_key(obj)},
+                )
+            )
+
+        counts = self._commit(session, unique, statements)
+        deleted = [obj for obj, count in zip(unique, counts) if count]
+
+        self._notify("delete", deleted)
+        return len(deleted)
+
+    def delete(self, obj: Base) -> bool:
+        """Deletes the data of a given model instance, if it is stored"""
+        return self.delete_many([obj]) == 1
 
     
+    def pool_stats(self) -> dict:
+        """
+        Returns the usage of the connection pool, only its status for the
+        pools without a size (SQLite ones, NullPool...)
+        """
+        pool = app.db_engine.pool
+
+        if not isinstance(pool, QueuePool):
+            return {"status": pool.status()}
+
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "status": pool.status(),
+        }
+
     def reload(self) -> None:
         """Not implemented"""
         pass
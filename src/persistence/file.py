@@ -1,132 +1,195 @@
 """
 This module exports a Repository that persists data in a JSON file
-"""
 
-from datetime import datetime
-import json
-from src.models.base import Base
-from src.persistence.repository import Repository
-from utils.constants import FILE_STORAGE_FILENAME
+By default the whole data is rewritten on every change. In journal mode
+every change only appends one JSON line to a journal file, the snapshot
+file is rewritten by ``compact`` once the journal grows too much.
 
+With "group" durability the writes are left to a background Flusher
+(see ``src/persistence/flusher.py``) instead of happening on every change.
+"""
 
-class FileRepository(Repository):
+import json
+import os
+from src.models.serializer import record
+from src.persistence.flusher import Flusher
+from src.persistence.indexed import VERSIONS_KEY, IndexedRepository
+from src.persistence.repository import model_key, object_key
+from utils.constants import (
+    FILE_JOURNAL_COMPACT_THRESHOLD,
+    FILE_JOURNAL_FILENAME,
+    FILE_STORAGE_FILENAME,
+    FLUSH_DIRTY_THRESHOLD,
+    FLUSH_INTERVAL,
+)
+
+
+class FileRepository(IndexedRepository):
     """File Repository"""
 
     __filename = FILE_STORAGE_FILENAME
-    __data: dict[str, list] = {
-        "country": [],
-        "user": [],
-        "amenity": [],
-        "city": [],
-        "review": [],
-        "place": [],
-        "placeamenity": [],
-    }
-
-    def __init__(self) -> None:
-        """Calls reload method"""
-        self.reload()
+    __journal_filename = FILE_JOURNAL_FILENAME
+
+    def __init__(
+        self,
+        journal: bool = False,
+        compact_threshold: int = FILE_JOURNAL_COMPACT_THRESHOLD,
+        durability: str = "sync",
+        flush_interval: float = FLUSH_INTERVAL,
+        flush_threshold: int = FLUSH_DIRTY_THRESHOLD,
+        compact: bool = False,
+    ) -> None:
+        """
+        Calls reload method
+
+        If journal is True, changes are appended to the journal file and
+        the snapshot is compacted every `compact_threshold` changes.
+        `durability` and the flush options are passed to the Flusher,
+        `compact` to IndexedRepository
+        """
+        self._journal = journal
+        self._compact_threshold = compact_threshold
+        self._journal_entries = 0
+        self._pending: list[str] = []
+        self._flusher = Flusher(
+            self._write, durability, flush_interval, flush_threshold
+        )
+        super().__init__(compact)
+
+    def _persist(self, op, objs):
+        """Records the changes and lets the Flusher decide when to write"""
+        if self._journal:
+            for obj in objs:
+                entry = {"op": op, "model": model_key(obj.__class__)}
+
+                if op == "delete":
+                    entry["id"] = object_key(obj)
+                else:
+                    entry["data"] = record(obj)
+
+                self._pending.append(json.dumps(entry) + "\n")
+
+        self._flusher.changed(len(objs))
+
+    def _write(self):
+        """Writes the pending journal entries or the whole data"""
+        if not self._journal:
+            self._save_to_file()
+            return
 
-    def _save_to_file(self):
-        """Helper method to save the current object data to the file"""
-        serialized = {
-            k: [v.to_dict() for v in l if type(v) is not dict]
-            for k, l in self.__data.items()
-        }
+        with self._lock:
+            lines, self._pending = self._pending, []
 
-        with open(self.__filename, "w") as file:
-            json.dump(serialized, file)
+        try:
+            with open(self.__journal_filename, "a") as file:
+                file.writelines(lines)
+        except OSError:
+            with self._lock:
+                self._pending[:0] = lines
+            raise
 
-    def get_all(self, model_name: str):
-        """Get all objects of a given model"""
-        return self.__data.get(model_name, [])
+        self._journal_entries += len(lines)
 
-    def get(self, model_name: str, obj_id: str):
-        """Get an object by its ID"""
-        for obj in self.get_all(model_name):
-            if obj.id == obj_id:
-                return obj
-        return None
+        if self._journal_entries >= self._compact_threshold:
+            self.compact()
 
-    def reload(self):
-        """Reloads the data from the file"""
-        file_data = {}
-        try:
-            with open(self.__filename, "r") as file:
-                file_data = json.load(file)
-        except FileNotFoundError:
-            from src.models.country import Country
+    def snapshot_path(self) -> str:
+        """Returns the data file"""
+        return self.__filename
+
+    def flush(self):
+        """Writes the changes the Flusher is holding back"""
+        self._flusher.flush()
 
-            self.__data["country"] = [Country("Uruguay", "UY")]
+    def close(self):
+        """Stops the Flusher, writing the pending changes"""
+        self._flusher.close()
 
+    def _save_to_file(self):
+        """Helper method to save the current object data to the file"""
+        with self._lock:
+            serialized = {
+                k: [record(v) for v in table.values()]
+                for k, table in self._data.items()
+            }
+            serialized[VERSIONS_KEY] = self._saved_versions()
+            self._snapshot_taken()
+
+        # Written aside and renamed so a crash never leaves half a file
+        tmp_filename = f"{self.__filename}.tmp"
+
+        with open(tmp_filename, "w") as file:
+            json.dump(serialized, file)
+
+        os.replace(tmp_filename, self.__filename)
+
+    def compact(self):
+        """Rewrites the snapshot file and empties the journal"""
+        with self._lock:
             self._save_to_file()
 
-        from src.models.amenity import Amenity, PlaceAmenity
-        from src.models.city import City
-        from src.models.country import Country
-        from src.models.place import Place
-        from src.models.review import Review
-        from src.models.user import User
-
-        models = {
-            "amenity": Amenity,
-            "city": City,
-            "country": Country,
-            "place": Place,
-            "placeamenity": PlaceAmenity,
-            "review": Review,
-            "user": User,
-        }
+            # Replaying the journal over the new snapshot is harmless,
+            # so a crash before this truncation doesn't lose anything
+            open(self.__journal_filename, "w").close()
 
-        for model, data in file_data.items():
-            for item in data:
-                instance: Base = models[model](**item)
+            self._journal_entries = 0
 
-                if "created_at" in item:
-                    instance.created_at = datetime.fromisoformat(
-                        item["created_at"]
-                    )
-                if "updated_at" in item:
-                    instance.updated_at = datetime.fromisoformat(
-                        item["updated_at"]
-                    )
+    def _replay_journal(self):
+        """Applies the journal entries over the loaded snapshot"""
+        try:
+            with open(self.__journal_filename, "r") as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            return
 
-                self.save(data=instance, save_to_file=False)
+        torn = False
 
-    def save(self, data: Base, save_to_file=True):
-        """Save an object to the repository"""
-        model: str = data.__class__.__name__.lower()
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash in the middle of an append leaves a torn line,
+                # compacting drops it before anything is appended to it
+                torn = True
+                continue
 
-        if model not in self.__data:
-            self.__data[model] = []
+            model = entry["model"]
 
-        self.__data[model].append(data)
+            if entry["op"] == "delete":
+                self._remove(model, entry["id"])
+            else:
+                obj = self._instantiate(model, entry["data"])
+                self.save(obj, save_to_file=False)
 
-        if save_to_file:
-            self._save_to_file()
+            self._journal_entries += 1
 
-    def update(self, obj: Base):
-        """Update an object in the repository"""
-        cls = obj.__class__.__name__.lower()
+        if torn:
+            self.compact()
 
-        for i, o in enumerate(self.__data[cls]):
-            if o.id == obj.id:
-                obj.updated_at = datetime.now()
-                self.__data[cls][i] = obj
-                self._save_to_file()
-                return obj
+    def reload(self):
+        """Reloads the data from the file (and the journal)"""
+        file_data = {}
+        try:
+            with open(self.__filename, "r") as file:
+                file_data = json.load(file)
+        except FileNotFoundError:
+            from src.models.country import COUNTRIES
 
-        return None
+            for country in COUNTRIES.values():
+                self.save(country, save_to_file=False)
 
-    def delete(self, obj: Base):
-        """Delete an object from the repository"""
-        class_name = obj.__class__.__name__.lower()
+            self._save_to_file()
 
-        if obj not in self.__data[class_name]:
-            return False
+        versions = file_data.pop(VERSIONS_KEY, None)
 
-        self.__data[class_name].remove(obj)
+        for model, data in file_data.items():
+            for item in data:
+                self.save(
+                    self._instantiate(model, item), save_to_file=False
+                )
 
-        self._save_to_file()
+        if versions:
+            self._restore_versions(versions)
 
-        return True
+        if self._journal:
+            self._replay_journal()
@@ -0,0 +1,114 @@
+"""
+This module exports the Flusher used by the file backed repositories
+to decide when their data is written to disk
+
+- "sync" durability writes after every change
+- "group" durability coalesces the changes and writes them from a
+  background thread every `interval` seconds, or as soon as
+  `threshold` changes are pending
+"""
+
+import atexit
+import logging
+import threading
+from typing import Callable
+from utils.constants import FLUSH_DIRTY_THRESHOLD, FLUSH_INTERVAL
+
+# Child of the logger of the Flask app, which is named after `src`
+logger = logging.getLogger(__name__)
+
+
+class Flusher:
+    """Writes the pending changes of a repository to disk"""
+
+    def __init__(
+        self,
+        write: Callable[[], None],
+        durability: str = "sync",
+        interval: float = FLUSH_INTERVAL,
+        threshold: int = FLUSH_DIRTY_THRESHOLD,
+    ) -> None:
+        """
+        `write` is called with all the pending changes to persist,
+        the background thread is only started for "group" durability
+        """
+        if durability not in ("sync", "group"):
+            raise ValueError(f"Unknown durability: {durability}")
+
+        self.durability = durability
+        self._write = write
+        self._interval = interval
+        self._threshold = threshold
+        self._dirty = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = None
+
+        if durability == "group":
+            self._thread = threading.Thread(
+                target=self._run, name="repository-flusher", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.close)
+
+    @property
+    def dirty(self) -> int:
+        """Number of changes not written yet"""
+        return self._dirty
+
+    def changed(self, count: int = 1) -> None:
+        """Records changes, writing them right away with sync durability"""
+        if self.durability == "sync":
+            with self._write_lock:
+                self._write()
+            return
+
+        with self._lock:
+            self._dirty += count
+            full = self._dirty >= self._threshold
+
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        """Writes the pending changes, if any"""
+        with self._write_lock:
+            with self._lock:
+                pending, self._dirty = self._dirty, 0
+
+            if not pending:
+                return
+
+            try:
+                self._write()
+            except Exception:
+                with self._lock:
+                    self._dirty += pending
+                raise
+
+    def _run(self) -> None:
+        """Background loop flushing on every interval or full threshold"""
+        while not self._closed:
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+
+            try:
+                self.flush()
+            except Exception:
+                # Kept dirty, the next round tries again
+                logger.exception("Repository flush failed")
+
+    def close(self) -> None:
+        """Stops the background thread and writes the pending changes"""
+        if self._closed:
+            return
+
+        self._closed = True
+
+        if self._thread:
+            self._wakeup.set()
+            self._thread.join()
+
+        self.flush()
@@ -0,0 +1,539 @@
+"""
+This module exports the shared base for the repositories that keep
+their objects in process memory (memory, file and pickle)
+
+Objects are stored per model in an ``id -> object`` dict, so point
+reads, updates and deletes are constant time while ``get_all`` keeps
+the insertion order. The secondary indexes declared in
+``Repository.indexes`` and a sorted ``(created_at, id)`` list per model,
+used for keyset pagination, are maintained on every change, along with
+a version counter per model.
+
+With ``compact=True`` the objects are stored in their slotted form (see
+``src/persistence/compact.py``), which takes a fraction of the memory.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+import heapq
+import threading
+import uuid
+from src.persistence.compact import build, compact
+from src.persistence.repository import (
+    DuplicateError,
+    Repository,
+    model_classes,
+    model_key,
+    object_key,
+)
+
+MODEL_NAMES = (
+    "country",
+    "user",
+    "amenity",
+    "city",
+    "review",
+    "place",
+    "placeamenity",
+)
+
+# Ordering the sorted (created_at, id) lists answer without sorting
+CREATION_ORDER = (("created_at", False), ("id", False))
+# Queries in creation order restricted to fewer ids than the objects of
+# the model over this ratio sort the entries of those ids, the others
+# walk the whole creation order
+DENSE_IDS_RATIO = 8
+# Entry of the snapshot files holding the version counters, not a model
+VERSIONS_KEY = "_versions"
+
+
+def instantiate(model: str, values: dict):
+    """
+    Builds a model instance from its stored attributes
+
+    The constructors are skipped on purpose, they have different
+    signatures per model and ignore most of the stored attributes.
+    """
+    cls = model_classes()[model]
+    obj = cls.__new__(cls)
+
+    for key in ("created_at", "updated_at"):
+        if isinstance(values.get(key), str):
+            values[key] = datetime.fromisoformat(values[key])
+
+    obj.__dict__.update(values)
+
+    return obj
+
+
+class IndexedRepository(Repository):
+    """
+    Repository that keeps its objects in per model hash indexes
+
+    Subclasses only have to implement ``reload`` and, if they persist
+    the data somewhere, ``_persist`` which is called after every change
+    with the operation ("save", "update" or "delete") and the changed
+    objects.
+    """
+
+    def __init__(self, compact: bool = False) -> None:
+        """
+        Creates the empty indexes and calls reload method, the objects
+        are stored in their compact form if `compact` is True
+        """
+        self._compact = compact
+        # Held while changing the data, and by subclasses while they
+        # take the copy of the data they persist
+        self._lock = threading.RLock()
+        self._data: dict[str, dict[str, object]] = {
+            model: {} for model in MODEL_NAMES
+        }
+        # model -> fields -> values -> {id: object}
+        self._indexes: dict[str, dict[tuple, dict[tuple, dict]]] = {
+            model: {fields: {} for fields in indexes}
+            for model, indexes in self.indexes.items()
+        }
+        # model -> id -> values each index holds the object under, in
+        # the order of the indexes. Objects are updated in place so the
+        # old values are kept here
+        self._indexed: dict[str, dict[str, tuple[tuple, ...]]] = {
+            model: {} for model in self.indexes
+        }
+        # model -> sorted [(created_at, id)] and id -> its entry there
+        self._order: dict[str, list[tuple]] = {}
+        self._order_entries: dict[str, dict[str, tuple]] = {}
+        # model -> (changes count, time of the last change). The counters
+        # are saved with the snapshots, the epoch tells the runs apart
+        self._versions: dict[str, tuple[int, datetime]] = {}
+        self._epoch = uuid.uuid4().hex[:8]
+        # Whether the versions were restored from the loaded snapshot
+        self._restored = False
+        self._reloading = True
+        self.reload()
+        self._reloading = False
+
+    def _persist(self, op: str, objs: list) -> None:
+        """Hook called after every change, does nothing by default"""
+
+    def _instantiate(self, model: str, values: dict):
+        """Builds a model instance to store from its attributes"""
+        if self._compact:
+            return build(model_classes()[model], values)
+
+        return instantiate(model, values)
+
+    def _bump(self, model: str) -> None:
+        """Counts a change of a model"""
+        if self._restored and not self._reloading:
+            # Changes of the previous run that were never written may
+            # have reached the next counts, this run can't reuse them
+            self._epoch = uuid.uuid4().hex[:8]
+            self._restored = False
+
+        count, _ = self._versions.get(model, (0, None))
+        self._versions[model] = (count + 1, datetime.now())
+
+    def _saved_versions(self) -> dict:
+        """Returns the version counters, saved with the snapshots"""
+        return {
+            "epoch": self._epoch,
+            "counts": {
+                model: count for model, (count, _) in self._versions.items()
+            },
+        }
+
+    def _restore_versions(self, saved: dict) -> None:
+        """
+        Restores the version counters saved with the loaded snapshot,
+        before the journal is replayed over it, so what was derived from
+        the versions of the data (see `src/indexes/text.py`) still
+        matches it after a restart
+        """
+        now = datetime.now()
+        self._epoch = saved["epoch"]
+        self._versions = {
+            model: (count, now) for model, count in saved["counts"].items()
+        }
+        self._restored = True
+
+    def _table(self, model) -> dict:
+        """Returns the ``id -> object`` index of a model"""
+        name = model_key(model)
+
+        if name not in self._data:
+            self._data[name] = {}
+
+        return self._data[name]
+
+    def _unindex(self, model: str, key: str) -> None:
+        """Removes an object from the secondary indexes of its model"""
+        if model not in self._indexes:
+            return
+
+        indexed = self._indexed[model].pop(key, ())
+
+        for index, values in zip(self._indexes[model].values(), indexed):
+            bucket = index[values]
+            del bucket[key]
+
+            if not bucket:
+                del index[values]
+
+    def _index(self, model: str, key: str, obj) -> None:
+        """(Re)indexes an object in the secondary indexes of its model"""
+        if model not in self._indexes:
+            return
+
+        self._unindex(model, key)
+
+        indexed = []
+
+        for fields, index in self._indexes[model].items():
+            values = tuple(getattr(obj, field) for field in fields)
+            index.setdefault(values, {})[key] = obj
+            indexed.append(values)
+
+        self._indexed[model][key] = tuple(indexed)
+
+    def _check_unique(self, objs: list) -> None:
+        """
+        Raises DuplicateError, before anything changes, if an object
+        would share the values of a unique index with another one,
+        stored or in the same batch
+        """
+        seen: dict[tuple, str] = {}
+
+        for obj in objs:
+            model = model_key(obj.__class__)
+            key = object_key(obj)
+
+            for fields in self.unique_indexes.get(model, ()):
+                values = tuple(getattr(obj, field) for field in fields)
+                owners = self._indexes[model][fields].get(values, {})
+                owner = seen.setdefault((model, fields, values), key)
+
+                if owner != key or any(other != key for other in owners):
+                    raise DuplicateError(model, fields)
+
+    def _order_index(self, model: str, key: str, obj) -> None:
+        """(Re)places an object in the creation order of its model"""
+        created_at = getattr(obj, "created_at", None)
+
+        # Countries have no creation date
+        if not isinstance(created_at, datetime):
+            return
+
+        entry = (created_at, key)
+        entries = self._order_entries.setdefault(model, {})
+        old = entries.get(key)
+
+        if old == entry:
+            return
+
+        order = self._order.setdefault(model, [])
+
+        if old:
+            del order[bisect_left(order, old)]
+
+        insort(order, entry)
+        entries[key] = entry
+
+    def _order_unindex(self, model: str, key: str) -> None:
+        """Removes an object from the creation order of its model"""
+        old = self._order_entries.get(model, {}).pop(key, None)
+
+        if old:
+            order = self._order[model]
+            del order[bisect_left(order, old)]
+
+    def _best_index(self, model: str, fields) -> tuple:
+        """Returns the secondary index covering the most of the fields"""
+        best: tuple = ()
+
+        for index in self._indexes.get(model, {}):
+            if set(index) <= set(fields) and len(index) > len(best):
+                best = index
+
+        return best
+
+    def version(self, model_name: str) -> tuple[str, datetime | None]:
+        """Returns the version counter of a model and its last change"""
+        count, modified = self._versions.get(model_key(model_name), (0, None))
+
+        return f"{self._epoch}-{count}", modified
+
+    def get_all(self, model_name: str) -> list:
+        """Get all objects of a given model"""
+        return list(self._table(model_name).values())
+
+    def get(self, model_name: str, obj_id: str):
+        """Get an object by its ID"""
+        return self._table(model_name).get(obj_id)
+
+    def find_by(self, model_name: str, **criteria) -> list:
+        """
+        Get all objects of a model whose fields equal the criteria
+
+        Uses the secondary index covering the most criteria fields and
+        only checks the remaining ones on its matches
+        """
+        model = model_key(model_name)
+        best = self._best_index(model, criteria)
+
+        if not best:
+            return super().find_by(model, **criteria)
+
+        values = tuple(criteria[field] for field in best)
+        matches = self._indexes[model][best].get(values, {}).values()
+        rest = [(k, v) for k, v in criteria.items() if k not in best]
+
+        return [
+            obj
+            for obj in matches
+            if all(getattr(obj, k) == v for k, v in rest)
+        ]
+
+    def query(self, query) -> list:
+        """
+        Run a Query (see src/persistence/query.py)
+
+        Queries restricted to some ids only look those ids up. Queries
+        in creation order that no secondary index can narrow down walk
+        the sorted (created_at, id) list from their cursor and stop as
+        soon as the page is full, the rest are left to the default
+        implementation
+        """
+        model = query.model
+        lookup = query.id_lookup()
+
+        if lookup is not None:
+            ids, rest = lookup
+
+            if query.ordering != CREATION_ORDER:
+                table = self._table(model)
+
+                with self._lock:
+                    objs = [
+                        table[key]
+                        for key in dict.fromkeys(ids)
+                        if key in table
+                    ]
+
+                return rest.apply(objs)
+
+            # Many ids are found sooner walking the whole creation order
+            if len(ids) * DENSE_IDS_RATIO <= len(self._order.get(model, ())):
+                return self._query_ids_in_order(model, ids, rest)
+
+        if query.ordering != CREATION_ORDER or self._best_index(
+            model, query.equalities()
+        ):
+            return super().query(query)
+
+        table = self._table(model)
+        start = query.offset_count
+        end = None
+
+        if query.limit_count is not None:
+            end = start + query.limit_count
+
+        objs = []
+
+        with self._lock:
+            order = self._order.get(model, [])
+            position = 0
+
+            if query.cursor is not None:
+                position = bisect_right(order, query.cursor)
+
+            while position < len(order) and (end is None or len(objs) < end):
+                obj = table[order[position][1]]
+                position += 1
+
+                if query.matches(obj):
+                    objs.append(obj)
+
+        return objs[start:end]
+
+    def _query_ids_in_order(self, model: str, ids, query) -> list:
+        """
+        Runs a query in creation order restricted to some ids, paging over
+        the (created_at, id) entries of those ids and only fetching the
+        objects of the page
+        """
+        table = self._table(model)
+        start = query.offset_count
+        end = None
+
+        if query.limit_count is not None:
+            end = start + query.limit_count
+
+        objs = []
+
+        with self._lock:
+            entries = self._order_entries.get(model, {})
+
+            if not isinstance(ids, (set, frozenset)):
+                ids = set(ids)
+
+            candidates = (entries[key] for key in ids if key in entries)
+
+            if query.cursor is not None:
+                candidates = (
+                    entry for entry in candidates if entry > query.cursor
+                )
+
+            if end is not None and not query.filters:
+                # Every entry is a result, only the page is sorted
+                candidates = heapq.nsmallest(end, candidates)
+            else:
+                candidates = sorted(candidates)
+
+            for _, key in candidates:
+                if end is not None and len(objs) >= end:
+                    break
+
+                obj = table[key]
+
+                if query.matches(obj):
+                    objs.append(obj)
+
+        return objs[start:end]
+
+    def _store(self, obj):
+        """Puts an object in the indexes without persisting it"""
+        model = model_key(obj.__class__)
+        key = object_key(obj)
+
+        if self._compact:
+            obj = compact(obj)
+
+        self._table(model)[key] = obj
+        self._index(model, key, obj)
+        self._order_index(model, key, obj)
+        self._bump(model)
+
+        return obj
+
+    def _refresh(self, obj):
+        """
+        Reindexes an already stored object without persisting it,
+        returns the stored object or None if there is none
+        """
+        model = model_key(obj.__class__)
+        table = self._table(model)
+        key = object_key(obj)
+
+        if key not in table:
+            return None
+
+        obj.updated_at = datetime.now()
+
+        if self._compact:
+            obj = compact(obj)
+
+        table[key] = obj
+        self._index(model, key, obj)
+        self._order_index(model, key, obj)
+        self._bump(model)
+
+        return obj
+
+    def _remove(self, model: str, key: str) -> bool:
+        """Removes an object from the indexes without persisting it"""
+        with self._lock:
+            if self._table(model).pop(key, None) is None:
+                return False
+
+            self._unindex(model, key)
+            self._order_unindex(model, key)
+            self._bump(model)
+
+        return True
+
+    def save(self, obj, save_to_file=True):
+        """Save an object"""
+        with self._lock:
+            # Objects loaded from disk were checked when first saved
+            if save_to_file:
+                self._check_unique([obj])
+
+            stored = self._store(obj)
+
+            # Listeners first, so the snapshots taken when persisting
+            # match the derived indexes (see `add_snapshot_listener`).
+            # A failing one doesn't stop the change (see `_notify`)
+            self._notify("save", [stored])
+
+            if save_to_file:
+                self._persist("save", [stored])
+
+        return obj
+
+    def save_many(self, objs: list) -> list:
+        """Save several objects, persisting them once"""
+        with self._lock:
+            self._check_unique(objs)
+            stored = [self._store(obj) for obj in objs]
+
+            if stored:
+                self._notify("save", stored)
+                self._persist("save", stored)
+
+        return objs
+
+    def update(self, obj):
+        """Update an object"""
+        with self._lock:
+            self._check_unique([obj])
+            stored = self._refresh(obj)
+
+            if stored is None:
+                return None
+
+            self._notify("update", [stored])
+            self._persist("update", [stored])
+
+        return obj
+
+    def update_many(self, objs: list) -> list:
+        """Update several objects, persisting them once"""
+        with self._lock:
+            self._check_unique(objs)
+            stored = [self._refresh(obj) for obj in objs]
+            updated = [
+                obj for obj, new in zip(objs, stored) if new is not None
+            ]
+
+            if updated:
+                stored = [new for new in stored if new is not None]
+                self._notify("update", stored)
+                self._persist("update", stored)
+
+        return updated
+
+    def delete(self, obj) -> bool:
+        """Delete an object"""
+        with self._lock:
+            if not self._remove(model_key(obj.__class__), object_key(obj)):
+                return False
+
+            self._notify("delete", [obj])
+            self._persist("delete", [obj])
+
+        return True
+
+    def delete_many(self, objs: list) -> int:
+        """Delete several objects, persisting them once"""
+        with self._lock:
+            deleted = [
+                obj
+                for obj in objs
+                if self._remove(model_key(obj.__class__), object_key(obj))
+            ]
+
+            if deleted:
+                self._notify("delete", deleted)
+                self._persist("delete", deleted)
+
+        return len(deleted)
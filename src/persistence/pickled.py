@@ -1,77 +1,95 @@
 """
 This module exports a Repository that persists data in a pickle file
+
+With "group" durability the writes are left to a background Flusher
+(see ``src/persistence/flusher.py``) instead of happening on every change.
 """
 
+import os
 import pickle
-from src.persistence.repository import Repository
-from utils.constants import PICKLE_STORAGE_FILENAME
+from src.persistence.flusher import Flusher
+from src.persistence.indexed import VERSIONS_KEY, IndexedRepository
+from utils.constants import (
+    FLUSH_DIRTY_THRESHOLD,
+    FLUSH_INTERVAL,
+    PICKLE_STORAGE_FILENAME,
+)
 
 
-class PickleRepository(Repository):
+class PickleRepository(IndexedRepository):
     """Pickle Repository"""
 
     __filename = PICKLE_STORAGE_FILENAME
-    __data: dict[str, list] = {
-        "country": [],
-        "user": [],
-        "amenity": [],
-        "city": [],
-        "review": [],
-        "place": [],
-        "placeamenity": [],
-    }
-
-    def __init__(self) -> None:
-        """Calls reload method"""
-        self.reload()
+
+    def __init__(
+        self,
+        durability: str = "sync",
+        flush_interval: float = FLUSH_INTERVAL,
+        flush_threshold: int = FLUSH_DIRTY_THRESHOLD,
+        compact: bool = False,
+    ) -> None:
+        """
+        Calls reload method, the options are passed to the Flusher and
+        `compact` to IndexedRepository
+        """
+        self._flusher = Flusher(
+            self._save_to_file, durability, flush_interval, flush_threshold
+        )
+        super().__init__(compact)
+
+    def _persist(self, op, objs):
+        """Lets the Flusher decide when to save the data to the file"""
+        self._flusher.changed(len(objs))
+
+    def snapshot_path(self) -> str:
+        """Returns the data file"""
+        return self.__filename
+
+    def flush(self):
+        """Writes the changes the Flusher is holding back"""
+        self._flusher.flush()
+
+    def close(self):
+        """Stops the Flusher, writing the pending changes"""
+        self._flusher.close()
 
     def _save_to_file(self):
         """Helper method to save the current object data to the file"""
-        with open(self.__filename, "wb") as file:
-            pickle.dump(self.__data, file)
+        with self._lock:
+            dump = pickle.dumps(
+                {**self._data, VERSIONS_KEY: self._saved_versions()}
+            )
+            self._snapshot_taken()
+
+        # Written aside and renamed so a crash never leaves half a file
+        tmp_filename = f"{self.__filename}.tmp"
 
-    def get_all(self, model_name: str) -> list:
-        """Get all objects of a given model"""
-        return self.__data[model_name]
+        with open(tmp_filename, "wb") as file:
+            file.write(dump)
 
-    def get(self, model_name: str, obj_id: str):
-        """Get an object by its ID"""
-        for obj in self.__data[model_name]:
-            if obj.id == obj_id:
-                return obj
-        return None
+        os.replace(tmp_filename, self.__filename)
 
     def reload(self):
         """Reloads the data from the pickle file"""
         try:
             with open(self.__filename, "rb") as file:
-                self.__data = pickle.load(file)
+                data = pickle.load(file)
         except FileNotFoundError:
-            from src.models.country import Country
+            from src.models.country import COUNTRIES
 
-            self.__data["country"] = [Country("Uruguay", "UY")]
+            for country in COUNTRIES.values():
+                self.save(country, save_to_file=False)
             self._save_to_file()
+            return
 
-    def save(self, obj, save_to_file=True):
-        """Save an object"""
-        self.__data[obj.__class__.__name__.lower()].append(obj)
-        if save_to_file:
-            self._save_to_file()
+        versions = data.pop(VERSIONS_KEY, None)
+
+        for model, objects in data.items():
+            # Older files stored plain lists instead of id indexes
+            if isinstance(objects, dict):
+                objects = objects.values()
+            for obj in objects:
+                self.save(obj, save_to_file=False)
 
-    def update(self, obj):
-        """Update an object"""
-        for i, o in enumerate(self.__data[obj.__class__.__name__.lower()]):
-            if o.id == obj.id:
-                self.__data[obj.__class__.__name__.lower()][i] = obj
-                self._save_to_file()
-                return
-
-    def delete(self, obj) -> bool:
-        """Delete an object"""
-        for i, o in enumerate(self.__data[obj.__class__.__name__.lower()]):
-            if o.id == obj.id:
-                del self.__data[obj.__class__.__name__.lower()][i]
-                break
-
-        self._save_to_file()
-        return True
+        if versions:
+            self._restore_versions(versions)
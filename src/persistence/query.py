@@ -0,0 +1,285 @@
+"""
+This module exports the Query builder used to ask a repository for
+a filtered, sorted and limited subset of a model
+
+```
+Place.query().where(
+    city_id=city_id, price_per_night__lte=100
+).order_by("-created_at").limit(50).all()
+```
+
+Queries are immutable, every builder method returns a new query.
+The repository runs them with ``Repository.query``, compiling them to
+SQL or evaluating them against its indexes.
+"""
+
+from datetime import datetime
+import heapq
+from itertools import islice
+import operator
+from typing import Any, Iterator
+from sqlalchemy import Column
+from src.models.serializer import columns
+from src.persistence.repository import model_classes, model_key
+
+OPERATORS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "in": lambda value, values: value in values,
+}
+
+
+def model_fields(model: str) -> dict[str, Column]:
+    """Returns the columns declared by a model, keyed by field name"""
+    return columns(model_classes()[model])
+
+
+class Query:
+    """A query over the objects of a model"""
+
+    def __init__(self, model_name: str) -> None:
+        """Creates a query returning every object of the model"""
+        self.model = model_key(model_name)
+        # (field, operator name, value)
+        self.filters: tuple[tuple[str, str, Any], ...] = ()
+        # (field, descending)
+        self.ordering: tuple[tuple[str, bool], ...] = ()
+        self.limit_count: int | None = None
+        self.offset_count = 0
+        # Values of the ordering fields the results must come after
+        self.cursor: tuple | None = None
+
+    def _copy(self, **changes) -> "Query":
+        """Returns a copy of the query with some attributes changed"""
+        query = Query.__new__(Query)
+        query.__dict__.update(self.__dict__, **changes)
+        return query
+
+    def _check_field(self, field: str) -> None:
+        """Raises ValueError if the model doesn't declare the field"""
+        if field not in model_fields(self.model):
+            raise ValueError(f"Unknown field for {self.model}: {field}")
+
+    def where(self, **conditions) -> "Query":
+        """
+        Adds conditions, written as `field=value` or `field__op=value`
+        where op is one of eq, ne, lt, lte, gt, gte or in
+        """
+        filters = []
+
+        for condition, value in conditions.items():
+            field, _, op = condition.partition("__")
+            op = op or "eq"
+
+            if op not in OPERATORS:
+                raise ValueError(f"Unknown operator: {op}")
+            self._check_field(field)
+
+            filters.append((field, op, value))
+
+        return self._copy(filters=self.filters + tuple(filters))
+
+    def order_by(self, *fields: str) -> "Query":
+        """Sorts by the fields, a leading "-" sorts descending"""
+        ordering = []
+
+        for field in fields:
+            descending = field.startswith("-")
+            field = field.lstrip("-")
+            self._check_field(field)
+            ordering.append((field, descending))
+
+        return self._copy(ordering=tuple(ordering))
+
+    def after(self, *values) -> "Query":
+        """
+        Keyset pagination, only returns the objects that come after
+        the given values of the ordering fields
+        """
+        directions = {descending for _, descending in self.ordering}
+
+        if len(values) != len(self.ordering) or len(directions) != 1:
+            raise ValueError(
+                "after needs one value per ordering field, "
+                "all sorted in the same direction"
+            )
+
+        return self._copy(cursor=tuple(values))
+
+    def descending(self) -> bool:
+        """Checks if the ordering is descending"""
+        return any(descending for _, descending in self.ordering)
+
+    def sort_key(self, obj) -> tuple:
+        """Returns the values of the ordering fields of an object"""
+        return tuple(getattr(obj, field) for field, _ in self.ordering)
+
+    def limit(self, count: int | None) -> "Query":
+        """Returns at most `count` objects"""
+        return self._copy(limit_count=count)
+
+    def offset(self, count: int) -> "Query":
+        """Skips the first `count` objects"""
+        return self._copy(offset_count=count)
+
+    def all(self) -> list:
+        """Runs the query on the current repository"""
+        from src.persistence import repo
+
+        return repo.query(self)
+
+    def first(self) -> Any | None:
+        """Returns the first object of the query, if any"""
+        objs = self.limit(1).all()
+        return objs[0] if objs else None
+
+    def __iter__(self) -> Iterator:
+        """Iterates over the results of the query"""
+        return iter(self.all())
+
+    def batches(self, size: int) -> Iterator[list]:
+        """
+        Lazily runs the query in creation order, `size` objects at a
+        time, so the whole result is never held in memory at once
+        """
+        query = self.order_by("created_at", "id").limit(size)
+
+        if self.cursor is not None:
+            query = query.after(*self.cursor)
+
+        while True:
+            objs = query.all()
+
+            if objs:
+                yield objs
+            if len(objs) < size:
+                return
+
+            query = query.after(objs[-1].created_at, objs[-1].id)
+
+    def equalities(self) -> dict:
+        """Returns the `field == value` conditions of the query"""
+        return {
+            field: value for field, op, value in self.filters if op == "eq"
+        }
+
+    def id_lookup(self) -> tuple[Any, "Query"] | None:
+        """
+        Returns the ids an `id` or `id__in` condition restricts the query
+        to and the query without that condition, None if it has none.
+        Backends keeping objects by id fetch those directly
+        """
+        for position, (field, op, value) in enumerate(self.filters):
+            if field == "id" and op in ("eq", "in"):
+                rest = self.filters[:position] + self.filters[position + 1:]
+
+                return [value] if op == "eq" else value, self._copy(
+                    filters=rest
+                )
+
+        return None
+
+    def matches(self, obj) -> bool:
+        """Checks if an object meets every condition of the query"""
+        if self.cursor is not None:
+            key = self.sort_key(obj)
+
+            if self.descending():
+                if key >= self.cursor:
+                    return False
+            elif key <= self.cursor:
+                return False
+
+        return all(
+            OPERATORS[op](getattr(obj, field), value)
+            for field, op, value in self.filters
+        )
+
+    def apply(self, objs) -> list:
+        """
+        Runs the query over an iterable of candidate objects
+
+        Used by the backends that can't compile the query, after
+        narrowing the candidates down with their indexes
+        """
+        objs = (obj for obj in objs if self.matches(obj))
+        end = None
+
+        if self.limit_count is not None:
+            end = self.offset_count + self.limit_count
+
+        if self.ordering:
+            directions = {descending for _, descending in self.ordering}
+            if end is not None and directions == {False}:
+                # Partial sort, only the first `end` objects are needed
+                objs = heapq.nsmallest(end, objs, key=self.sort_key)
+            elif end is not None and directions == {True}:
+                objs = heapq.nlargest(end, objs, key=self.sort_key)
+            else:
+                objs = list(objs)
+                # Stable sorts, from the last field to the first one
+                for field, descending in reversed(self.ordering):
+                    objs.sort(
+                        key=operator.attrgetter(field), reverse=descending
+                    )
+        elif end is not None:
+            objs = islice(objs, end)
+
+        objs = list(objs)
+
+        return objs[self.offset_count:end]
+
+
+def _boolean(value: str) -> bool:
+    """Converts a query string value to a boolean"""
+    if value.lower() in ("true", "1"):
+        return True
+    if value.lower() in ("false", "0"):
+        return False
+    raise ValueError(value)
+
+
+def args_conditions(model: str, args: dict, ignore=()) -> dict:
+    """
+    Builds `where` conditions from the query string of a request,
+    converting the values to the python type of each column
+
+    The values of `__in` conditions are separated by commas
+    """
+    fields = model_fields(model)
+    conditions = {}
+
+    for condition, value in args.items():
+        if condition in ignore:
+            continue
+
+        field, _, op = condition.partition("__")
+
+        if field not in fields:
+            raise ValueError(f"Unknown field for {model}: {field}")
+
+        try:
+            cast = fields[field].type.python_type
+        except NotImplementedError:
+            cast = str
+
+        if cast is datetime:
+            cast = datetime.fromisoformat
+        elif cast is bool:
+            cast = _boolean
+
+        try:
+            if op == "in":
+                value = [cast(v) for v in value.split(",")]
+            else:
+                value = cast(value)
+        except ValueError:
+            raise ValueError(f"Invalid value for {field}: {value}")
+
+        conditions[condition] = value
+
+    return conditions
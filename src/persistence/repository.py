@@ -1,11 +1,92 @@
 """ Repository pattern for data access layer """
 
 from abc import ABC, abstractmethod
+from datetime import datetime
+import logging
+from typing import Callable
+
+# Child of the logger of the Flask app, which is named after `src`
+logger = logging.getLogger(__name__)
+
+
+def model_key(model) -> str:
+    """
+    Normalizes a model reference to the key used by the repositories
+
+    Accepts a model name ("place"), a model class (Place) or an
+    SQLAlchemy text clause (text("Place")).
+    """
+    if isinstance(model, type):
+        return model.__name__.lower()
+    return str(model).lower()
+
+
+def object_key(obj) -> str:
+    """Returns the primary key of an object (countries use their code)"""
+    obj_id = getattr(obj, "id", None)
+
+    if obj_id is None:
+        return obj.code
+
+    return obj_id
+
+
+def model_classes() -> dict[str, type]:
+    """Returns the model classes keyed by their repository model name"""
+    from src.models.amenity import Amenity, PlaceAmenity
+    from src.models.city import City
+    from src.models.country import Country
+    from src.models.place import Place
+    from src.models.review import Review
+    from src.models.user import User
+
+    return {
+        "amenity": Amenity,
+        "city": City,
+        "country": Country,
+        "place": Place,
+        "placeamenity": PlaceAmenity,
+        "review": Review,
+        "user": User,
+    }
+
+
+class DuplicateError(ValueError):
+    """
+    Raised when saving or updating an object would give it the values of
+    a unique index (see `Repository.unique_indexes`) another object has
+    """
+
+    def __init__(self, model: str, fields: tuple[str, ...]) -> None:
+        """Tells the model and the fields of the violated index"""
+        self.model = model
+        self.fields = fields
+        super().__init__(f"A {model} with this {', '.join(fields)} exists")
 
 
 class Repository(ABC):
     """Abstract class for repository pattern"""
 
+    # Secondary indexes, model name -> indexed field tuples.
+    # Backends keep them up to date and use them in `find_by`
+    indexes: dict[str, tuple[tuple[str, ...], ...]] = {
+        "city": (("country_code",),),
+        "place": (("city_id",), ("host_id",)),
+        "review": (("place_id",), ("user_id",)),
+        "placeamenity": (
+            ("place_id", "amenity_id"),
+            ("place_id",),
+            ("amenity_id",),
+        ),
+        "user": (("email",),),
+    }
+
+    # Indexes of `indexes` no two objects of the model can share the
+    # values of, writes breaking them raise DuplicateError
+    unique_indexes: dict[str, tuple[tuple[str, ...], ...]] = {
+        "user": (("email",),),
+    }
+
     @abstractmethod
     def reload(self) -> None:
         """Reload data to the repository"""
@@ -29,3 +110,153 @@ class Repository(ABC):
     @abstractmethod
     def delete(self, obj) -> bool:
         """Delete an object"""
+
+    def save_many(self, objs: list) -> list:
+        """
+        Save several objects
+
+        This default implementation saves them one by one, backends
+        should override it to save them in a single batch
+        """
+        for obj in objs:
+            self.save(obj)
+
+        return objs
+
+    def update_many(self, objs: list) -> list:
+        """
+        Update several objects, returns the ones that were updated
+
+        This default implementation updates them one by one, backends
+        should override it to update them in a single batch
+        """
+        return [obj for obj in objs if self.update(obj)]
+
+    def delete_many(self, objs: list) -> int:
+        """
+        Delete several objects, returns how many were deleted
+
+        This default implementation deletes them one by one, backends
+        should override it to delete them in a single batch
+        """
+        return sum(1 for obj in objs if self.delete(obj))
+
+    def find_by(self, model_name: str, **criteria) -> list:
+        """
+        Get all objects of a model whose fields equal the criteria
+
+        This default implementation scans the whole model, backends
+        should override it to use their indexes
+        """
+        return [
+            obj
+            for obj in self.get_all(model_name)
+            if all(getattr(obj, k) == v for k, v in criteria.items())
+        ]
+
+    def query(self, query) -> list:
+        """
+        Run a Query (see src/persistence/query.py)
+
+        This default implementation narrows the candidates down with
+        `find_by` and evaluates the rest of the query in Python,
+        backends that speak SQL should override it to compile the query
+        """
+        equalities = query.equalities()
+
+        if equalities:
+            objs = self.find_by(query.model, **equalities)
+        else:
+            objs = self.get_all(query.model)
+
+        return query.apply(objs)
+
+    def add_listener(self, listener: Callable[[str, str, list], None]) -> None:
+        """
+        Registers a function called after every change made through this
+        repository, with the operation ("save", "update" or "delete"),
+        the model name and the changed objects of that model. Derived
+        indexes (see src/indexes/) use it to stay in sync
+        """
+        if "_listeners" not in vars(self):
+            self._listeners: list[Callable[[str, str, list], None]] = []
+
+        self._listeners.append(listener)
+
+    def _notify(self, op: str, objs: list) -> None:
+        """
+        Calls the listeners once per model of the changed objects. A
+        failing listener is logged and the others still called, the
+        change is made and persisted whatever they do
+        """
+        listeners = vars(self).get("_listeners")
+
+        if not listeners or not objs:
+            return
+
+        by_model: dict[str, list] = {}
+
+        for obj in objs:
+            by_model.setdefault(model_key(obj.__class__), []).append(obj)
+
+        for model, changed in by_model.items():
+            for listener in listeners:
+                try:
+                    listener(op, model, changed)
+                except Exception:
+                    logger.exception("Repository listener failed")
+
+    def snapshot_path(self) -> str | None:
+        """
+        Returns the file the repository writes snapshots of its data to,
+        None if it doesn't write any
+        """
+        return None
+
+    def add_snapshot_listener(self, listener: Callable[[str], None]) -> None:
+        """
+        Registers a function called with `snapshot_path()` every time the
+        repository takes a snapshot of its data, before any other change
+        can happen and after the listeners of `add_listener` got all the
+        changes it holds. Derived indexes use it to save their own snapshot
+        """
+        if "_snapshot_listeners" not in vars(self):
+            self._snapshot_listeners: list[Callable[[str], None]] = []
+
+        self._snapshot_listeners.append(listener)
+
+    def _snapshot_taken(self) -> None:
+        """Calls the snapshot listeners, logging the failing ones"""
+        for listener in vars(self).get("_snapshot_listeners", ()):
+            try:
+                listener(self.snapshot_path())
+            except Exception:
+                logger.exception("Repository snapshot listener failed")
+
+    def version(self, model_name: str) -> tuple[str, datetime | None]:
+        """
+        Returns a token that changes whenever an object of the model is
+        saved, updated or deleted, and when that last happened
+
+        This default implementation derives them from the objects count
+        and their latest `updated_at`, backends should override it to
+        keep a counter instead of reading the whole model
+        """
+        objs = self.get_all(model_name)
+        modified = max(
+            (getattr(obj, "updated_at", None) or datetime.min for obj in objs),
+            default=None,
+        )
+
+        if modified == datetime.min:
+            modified = None
+
+        stamp = modified.timestamp() if modified else 0
+
+        return f"{len(objs)}-{stamp}", modified
+
+    def flush(self) -> None:
+        """
+        Write the pending changes, for backends that don't persist
+        every change right away. Does nothing by default
+        """
@@ -72,4 +72,19 @@ CREATE TABLE IF NOT EXISTS hbnb_db.PlaceAmenity (
     place_id VARCHAR(36) NOT NULL,
     FOREIGN KEY (amenity_id) REFERENCES hbnb_db.Amenity (id),
     FOREIGN KEY (place_id) REFERENCES hbnb_db.Place (id)
-);
\ No newline at end of file
+);
+-- Secondary indexes (see Repository.indexes)
+CREATE INDEX idx_city_country_code ON hbnb_db.City (country_code);
+CREATE INDEX idx_place_city_id ON hbnb_db.Place (city_id);
+CREATE INDEX idx_place_host_id ON hbnb_db.Place (host_id);
+CREATE INDEX idx_review_place_id ON hbnb_db.Review (place_id);
+CREATE INDEX idx_review_user_id ON hbnb_db.Review (user_id);
+CREATE INDEX idx_placeamenity_place_amenity ON hbnb_db.PlaceAmenity (place_id, amenity_id);
+CREATE INDEX idx_placeamenity_amenity_id ON hbnb_db.PlaceAmenity (amenity_id);
+
+-- Keyset pagination indexes, (created_at, id) is the page order
+CREATE INDEX idx_city_created ON hbnb_db.City (created_at, id);
+CREATE INDEX idx_user_created ON hbnb_db.User (created_at, id);
+CREATE INDEX idx_place_created ON hbnb_db.Place (created_at, id);
+CREATE INDEX idx_review_created ON hbnb_db.Review (created_at, id);
+CREATE INDEX idx_amenity_created ON hbnb_db.Amenity (created_at, id);
@@ -0,0 +1,491 @@
+"""
+This module exports a Repository that persists data in a SQLite
+database using the stdlib sqlite3 module
+
+- The database runs in WAL mode, so readers don't block the writer
+- Every thread gets its own connection
+- The SQL of every statement is built once per model, sqlite3 keeps
+  the compiled statements cached per connection
+- The columns declared in ``Repository.indexes`` are indexed, with
+  unique indexes for ``Repository.unique_indexes``
+- The ``_versions`` table counts the changes of every model, it is
+  bumped in the same transaction as the change
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import sqlite3
+import threading
+from src.persistence.indexed import instantiate
+from src.persistence.repository import (
+    DuplicateError,
+    Repository,
+    model_key,
+    object_key,
+)
+from utils.constants import SQLITE_STORAGE_FILENAME
+from utils.countries import ISO_3166
+
+# `in` conditions with more values are passed as a JSON array
+MAX_IN_PARAMS = 500
+
+SQL_OPERATORS = {
+    "eq": "=",
+    "ne": "!=",
+    "lt": "<",
+    "lte": "<=",
+    "gt": ">",
+    "gte": ">=",
+}
+
+# Stored columns of every model, the first one is the primary key
+COLUMNS: dict[str, tuple[str, ...]] = {
+    "country": ("code", "name"),
+    "user": (
+        "id",
+        "email",
+        "first_name",
+        "last_name",
+        "password_hash",
+        "is_admin",
+        "created_at",
+        "updated_at",
+    ),
+    "amenity": ("id", "name", "created_at", "updated_at"),
+    "city": ("id", "name", "country_code", "created_at", "updated_at"),
+    "place": (
+        "id",
+        "name",
+        "description",
+        "address",
+        "latitude",
+        "longitude",
+        "city_id",
+        "host_id",
+        "price_per_night",
+        "number_of_rooms",
+        "number_of_bathrooms",
+        "max_guests",
+        "created_at",
+        "updated_at",
+    ),
+    "review": (
+        "id",
+        "place_id",
+        "user_id",
+        "comment",
+        "rating",
+        "created_at",
+        "updated_at",
+    ),
+    "placeamenity": (
+        "id",
+        "place_id",
+        "amenity_id",
+        "created_at",
+        "updated_at",
+    ),
+}
+
+
+BUMP_VERSION = (
+    "INSERT INTO _versions (model, version, modified) VALUES (?, 1, ?) "
+    "ON CONFLICT(model) DO UPDATE SET "
+    "version = version + 1, modified = excluded.modified"
+)
+
+
+def _param(value):
+    """Converts a value to the type it is stored as"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+
+    return value
+
+
+def _value(obj, column: str):
+    """Returns the value stored for a column of an object"""
+    # Read from the instance, the class attributes are SQLAlchemy columns
+    return _param(vars(obj).get(column))
+
+
+class SQLiteRepository(Repository):
+    """SQLite Repository"""
+
+    def __init__(self, filename: str = SQLITE_STORAGE_FILENAME) -> None:
+        """Builds the statements and calls reload method"""
+        self._filename = filename
+        self._local = threading.local()
+        self._sql: dict[str, dict[str, str]] = {}
+
+        for model, columns in COLUMNS.items():
+            key, names = columns[0], ", ".join(columns)
+            params = ", ".join("?" for _ in columns)
+
+            self._sql[model] = {
+                "get_all": f"SELECT {names} FROM {model} ORDER BY rowid",
+                "get": f"SELECT {names} FROM {model} WHERE {key} = ?",
+                # A taken key raises DuplicateError, see `_transaction`
+                "save": f"INSERT INTO {model} ({names}) VALUES ({params})",
+                "update": (
+                    f"UPDATE {model} SET "
+                    + ", ".join(f"{c} = ?" for c in columns[1:])
+                    + f" WHERE {key} = ?"
+                ),
+                "delete": f"DELETE FROM {model} WHERE {key} = ?",
+            }
+
+        self.reload()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Returns the connection of the current thread"""
+        connection = getattr(self._local, "connection", None)
+
+        if connection is None:
+            connection = sqlite3.connect(self._filename, cached_statements=256)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            self._local.connection = connection
+
+        return connection
+
+    @contextmanager
+    def _transaction(self, connection: sqlite3.Connection):
+        """
+        Runs a transaction on the connection, rolled back if it fails,
+        a violated unique index raises DuplicateError
+        """
+        try:
+            with connection:
+                yield connection
+        except sqlite3.IntegrityError as e:
+            prefix = "UNIQUE constraint failed: "
+
+            if not str(e).startswith(prefix):
+                raise
+
+            # The columns are listed as table.column
+            columns = [c.split(".") for c in str(e)[len(prefix):].split(", ")]
+
+            raise DuplicateError(
+                columns[0][0], tuple(column for _, column in columns)
+            ) from e
+
+    def _instantiate(self, model: str, row: sqlite3.Row):
+        """Builds a model instance from a row"""
+        values = dict(row)
+
+        if "is_admin" in values:
+            values["is_admin"] = bool(values["is_admin"])
+
+        return instantiate(model, values)
+
+    def _bump(self, connection: sqlite3.Connection, models) -> None:
+        """Counts a change of every model, inside the open transaction"""
+        now = datetime.now().isoformat()
+        connection.executemany(BUMP_VERSION, [(m, now) for m in models])
+
+    def _params(self, model: str, obj) -> tuple:
+        """Returns the column values of an object, in the table order"""
+        return tuple(_value(obj, column) for column in COLUMNS[model])
+
+    def reload(self) -> None:
+        """Creates the tables and indexes, and the countries"""
+        connection = self._connection()
+
+        with connection:
+            for model, columns in COLUMNS.items():
+                definitions = ", ".join(
+                    [f"{columns[0]} TEXT PRIMARY KEY"] + list(columns[1:])
+                )
+                connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {model} ({definitions})"
+                )
+
+                if "created_at" in columns:
+                    # Keyset pagination walks this index
+                    connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_{model}_created "
+                        f"ON {model} (created_at, {columns[0]})"
+                    )
+
+                for fields in self.indexes.get(model, ()):
+                    unique = fields in self.unique_indexes.get(model, ())
+                    connection.execute(
+                        f"CREATE {'UNIQUE ' if unique else ''}INDEX "
+                        f"IF NOT EXISTS idx_{model}_{'_'.join(fields)} "
+                        f"ON {model} ({', '.join(fields)})"
+                    )
+
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS _versions "
+                "(model TEXT PRIMARY KEY, version INTEGER, modified TEXT)"
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO country (code, name) VALUES (?, ?)",
+                ISO_3166,
+            )
+
+    def version(self, model_name: str) -> tuple[str, datetime | None]:
+        """Returns the version counter of a model and its last change"""
+        row = (
+            self._connection()
+            .execute(
+                "SELECT version, modified FROM _versions WHERE model = ?",
+                (model_key(model_name),),
+            )
+            .fetchone()
+        )
+
+        if row is None:
+            return "0", None
+
+        return str(row["version"]), datetime.fromisoformat(row["modified"])
+
+    def get_all(self, model_name: str) -> list:
+        """Get all objects of a given model"""
+        model = model_key(model_name)
+        rows = self._connection().execute(self._sql[model]["get_all"])
+
+        return [self._instantiate(model, row) for row in rows]
+
+    def get(self, model_name: str, obj_id: str):
+        """Get an object by its ID"""
+        model = model_key(model_name)
+        row = (
+            self._connection()
+            .execute(self._sql[model]["get"], (obj_id,))
+            .fetchone()
+        )
+
+        return self._instantiate(model, row) if row else None
+
+    def find_by(self, model_name: str, **criteria) -> list:
+        """Get all objects of a model whose fields equal the criteria"""
+        model = model_key(model_name)
+        unknown = criteria.keys() - set(COLUMNS[model])
+
+        if unknown:
+            raise ValueError(f"Unknown fields for {model}: {unknown}")
+
+        where = " AND ".join(f"{field} = ?" for field in criteria)
+        rows = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS[model])} FROM {model} "
+            f"WHERE {where} ORDER BY rowid",
+            tuple(criteria.values()),
+        )
+
+        return [self._instantiate(model, row) for row in rows]
+
+    def query(self, query) -> list:
+        """Compiles a Query to a SELECT statement and runs it"""
+        model = query.model
+        columns = COLUMNS[model]
+        conditions, params = [], []
+
+        for field, op, value in query.filters:
+            if field not in columns:
+                raise ValueError(f"Unknown field for {model}: {field}")
+
+            if op == "in" and len(value) > MAX_IN_PARAMS:
+                # A single JSON parameter instead of one per value
+                conditions.append(
+                    f"{field} IN (SELECT value FROM json_each(?))"
+                )
+                params.append(json.dumps([_param(v) for v in value]))
+            elif op == "in":
+                values = [_param(v) for v in value]
+                conditions.append(
+                    f"{field} IN ({', '.join('?' for _ in values)})"
+                )
+                params.extend(values)
+            else:
+                conditions.append(f"{field} {SQL_OPERATORS[op]} ?")
+                params.append(_param(value))
+
+        if query.cursor is not None:
+            fields = ", ".join(field for field, _ in query.ordering)
+            marks = ", ".join("?" for _ in query.cursor)
+            op = "<" if query.descending() else ">"
+            conditions.append(f"({fields}) {op} ({marks})")
+            params.extend(_param(value) for value in query.cursor)
+
+        sql = f"SELECT {', '.join(columns)} FROM {model}"
+
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+
+        ordering = [
+            f"{field} DESC" if descending else field
+            for field, descending in query.ordering
+            if field in columns
+        ]
+        sql += " ORDER BY " + ", ".join(ordering + ["rowid"])
+
+        if query.limit_count is not None or query.offset_count:
+            sql += " LIMIT ? OFFSET ?"
+            limit = query.limit_count
+            params += [-1 if limit is None else limit, query.offset_count]
+
+        rows = self._connection().execute(sql, params)
+
+        return [self._instantiate(model, row) for row in rows]
+
+    def save(self, obj) -> None:
+        """Save an object"""
+        model = model_key(obj.__class__)
+        connection = self._connection()
+
+        with self._transaction(connection):
+            connection.execute(
+                self._sql[model]["save"], self._params(model, obj)
+            )
+            self._bump(connection, (model,))
+
+        self._notify("save", [obj])
+
+        return obj
+
+    def _execute_many(self, statement: str, params: dict) -> None:
+        """Runs a statement for the params of every model in one transaction"""
+        connection = self._connection()
+
+        with self._transaction(connection):
+            for model, rows in params.items():
+                connection.executemany(self._sql[model][statement], rows)
+
+            self._bump(connection, params)
+
+    def save_many(self, objs: list) -> list:
+        """Save several objects in a single transaction"""
+        params: dict[str, list[tuple]] = {}
+
+        for obj in objs:
+            model = model_key(obj.__class__)
+            params.setdefault(model, []).append(self._params(model, obj))
+
+        self._execute_many("save", params)
+        self._notify("save", objs)
+
+        return objs
+
+    def update(self, obj):
+        """Update an object"""
+        model = model_key(obj.__class__)
+        connection = self._connection()
+
+        obj.updated_at = datetime.now()
+        params = self._params(model, obj)
+
+        with self._transaction(connection):
+            cursor = connection.execute(
+                self._sql[model]["update"], params[1:] + params[:1]
+            )
+
+            if cursor.rowcount:
+                self._bump(connection, (model,))
+
+        if not cursor.rowcount:
+            return None
+
+        self._notify("update", [obj])
+
+        return obj
+
+    def update_many(self, objs: list) -> list:
+        """Update several objects in a single transaction"""
+        connection = self._connection()
+        now = datetime.now()
+        updated = []
+
+        # Executed one by one (still one commit) to know which matched
+        with self._transaction(connection):
+            for obj in objs:
+                model = model_key(obj.__class__)
+                obj.updated_at = now
+                params = self._params(model, obj)
+                cursor = connection.execute(
+                    self._sql[model]["update"], params[1:] + params[:1]
+                )
+
+                if cursor.rowcount:
+                    updated.append(obj)
+
+            self._bump(
+                connection, {model_key(obj.__class__) for obj in updated}
+            )
+
+        self._notify("update", updated)
+
+        return updated
+
+    def delete_many(self, objs: list) -> int:
+        """
+        Delete several objects in a single transaction, returns how many
+        were deleted
+        """
+        keys: dict[str, set[str]] = {}
+
+        for obj in objs:
+            keys.setdefault(model_key(obj.__class__), set()).add(
+                object_key(obj)
+            )
+
+        connection = self._connection()
+        found: dict[str, set[str]] = {}
+        deleted = 0
+
+        with self._transaction(connection):
+            for model, model_keys in keys.items():
+                key = COLUMNS[model][0]
+                # Only the stored ones are deleted, and notified
+                found[model] = {
+                    row[0]
+                    for row in connection.execute(
+                        f"SELECT {key} FROM {model} WHERE {key} IN "
+                        "(SELECT value FROM json_each(?))",
+                        (json.dumps(list(model_keys)),),
+                    )
+                }
+                cursor = connection.executemany(
+                    self._sql[model]["delete"],
+                    [(obj_key,) for obj_key in found[model]],
+                )
+                deleted += max(cursor.rowcount, 0)
+
+            self._bump(connection, [m for m in found if found[m]])
+
+        removed = []
+
+        for obj in objs:
+            model_found = found[model_key(obj.__class__)]
+
+            if object_key(obj) in model_found:
+                model_found.discard(object_key(obj))
+                removed.append(obj)
+
+        self._notify("delete", removed)
+
+        return deleted
+
+    def delete(self, obj) -> bool:
+        """Delete an object"""
+        model = model_key(obj.__class__)
+        connection = self._connection()
+
+        with connection:
+            cursor = connection.execute(
+                self._sql[model]["delete"], (object_key(obj),)
+            )
+
+            if cursor.rowcount:
+                self._bump(connection, (model,))
+
+        if not cursor.rowcount:
+            return False
+
+        self._notify("delete", [obj])
+
+        return True
@@ -3,6 +3,7 @@ from flask_jwt_extended import jwt_required, get_jwt
 from src.controllers.amenities import create_amenity, update_amenity, delete_amenity
 from src.controllers.cities import create_city, update_city, delete_city
 from src.controllers.places import create_place, delete_place, update_place
+from src.controllers.reviews import repair_ratings
 from src.controllers.users import create_user, update_user, delete_user
 
 admin_bp = Blueprint('admin', __name__)
@@ -69,3 +70,10 @@ def admin_update_user(user_id):
 def admin_delete_user(user_id):
     delete_user(user_id)
     return '', 204
+
+
+# Derived indexes block
+@admin_bp.route('/admin/ratings/repair', methods=['POST'])
+def admin_repair_ratings():
+    """Rebuilds the rating aggregates, returns how many had drifted"""
+    return repair_ratings()
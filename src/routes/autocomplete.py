@@ -0,0 +1,12 @@
+"""
+This module contains the routes for the autocomplete blueprint
+"""
+
+from flask import Blueprint
+from src.controllers.autocomplete import autocomplete
+
+autocomplete_bp = Blueprint(
+    "autocomplete", __name__, url_prefix="/autocomplete"
+)
+
+autocomplete_bp.route("/", methods=["GET"])(autocomplete)
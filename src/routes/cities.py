@@ -8,6 +8,7 @@ from src.controllers.cities import (
     delete_city,
     get_city_by_id,
     get_cities,
+    get_top_places,
     update_city,
 )
 
@@ -15,6 +16,7 @@ cities_bp = Blueprint("cities", __name__, url_prefix="/cities")
 
 cities_bp.route("/", methods=["GET"])(get_cities)
 cities_bp.route("/<city_id>", methods=["GET"])(get_city_by_id)
+cities_bp.route("/<city_id>/top-places", methods=["GET"])(get_top_places)
 
 # cities_bp.route("/", methods=["POST"])(create_city)
 # cities_bp.route("/<city_id>", methods=["PUT"])(update_city)
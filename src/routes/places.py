@@ -6,15 +6,29 @@ from flask import Blueprint
 from src.controllers.places import (
     create_place,
     delete_place,
+    get_place_amenities,
     get_place_by_id,
+    get_place_rating,
     get_places,
+    nearby_places,
+    place_clusters,
+    places_within,
+    search_places,
     update_place,
 )
 
 places_bp = Blueprint("places", __name__, url_prefix="/places")
 
 places_bp.route("/", methods=["GET"])(get_places)
+places_bp.route("/search", methods=["GET"])(search_places)
+places_bp.route("/nearby", methods=["GET"])(nearby_places)
+places_bp.route("/within", methods=["GET"])(places_within)
+places_bp.route("/clusters", methods=["GET"])(place_clusters)
 places_bp.route("/<place_id>", methods=["GET"])(get_place_by_id)
+places_bp.route("/<place_id>/amenities", methods=["GET"])(
+    get_place_amenities
+)
+places_bp.route("/<place_id>/rating", methods=["GET"])(get_place_rating)
 
 # places_bp.route("/", methods=["POST"])(create_place)
 # places_bp.route("/<place_id>", methods=["PUT"])(update_place)
@@ -0,0 +1,148 @@
+"""
+Shared setup of the behavior tests
+
+Every test runs against a fresh repository, set as the one the models
+and controllers use, and rebuilds the derived indexes from it.
+"""
+
+from datetime import datetime, timedelta
+import itertools
+import os
+import tempfile
+import unittest
+import src.indexes
+import src.persistence
+from src.models.amenity import Amenity, PlaceAmenity
+from src.models.city import City
+from src.models.place import Place
+from src.models.review import Review
+from src.models.user import User
+from src.persistence.memory import MemoryRepository
+
+# Creation times one second apart, so creation order is predictable
+_clock = itertools.count()
+START = datetime(2024, 1, 1)
+
+
+def created_at() -> datetime:
+    """Returns a creation time later than every previous one"""
+    return START + timedelta(seconds=next(_clock))
+
+
+class RepositoryTestCase(unittest.TestCase):
+    """Runs every test with a fresh repository as the current one"""
+
+    def make_repository(self):
+        """Returns the repository of a test, overridden per backend"""
+        return MemoryRepository()
+
+    def setUp(self) -> None:
+        """Installs the repository and forgets the derived indexes"""
+        self.previous = src.persistence.repo
+        src.indexes._instances.clear()
+        self.repo = self.make_repository()
+        src.persistence.repo = self.repo
+
+    def tearDown(self) -> None:
+        """Puts the previous repository back"""
+        src.persistence.repo = self.previous
+        src.indexes._instances.clear()
+
+    def user(self, email: str | None = None, **values) -> User:
+        """Saves a user, with a password hash no password matches"""
+        values.setdefault("password_hash", "!")
+        user = User(
+            email=email or f"user{next(_clock)}@example.com",
+            first_name="Ada",
+            last_name="Lovelace",
+            created_at=created_at(),
+            **values,
+        )
+        self.repo.save(user)
+        return user
+
+    def city(self, name: str = "Montevideo", code: str = "UY") -> City:
+        """Saves a city"""
+        city = City(name=name, country_code=code, created_at=created_at())
+        self.repo.save(city)
+        return city
+
+    def place(self, city=None, host=None, **data) -> Place:
+        """Saves a place, in a new city and with a new host by default"""
+        city = city or self.city()
+        host = host or self.user()
+        place = Place(
+            data={
+                "name": "Place",
+                "latitude": -34.9,
+                "longitude": -56.16,
+                "price_per_night": 100,
+                "number_of_rooms": 1,
+                "number_of_bathrooms": 1,
+                "max_guests": 2,
+            }
+            | data
+            | {"city_id": city.id, "host_id": host.id},
+            created_at=created_at(),
+        )
+        self.repo.save(place)
+        return place
+
+    def review(self, place, rating: float, comment: str = "", user=None):
+        """Saves a review of a place"""
+        review = Review(
+            place_id=place.id,
+            user_id=(user or self.user()).id,
+            comment=comment,
+            rating=rating,
+            created_at=created_at(),
+        )
+        self.repo.save(review)
+        return review
+
+    def amenity(self, name: str) -> Amenity:
+        """Saves an amenity"""
+        amenity = Amenity(name=name, created_at=created_at())
+        self.repo.save(amenity)
+        return amenity
+
+    def link(self, place, amenity) -> PlaceAmenity:
+        """Gives an amenity to a place"""
+        link = PlaceAmenity(
+            place_id=place.id, amenity_id=amenity.id, created_at=created_at()
+        )
+        self.repo.save(link)
+        return link
+
+
+class AppTestCase(RepositoryTestCase):
+    """RepositoryTestCase with the Flask app and its test client"""
+
+    def setUp(self) -> None:
+        """Creates the app"""
+        super().setUp()
+
+        from src import create_app
+
+        self.app = create_app("src.config.TestingConfig")
+        self.client = self.app.test_client()
+
+
+class TemporaryDirectoryTestCase(RepositoryTestCase):
+    """
+    Runs every test in an empty temporary directory, where the file
+    backed repositories keep their files
+    """
+
+    def setUp(self) -> None:
+        """Moves to the temporary directory"""
+        self.cwd = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+        super().setUp()
+
+    def tearDown(self) -> None:
+        """Goes back and removes the temporary directory"""
+        super().tearDown()
+        os.chdir(self.cwd)
+        self.directory.cleanup()
@@ -0,0 +1,157 @@
+"""
+Tests of the amenity inverted index, of /places?amenities= and of
+/places/<id>/amenities
+"""
+
+import unittest
+from unittest import mock
+from src.indexes import derived_index
+from src.indexes.amenities import PlaceAmenities
+from src.persistence.query import Query
+from tests.base import AppTestCase
+
+
+class TestPlaceAmenities(AppTestCase):
+    """Posting sets of the places per amenity"""
+
+    def setUp(self):
+        """Saves places with some amenities"""
+        super().setUp()
+        self.wifi, self.pool, self.gym = (
+            self.amenity(name) for name in ("Wifi", "Pool", "Gym")
+        )
+        self.places = [self.place() for _ in range(3)]
+        self.link(self.places[0], self.wifi)
+        self.link(self.places[0], self.pool)
+        self.link(self.places[1], self.wifi)
+
+    def test_places_with_every_amenity(self):
+        """The posting sets are intersected"""
+        index = derived_index(PlaceAmenities)
+
+        self.assertEqual(
+            index.places_with([self.wifi.id]),
+            {self.places[0].id, self.places[1].id},
+        )
+        self.assertEqual(
+            index.places_with([self.wifi.id, self.pool.id]),
+            {self.places[0].id},
+        )
+        self.assertEqual(index.places_with([self.wifi.id, self.gym.id]), set())
+        self.assertEqual(index.places_with([]), set())
+
+    def test_repeated_links(self):
+        """A place keeps an amenity until its last link is deleted"""
+        index = derived_index(PlaceAmenities)
+        extra = self.link(self.places[1], self.wifi)
+
+        self.repo.delete(extra)
+        self.assertTrue(index.has(self.places[1].id, self.wifi.id))
+
+        (link,) = self.repo.find_by(
+            "placeamenity", place_id=self.places[1].id
+        )
+        self.repo.delete(link)
+        self.assertFalse(index.has(self.places[1].id, self.wifi.id))
+        self.assertEqual(index.amenities_of(self.places[1].id), set())
+
+
+class TestAmenitiesEndpoints(AppTestCase):
+    """GET /places?amenities= and /places/<id>/amenities"""
+
+    def setUp(self):
+        """Saves many places, a few of them with Wifi"""
+        super().setUp()
+        self.wifi = self.amenity("Wifi")
+        self.pool = self.amenity("Pool")
+        self.places = [self.place() for _ in range(60)]
+        self.with_wifi = [self.places[i] for i in (7, 23, 41, 59)]
+
+        for place in self.with_wifi:
+            self.link(place, self.wifi)
+        self.link(self.places[23], self.pool)
+
+    def ids(self, response) -> list:
+        """Returns the ids of the places of a response"""
+        self.assertEqual(response.status_code, 200, response.data)
+        return [place["id"] for place in response.json]
+
+    def test_by_name_or_id(self):
+        """Amenities are given by name or by id"""
+        by_name = self.client.get("/places?amenities=Wifi,Pool")
+        by_id = self.client.get(
+            f"/places?amenities={self.wifi.id},{self.pool.id}"
+        )
+
+        self.assertEqual(self.ids(by_name), [self.places[23].id])
+        self.assertEqual(self.ids(by_id), [self.places[23].id])
+
+    def test_pages_in_creation_order(self):
+        """The matching places are paged by cursor, like /places"""
+        url, ids = "/places?amenities=Wifi&limit=3", []
+
+        while url:
+            response = self.client.get(url)
+            ids += self.ids(response)
+            link = response.headers.get("Link")
+            url = link and link[1:link.index(">")]
+
+        self.assertEqual(ids, [place.id for place in self.with_wifi])
+
+    def test_only_the_matching_places_are_read(self):
+        """A page reads the places of the amenity, not every place"""
+        with mock.patch.object(
+            Query, "matches", autospec=True, side_effect=lambda q, o: True
+        ) as matches:
+            response = self.client.get("/places?amenities=Wifi&limit=2")
+
+        self.assertEqual(
+            self.ids(response), [place.id for place in self.with_wifi[:2]]
+        )
+        self.assertLessEqual(matches.call_count, 3)
+
+    def test_other_filters_apply(self):
+        """The amenities are combined with the other conditions"""
+        place = self.with_wifi[2]
+        place.price_per_night = 10
+        self.repo.update(place)
+
+        response = self.client.get(
+            "/places?amenities=Wifi&price_per_night__lt=50"
+        )
+
+        self.assertEqual(self.ids(response), [place.id])
+
+    def test_new_links_change_the_etag(self):
+        """The collection depends on the place amenities too"""
+        first = self.client.get("/places?amenities=Pool")
+        self.link(self.places[0], self.pool)
+
+        second = self.client.get(
+            "/places?amenities=Pool",
+            headers={"If-None-Match": first.headers["ETag"]},
+        )
+
+        self.assertEqual(len(self.ids(second)), 2)
+
+    def test_invalid_amenities(self):
+        """Unknown and empty amenities are refused"""
+        for amenities in ("Sauna", ",", ""):
+            with self.subTest(amenities=amenities):
+                response = self.client.get(f"/places?amenities={amenities}")
+                self.assertEqual(response.status_code, 400)
+
+    def test_amenities_of_a_place(self):
+        """The amenities of a place, sorted by name"""
+        response = self.client.get(f"/places/{self.places[23].id}/amenities")
+
+        self.assertEqual(
+            [amenity["name"] for amenity in response.json], ["Pool", "Wifi"]
+        )
+        self.assertEqual(
+            self.client.get("/places/missing/amenities").status_code, 404
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
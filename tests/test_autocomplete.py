@@ -0,0 +1,201 @@
+"""
+Tests of the prefix index of the city and place names and of
+/autocomplete
+"""
+
+import unittest
+from unittest import mock
+from src.indexes import autocomplete, derived_index
+from src.indexes.autocomplete import NameAutocomplete
+from tests.base import AppTestCase
+from utils.constants import AUTOCOMPLETE_MAX_LIMIT
+
+
+class TestNameAutocomplete(AppTestCase):
+    """Type-ahead of the cities and the places"""
+
+    def names(self, matches: list[dict]) -> list[str]:
+        """Returns the names of some matches"""
+        return [match["name"] for match in matches]
+
+    def test_prefix_of_any_word(self):
+        """Names are found from each of their words, without accents"""
+        self.city("New York", "US")
+        self.city("São Paulo", "BR")
+        index = derived_index(NameAutocomplete)
+
+        for query in ("new y", "YO", "york"):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    self.names(index.complete(query, 5)["city"]),
+                    ["New York"],
+                )
+        self.assertEqual(
+            self.names(index.complete("sao", 5)["city"]), ["São Paulo"]
+        )
+        self.assertEqual(index.complete("york c", 5)["city"], [])
+
+    def test_cities_by_number_of_places(self):
+        """Cities with more places come first, then by name"""
+        small, big = self.city("Paysandú"), self.city("Paso de los Toros")
+        self.place(big)
+        self.place(big)
+        self.place(small)
+        self.city("Pando")
+
+        (first, second, third) = derived_index(NameAutocomplete).complete(
+            "pa", 5, ("city",)
+        )["city"]
+
+        self.assertEqual([first["id"], second["id"]], [big.id, small.id])
+        self.assertEqual(
+            (first["places"], third["name"], third["places"]),
+            (2, "Pando", 0),
+        )
+
+    def test_places_by_rating(self):
+        """Places are ranked by the Bayesian average of their ratings"""
+        good, bad = self.place(name="Loft A"), self.place(name="Loft B")
+        self.review(good, 5)
+        self.review(bad, 1)
+
+        matches = derived_index(NameAutocomplete).complete(
+            "loft", 5, ("place",)
+        )
+
+        self.assertEqual(self.names(matches["place"]), ["Loft A", "Loft B"])
+        self.assertEqual(matches["place"][0]["rating"], 5.0)
+        self.assertNotIn("city", matches)
+
+    def test_follows_the_repository(self):
+        """Renamed and deleted names are reindexed"""
+        city = self.city("Colonia")
+        index = derived_index(NameAutocomplete)
+
+        city.name = "Carmelo"
+        self.repo.update(city)
+        self.assertEqual(index.complete("colo", 5)["city"], [])
+        self.assertEqual(
+            self.names(index.complete("car", 5)["city"]), ["Carmelo"]
+        )
+
+        self.repo.delete(city)
+        self.assertEqual(index.complete("car", 5)["city"], [])
+
+    def test_kept_rankings_follow_the_reviews(self):
+        """Rankings of short prefixes are kept until a review changes"""
+        first, second = self.place(name="Loft A"), self.place(name="Loft B")
+        self.review(first, 4)
+
+        with mock.patch.object(autocomplete, "AUTOCOMPLETE_SCAN_LIMIT", 1):
+            index = derived_index(NameAutocomplete)
+            self.assertEqual(
+                self.names(index.complete("l", 1)["place"]), ["Loft A"]
+            )
+            self.assertIn(("l", "place"), index.rankings)
+
+            self.review(second, 5)
+            self.review(second, 5)
+
+            self.assertEqual(
+                self.names(index.complete("l", 1)["place"]), ["Loft B"]
+            )
+
+    def test_only_the_touched_rankings_are_forgotten(self):
+        """Writes only drop the prefixes of the names they change"""
+        loft = self.place(name="Loft")
+        zen = self.place(name="Zen garden")
+        review = self.review(zen, 5)
+
+        with mock.patch.object(autocomplete, "AUTOCOMPLETE_SCAN_LIMIT", 0):
+            index = derived_index(NameAutocomplete)
+            index.complete("l", 1, ("place",))
+            index.complete("ga", 1, ("place",))
+
+            self.review(zen, 1)
+            self.place(name="Yurt")
+            self.assertIn(("l", "place"), index.rankings)
+            self.assertNotIn(("ga", "place"), index.rankings)
+
+            review.place_id = loft.id
+            self.repo.update(review)
+            self.assertNotIn(("l", "place"), index.rankings)
+
+    def test_places_moving_refresh_their_cities(self):
+        """The ranking of a city follows its number of places"""
+        paso, pando = self.city("Paso"), self.city("Pando")
+        place = self.place(paso)
+
+        with mock.patch.object(autocomplete, "AUTOCOMPLETE_SCAN_LIMIT", 0):
+            index = derived_index(NameAutocomplete)
+            self.assertEqual(
+                self.names(index.complete("pa", 1, ("city",))["city"]),
+                ["Paso"],
+            )
+
+            place.city_id = pando.id
+            self.repo.update(place)
+
+            self.assertEqual(
+                self.names(index.complete("pa", 1, ("city",))["city"]),
+                ["Pando"],
+            )
+
+    def test_places_without_a_name(self):
+        """Names are optional, the other places are still found"""
+        self.place(name=None)
+        self.place(name="Loft")
+
+        matches = derived_index(NameAutocomplete).complete("lo", 5)
+
+        self.assertEqual(self.names(matches["place"]), ["Loft"])
+
+
+class TestAutocompleteEndpoint(AppTestCase):
+    """GET /autocomplete"""
+
+    def test_autocomplete(self):
+        """Cities and places, or one of them with ?type="""
+        city = self.city("Montevideo")
+        self.place(city, name="Montevideo loft")
+
+        both = self.client.get("/autocomplete?q=mont")
+        places = self.client.get("/autocomplete?q=mont&type=place&limit=1")
+
+        self.assertEqual(both.status_code, 200)
+        self.assertEqual(
+            [match["id"] for match in both.json["city"]], [city.id]
+        )
+        self.assertEqual(len(both.json["place"]), 1)
+        self.assertEqual(list(places.json), ["place"])
+
+    def test_etag_follows_the_cities(self):
+        """A new city gives the completions a new ETag"""
+        self.city("Montevideo")
+        etag = self.client.get("/autocomplete?q=mont").headers["ETag"]
+        self.city("Montreal", "CA")
+
+        response = self.client.get(
+            "/autocomplete?q=mont", headers={"If-None-Match": etag}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json["city"]), 2)
+
+    def test_invalid_arguments(self):
+        """Queries without letters, bad limits and types are refused"""
+        for args in (
+            "",
+            "q=%20-",
+            "q=a&limit=0",
+            f"q=a&limit={AUTOCOMPLETE_MAX_LIMIT + 1}",
+            "q=a&limit=few",
+            "q=a&type=review",
+        ):
+            with self.subTest(args=args):
+                response = self.client.get(f"/autocomplete?{args}")
+                self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Tests of save_many, update_many and delete_many on every backend
+"""
+
+import unittest
+import uuid
+from src.persistence.cached import CachedRepository
+from src.persistence.memory import MemoryRepository
+from src.persistence.sqlite import SQLiteRepository
+from src.models.user import User
+from tests.base import TemporaryDirectoryTestCase, created_at
+
+
+class TestMemoryBatches(TemporaryDirectoryTestCase):
+    """Batches of the in-memory repository"""
+
+    def make_repository(self):
+        """Returns the backend under test"""
+        return MemoryRepository()
+
+    def setUp(self):
+        """Records the notified changes"""
+        super().setUp()
+        self.changes = []
+        self.repo.add_listener(
+            lambda op, model, objs: self.changes.append(
+                (op, sorted(obj.id for obj in objs))
+            )
+        )
+
+    def users(self, count: int) -> list:
+        """Returns unsaved users"""
+        return [
+            User(
+                email=f"{uuid.uuid4().hex}@example.com",
+                first_name="Ada",
+                last_name="Lovelace",
+                password_hash="!",
+                created_at=created_at(),
+            )
+            for _ in range(count)
+        ]
+
+    def ids(self, objs) -> list:
+        """Returns the sorted ids of the objects"""
+        return sorted(obj.id for obj in objs)
+
+    def test_save_many(self):
+        """Every object is saved and notified once"""
+        users = self.users(3)
+
+        self.assertEqual(self.repo.save_many(users), users)
+
+        self.assertEqual(
+            self.ids(self.repo.get_all("user")), self.ids(users)
+        )
+        self.assertEqual(self.changes, [("save", self.ids(users))])
+
+    def test_update_many_skips_the_missing_objects(self):
+        """Only the stored objects are updated and returned"""
+        stored = self.users(2)
+        self.repo.save_many(stored)
+        missing = self.users(1)[0]
+        missing.email = "missing@example.com"
+        stored[0].first_name = "Grace"
+        self.changes.clear()
+
+        updated = self.repo.update_many(stored + [missing])
+
+        self.assertEqual(self.ids(updated), self.ids(stored))
+        self.assertEqual(
+            self.repo.get("user", stored[0].id).first_name, "Grace"
+        )
+        self.assertEqual(self.changes, [("update", self.ids(stored))])
+
+    def test_delete_many_counts_the_deleted_objects(self):
+        """Missing and repeated objects are neither counted nor notified"""
+        users = self.users(3)
+        self.repo.save_many(users)
+        self.changes.clear()
+        version = self.repo.version("user")
+
+        deleted = self.repo.delete_many([users[0], users[1], users[0]])
+
+        self.assertEqual(deleted, 2)
+        self.assertEqual(self.changes, [("delete", self.ids(users[:2]))])
+        self.assertEqual(
+            self.ids(self.repo.get_all("user")), self.ids(users[2:])
+        )
+        self.assertNotEqual(self.repo.version("user"), version)
+
+        version = self.repo.version("user")
+        self.assertEqual(self.repo.delete_many(users[:2]), 0)
+        self.assertEqual(self.repo.version("user"), version)
+        self.assertEqual(len(self.changes), 1)
+
+
+class TestSQLiteBatches(TestMemoryBatches):
+    """Batches of the SQLite repository"""
+
+    def make_repository(self):
+        """Returns the backend under test"""
+        return SQLiteRepository("test.db")
+
+
+class TestCachedBatches(TestMemoryBatches):
+    """Batches through the cache, which must not keep stale reads"""
+
+    def make_repository(self):
+        """Returns the backend under test"""
+        return CachedRepository(SQLiteRepository("test.db"))
+
+    def test_delete_many_drops_the_cached_reads(self):
+        """The cached reads of the deleted objects are dropped"""
+        users = self.users(2)
+        self.repo.save_many(users)
+        self.repo.get("user", users[0].id)
+        self.repo.get_all("user")
+
+        self.assertEqual(self.repo.delete_many(users[:1]), 1)
+
+        self.assertIsNone(self.repo.get("user", users[0].id))
+        self.assertEqual(
+            self.ids(self.repo.get_all("user")), self.ids(users[1:])
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
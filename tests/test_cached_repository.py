@@ -0,0 +1,119 @@
+"""
+Tests of the read-through CachedRepository
+"""
+
+import unittest
+from unittest import mock
+from src.persistence.cached import CachedRepository
+from src.persistence.memory import MemoryRepository
+from src.persistence.query import Query
+from tests.base import RepositoryTestCase
+
+
+class TestCachedRepository(RepositoryTestCase):
+    """Cached reads and their invalidation"""
+
+    def make_repository(self):
+        """Caches the reads of a memory repository"""
+        return CachedRepository(MemoryRepository(), max_entries=100, ttl=0)
+
+    def test_reads_are_cached(self):
+        """A repeated read is a hit, the backend isn't asked again"""
+        user = self.user()
+
+        with mock.patch.object(
+            self.repo.backend, "get", wraps=self.repo.backend.get
+        ) as get:
+            self.repo.get("user", user.id)
+            self.repo.get("user", user.id)
+
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(self.repo.stats()["hits"], 1)
+
+    def test_callers_get_their_own_lists(self):
+        """Changing a returned list doesn't change the cached one"""
+        self.user()
+
+        self.repo.get_all("user").clear()
+
+        self.assertEqual(len(self.repo.get_all("user")), 1)
+
+    def test_writes_invalidate_their_model(self):
+        """Saving drops the cached collections of the model only"""
+        city = self.city()
+        self.repo.get_all("city")
+        self.repo.find_by("city", country_code="UY")
+        query = Query("city").where(country_code="UY")
+        self.repo.query(query)
+        self.repo.get_all("country")
+
+        self.city("Salto")
+
+        self.assertEqual(len(self.repo.get_all("city")), 2)
+        self.assertEqual(len(self.repo.find_by("city", country_code="UY")), 2)
+        self.assertEqual(len(self.repo.query(query)), 2)
+        self.assertEqual(self.repo.stats()["invalidations"], 3)
+
+        hits = self.repo.stats()["hits"]
+        self.repo.get_all("country")
+        self.assertEqual(self.repo.stats()["hits"], hits + 1)
+        self.assertEqual(self.repo.get("city", city.id).name, "Montevideo")
+
+    def test_update_and_delete_invalidate_the_object(self):
+        """The cached read of a changed object is dropped"""
+        user = self.user()
+        self.repo.get("user", user.id)
+
+        user.first_name = "Grace"
+        self.repo.update(user)
+        self.assertEqual(self.repo.get("user", user.id).first_name, "Grace")
+
+        self.repo.delete(user)
+        self.assertIsNone(self.repo.get("user", user.id))
+
+    def test_least_recently_used_are_evicted(self):
+        """Past max_entries the oldest reads are dropped"""
+        self.repo.max_entries = 2
+        users = [self.user() for _ in range(3)]
+
+        for user in (users[0], users[1], users[0], users[2], users[0]):
+            self.repo.get("user", user.id)
+
+        stats = self.repo.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 3))
+
+    def test_entries_expire(self):
+        """Entries are read again from the backend after the ttl"""
+        self.repo.ttl = 30
+        user = self.user()
+
+        with mock.patch("src.persistence.cached.time.monotonic") as clock:
+            clock.return_value = 1000
+            self.repo.get("user", user.id)
+            clock.return_value = 1031
+            self.repo.get("user", user.id)
+
+        self.assertEqual(self.repo.stats()["hits"], 0)
+
+    def test_failed_save_still_invalidates(self):
+        """A rejected write may have changed the object, it is dropped"""
+        user = self.user()
+        self.repo.get_all("user")
+
+        with self.assertRaises(ValueError):
+            self.user(user.email)
+
+        self.assertEqual(self.repo.stats()["entries"], 0)
+
+    def test_other_calls_reach_the_backend(self):
+        """Versions and listeners are the ones of the backend"""
+        self.assertEqual(
+            self.repo.version("user"), self.repo.backend.version("user")
+        )
+        self.assertEqual(repr(self.repo), "CachedRepository(MemoryRepository)")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Tests of the quadtree of the places and of /places/clusters
+"""
+
+import random
+import unittest
+from src.indexes import derived_index
+from src.indexes.clusters import PlaceClusters, mercator, tile_bbox
+from tests.base import AppTestCase
+from utils.constants import CLUSTER_ZOOM_OFFSET
+
+
+class TestPlaceClusters(AppTestCase):
+    """Counts and centroids of the map tiles"""
+
+    def located(self, lat: float, lon: float):
+        """Saves a place at a point"""
+        return self.place(latitude=lat, longitude=lon)
+
+    def test_world_is_one_cluster_at_zoom_zero(self):
+        """The root holds every place and their mean position"""
+        points = [(-34.9, -56.2), (48.9, 2.3), (35.7, 139.7)]
+
+        for point in points:
+            self.located(*point)
+
+        (root,) = derived_index(PlaceClusters).clusters(-180, -85, 180, 85, 0)
+
+        self.assertEqual(root["count"], 3)
+        self.assertEqual(root["tile"], "0/0/0")
+        self.assertAlmostEqual(
+            root["latitude"], sum(lat for lat, _ in points) / 3
+        )
+        self.assertAlmostEqual(
+            root["longitude"], sum(lon for _, lon in points) / 3
+        )
+
+    def test_every_zoom_counts_every_place(self):
+        """The clusters of a zoom split the places without losing any"""
+        generator = random.Random(18)
+
+        for _ in range(300):
+            self.located(
+                generator.uniform(-60, 60), generator.uniform(-180, 180)
+            )
+
+        index = derived_index(PlaceClusters)
+
+        for zoom in (1, 4, 9, 14):
+            with self.subTest(zoom=zoom):
+                clusters = index.clusters(-180, -85, 180, 85, zoom)
+                self.assertEqual(sum(c["count"] for c in clusters), 300)
+
+    def test_view_selects_the_overlapping_tiles(self):
+        """Only the tiles overlapping the box are returned"""
+        self.located(-34.9, -56.2)
+        self.located(48.9, 2.3)
+
+        clusters = derived_index(PlaceClusters).clusters(-60, -40, -50, -30, 6)
+
+        self.assertEqual([c["count"] for c in clusters], [1])
+        west, south, east, north = clusters[0]["bbox"]
+        self.assertTrue(west <= -56.2 <= east and south <= -34.9 <= north)
+
+    def test_view_across_the_antimeridian(self):
+        """A west greater than east wraps around 180 degrees"""
+        self.located(-17.7, 178.0)
+        self.located(-13.8, -172.0)
+        self.located(-17.7, 100.0)
+
+        index = derived_index(PlaceClusters)
+        clusters = index.clusters(175, -20, -170, -10, 5)
+
+        self.assertEqual(sum(c["count"] for c in clusters), 2)
+
+    def test_follows_the_repository(self):
+        """Moved and deleted places leave their tiles"""
+        place = self.located(-34.9, -56.2)
+        index = derived_index(PlaceClusters)
+
+        place.latitude, place.longitude = 48.9, 2.3
+        self.repo.update(place)
+        self.assertEqual(index.clusters(-60, -40, -50, -30, 8), [])
+        self.assertEqual(len(index.clusters(0, 45, 5, 50, 8)), 1)
+
+        self.repo.delete(place)
+        self.assertEqual(index.clusters(-180, -85, 180, 85, 0), [])
+        self.assertEqual(index.places, {})
+
+    def test_tiles(self):
+        """Tile boxes and Mercator positions agree"""
+        west, south, east, north = tile_bbox(1, 1, 0)
+
+        self.assertEqual((west, east), (0.0, 180.0))
+        self.assertAlmostEqual(south, 0.0)
+        self.assertAlmostEqual(mercator(north, 0)[1], 0.0, places=6)
+        self.assertEqual(mercator(0, 0), (0.5, 0.5))
+
+
+class TestClustersEndpoint(AppTestCase):
+    """GET /places/clusters"""
+
+    def test_clusters(self):
+        """The zoom of the map is refined by CLUSTER_ZOOM_OFFSET"""
+        self.place(latitude=-34.9, longitude=-56.2)
+        self.place(latitude=-34.91, longitude=-56.21)
+
+        response = self.client.get(
+            "/places/clusters?bbox=-180,-85,180,85&zoom=2"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), 1)
+        self.assertEqual(response.json[0]["count"], 2)
+        self.assertTrue(
+            response.json[0]["tile"].startswith(f"{2 + CLUSTER_ZOOM_OFFSET}/")
+        )
+
+    def test_invalid_zoom(self):
+        """Zooms outside of the map ones are refused"""
+        for zoom in ("-1", "23", "far"):
+            with self.subTest(zoom=zoom):
+                response = self.client.get(
+                    f"/places/clusters?bbox=0,0,1,1&zoom={zoom}"
+                )
+                self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+"""
+Tests of the columnar store of the places and of /places/search
+"""
+
+from types import SimpleNamespace
+import unittest
+from unittest import mock
+from src.controllers.listing import objects_by_id
+from src.indexes import derived_index
+from src.indexes import columnar
+from src.indexes.columnar import COLUMNS, PlaceColumns
+from src.persistence.query import Query
+from tests.base import AppTestCase
+
+
+def row(obj_id: str, **values) -> SimpleNamespace:
+    """Returns an object with the columns of a place"""
+    return SimpleNamespace(
+        id=obj_id, **{field: 0 for field in COLUMNS} | values
+    )
+
+
+class TestPlaceColumns(AppTestCase):
+    """Vectorized filters over the columns"""
+
+    def setUp(self):
+        """Saves places with different prices and sizes"""
+        super().setUp()
+        self.places = [
+            self.place(price_per_night=price, max_guests=guests)
+            for price, guests in ((50, 2), (150, 4), (100, 6), (80, 4))
+        ]
+        self.index = derived_index(PlaceColumns)
+
+    def ids(self, *indexes) -> list:
+        """Returns the ids of some of the saved places"""
+        return [self.places[i].id for i in indexes]
+
+    def test_search(self):
+        """Every condition must hold, matches keep the insertion order"""
+        total, ids = self.index.search(
+            [("price_per_night", "lte", 100), ("max_guests", "gte", 4)]
+        )
+
+        self.assertEqual((total, ids), (2, self.ids(2, 3)))
+        self.assertEqual(
+            self.index.search([("max_guests", "in", [2, 6])])[1],
+            self.ids(0, 2),
+        )
+
+    def test_pages(self):
+        """The total counts every match, the ids are the page only"""
+        total, ids = self.index.search([], offset=1, limit=2)
+
+        self.assertEqual((total, ids), (4, self.ids(1, 2)))
+
+    def test_follows_the_repository(self):
+        """Updates and deletes are applied to the rows"""
+        place = self.places[0]
+        place.price_per_night = 500
+        self.repo.update(place)
+        self.repo.delete(self.places[1])
+
+        total, ids = self.index.search([("price_per_night", "gt", 100)])
+
+        self.assertEqual((total, ids), (1, self.ids(0)))
+
+    def test_integers_are_64_bits(self):
+        """Integer columns hold values past 32 bits"""
+        big = 3_000_000_000
+        place = self.place(price_per_night=big)
+
+        total, ids = self.index.search([("price_per_night", "eq", big)])
+
+        self.assertEqual(ids, [place.id])
+        self.assertEqual(self.index.columns["price_per_night"].dtype, "i8")
+
+    def test_unknown_field(self):
+        """Only the numeric columns can be searched"""
+        with self.assertRaises(ValueError):
+            self.index.search([("name", "eq", "Loft")])
+        with self.assertRaises(ValueError):
+            self.index.search([("max_guests", "like", 2)])
+
+    def test_growth_and_compaction(self):
+        """Columns grow past their capacity and shrink once half dead"""
+        index = PlaceColumns.__new__(PlaceColumns)
+        index._reset(4)
+        index.lock = self.index.lock
+        rows = [row(str(i), max_guests=i % 3) for i in range(3000)]
+
+        for obj in rows:
+            index.add(obj)
+        for obj in rows[:2000]:
+            index.remove(obj)
+
+        # Compacted once 1501 of the 3000 rows were dead, 499 died since
+        self.assertEqual((len(index.ids), index.dead), (1499, 499))
+        self.assertEqual(len(index.rows), 1000)
+        total, ids = index.search([("max_guests", "eq", 1)], limit=2)
+        self.assertEqual((total, ids), (333, ["2002", "2005"]))
+
+
+class TestPlaceColumnsWithoutNumpy(TestPlaceColumns):
+    """Same filters over stdlib arrays, when NumPy isn't installed"""
+
+    def setUp(self):
+        """Builds the index without NumPy"""
+        patcher = mock.patch.object(columnar, "np", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
+
+    def test_integers_are_64_bits(self):
+        """Integer columns hold values past 32 bits"""
+        big = 3_000_000_000
+        place = self.place(price_per_night=big)
+
+        total, ids = self.index.search([("price_per_night", "eq", big)])
+
+        self.assertEqual(ids, [place.id])
+        self.assertEqual(self.index.columns["price_per_night"].typecode, "q")
+
+
+class TestPlacesSearchEndpoint(AppTestCase):
+    """GET /places/search"""
+
+    def test_search(self):
+        """Matching places with the total count and the next page"""
+        places = [self.place(price_per_night=p) for p in (50, 150, 80, 60)]
+
+        response = self.client.get(
+            "/places/search?price_per_night__lt=100&limit=2"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [place["id"] for place in response.json],
+            [places[0].id, places[2].id],
+        )
+        self.assertEqual(response.headers["X-Total-Count"], "3")
+        self.assertIn("offset=2", response.headers["Link"])
+
+    def test_not_modified(self):
+        """An unchanged search is answered with a 304"""
+        self.place()
+        etag = self.client.get("/places/search").headers["ETag"]
+
+        response = self.client.get(
+            "/places/search", headers={"If-None-Match": etag}
+        )
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_bad_conditions(self):
+        """Non numeric fields and values are refused"""
+        for args in ("name=Loft", "max_guests=many", "colour=red"):
+            with self.subTest(args=args):
+                response = self.client.get(f"/places/search?{args}")
+                self.assertEqual(response.status_code, 400)
+
+
+class TestObjectsById(AppTestCase):
+    """Hydration of the ids found by the derived indexes"""
+
+    def test_only_the_ids_are_looked_at(self):
+        """The ids are fetched directly, not by scanning the model"""
+        places = [self.place() for _ in range(50)]
+        wanted = [places[30].id, "missing", places[3].id]
+
+        with mock.patch.object(
+            Query, "matches", autospec=True, side_effect=lambda q, o: True
+        ) as matches:
+            found = objects_by_id("place", wanted)
+
+        self.assertEqual(
+            [place.id for place in found], [places[30].id, places[3].id]
+        )
+        self.assertEqual(matches.call_count, 2)
+
+    def test_no_ids(self):
+        """No ids, no query"""
+        self.assertEqual(objects_by_id("place", []), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
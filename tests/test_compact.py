@@ -0,0 +1,78 @@
+"""
+Tests of the compact slotted objects of the in-memory backends
+"""
+
+import pickle
+import unittest
+from src.models.place import Place
+from src.persistence.compact import compact, restore
+from src.persistence.memory import MemoryRepository
+from src.persistence.pickled import PickleRepository
+from tests.base import TemporaryDirectoryTestCase
+
+
+class TestCompactObjects(TemporaryDirectoryTestCase):
+    """Slotted copies that behave as the objects they come from"""
+
+    def make_repository(self):
+        """Stores compact objects"""
+        return MemoryRepository(compact=True)
+
+    def test_compact_copy(self):
+        """The copy keeps its columns in slots and has the same values"""
+        place = self.place(name="Loft")
+        stored = self.repo.get("place", place.id)
+
+        self.assertIsInstance(stored, Place)
+        self.assertEqual(vars(stored), {})
+        self.assertEqual(stored.to_dict(), place.to_dict())
+        self.assertIs(compact(stored), stored)
+
+    def test_ids_are_interned(self):
+        """Every reference to an object shares the string of its id"""
+        city = self.city()
+        first = self.place(city)
+        second = self.place(city)
+
+        self.assertIs(
+            self.repo.get("place", first.id).city_id,
+            self.repo.get("place", second.id).city_id,
+        )
+
+    def test_timestamps_are_shared_until_updated(self):
+        """updated_at is the created_at object until the first update"""
+        user = self.user()
+        user.updated_at = user.created_at
+        self.repo.save_many([user])
+        stored = self.repo.get("user", user.id)
+
+        self.assertIs(stored.updated_at, stored.created_at)
+
+        self.repo.update(stored)
+        self.assertGreater(stored.updated_at, stored.created_at)
+
+    def test_pickles_as_values(self):
+        """Compact objects pickle as their model and values"""
+        stored = self.repo.get("place", self.place().id)
+
+        function, (model, values) = stored.__reduce__()
+
+        self.assertIs(function, restore)
+        self.assertEqual(model, "place")
+        self.assertEqual(
+            pickle.loads(pickle.dumps(stored)).to_dict(), stored.to_dict()
+        )
+
+    def test_pickle_repository_round_trip(self):
+        """The pickle backend reloads compact objects"""
+        self.repo = PickleRepository(compact=True)
+        place = self.repo.get("place", self.place(name="Loft").id)
+
+        reloaded = PickleRepository(compact=True).get("place", place.id)
+
+        self.assertEqual(reloaded.to_dict(), place.to_dict())
+        self.assertEqual(vars(reloaded), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Tests of the ETag and Last-Modified conditional GETs
+"""
+
+import unittest
+from src.persistence.sqlite import SQLiteRepository
+from tests.base import AppTestCase, TemporaryDirectoryTestCase
+
+
+class TestConditionalGets(AppTestCase):
+    """304 answers to clients whose copy is still fresh"""
+
+    def test_collection_not_modified(self):
+        """An unchanged collection is answered with an empty 304"""
+        self.user()
+        first = self.client.get("/users")
+        etag = first.headers["ETag"]
+
+        again = self.client.get("/users", headers={"If-None-Match": etag})
+
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.data, b"")
+        self.assertEqual(again.headers["ETag"], etag)
+
+    def test_collection_changes_with_its_model(self):
+        """Any change of the model gives the collection a new ETag"""
+        user = self.user()
+        etag = self.client.get("/users").headers["ETag"]
+
+        self.repo.update(user)
+        response = self.client.get("/users", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_every_page_has_its_etag(self):
+        """The query string is part of the collection ETag"""
+        for _ in range(3):
+            self.user()
+
+        first = self.client.get("/users?limit=1").headers["ETag"]
+        second = self.client.get("/users?limit=2").headers["ETag"]
+
+        self.assertNotEqual(first, second)
+
+    def test_if_modified_since(self):
+        """Clients without an ETag are answered by the last change time"""
+        self.user()
+        first = self.client.get("/users")
+        since = first.headers["Last-Modified"]
+
+        again = self.client.get(
+            "/users", headers={"If-Modified-Since": since}
+        )
+
+        self.assertEqual(again.status_code, 304)
+
+    def test_entity_etag(self):
+        """Single objects are tagged by their update time"""
+        user = self.user()
+        url = f"/users/{user.id}"
+        etag = self.client.get(url).headers["ETag"]
+
+        cached = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(cached.status_code, 304)
+
+        user.first_name = "Grace"
+        self.repo.update(user)
+        fresh = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(fresh.json["first_name"], "Grace")
+
+    def test_place_etag_follows_its_reviews(self):
+        """A place shows its rating, so a new review changes its ETag"""
+        place = self.place()
+        url = f"/places/{place.id}"
+        etag = self.client.get(url).headers["ETag"]
+
+        self.review(place, 5)
+        response = self.client.get(url, headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["rating"]["count"], 1)
+
+
+class TestSQLiteVersions(TemporaryDirectoryTestCase):
+    """The version counters the SQLite backend keeps for the ETags"""
+
+    def make_repository(self):
+        """Opens a new database in the temporary directory"""
+        return SQLiteRepository("test.db")
+
+    def test_deleting_nothing_keeps_the_version(self):
+        """Only the models that lost rows get a new version"""
+        user, place = self.user(), self.place()
+        self.repo.delete(user)
+        users, places = self.repo.version("user"), self.repo.version("place")
+
+        self.assertEqual(self.repo.delete_many([user, user]), 0)
+        self.assertEqual(self.repo.version("user"), users)
+
+        self.assertEqual(self.repo.delete_many([user, place]), 1)
+        self.assertEqual(self.repo.version("user"), users)
+        self.assertNotEqual(self.repo.version("place"), places)
+
+
+if __name__ == "__main__":
+    unittest.main()
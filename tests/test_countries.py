@@ -0,0 +1,80 @@
+"""
+Tests of the frozen table of the countries and of /countries
+"""
+
+import unittest
+from unittest import mock
+from src.models.city import City
+from src.models.country import COUNTRIES, Country
+from tests.base import AppTestCase
+from utils.constants import COUNTRIES_MAX_AGE
+from utils.countries import ISO_3166
+
+
+class TestCountries(AppTestCase):
+    """Countries of ISO 3166, shared by every repository"""
+
+    def test_every_country_is_loaded(self):
+        """The table has every ISO 3166 country, by code"""
+        self.assertEqual(len(Country.get_all()), len(ISO_3166))
+        self.assertEqual(Country.get("UY").name, "Uruguay")
+        self.assertIsNone(Country.get("XX"))
+
+    def test_table_is_frozen(self):
+        """Countries can't be added or replaced"""
+        with self.assertRaises(TypeError):
+            COUNTRIES["XX"] = Country("Nowhere", "XX")
+
+    def test_lookups_skip_the_repository(self):
+        """Looking up and validating countries is a dictionary hit"""
+        with mock.patch.object(
+            self.repo, "get_all", side_effect=AssertionError
+        ), mock.patch.object(self.repo, "get", side_effect=AssertionError):
+            self.assertEqual(Country.get("FR").code, "FR")
+            city = City.create({"name": "Lyon", "country_code": "FR"})
+
+        self.assertEqual(self.repo.get("city", city.id).name, "Lyon")
+        with self.assertRaises(ValueError):
+            City.create({"name": "Atlantis", "country_code": "XX"})
+
+
+class TestCountriesEndpoints(AppTestCase):
+    """GET /countries, /countries/<code> and /countries/<code>/cities"""
+
+    def test_cacheable_by_the_clients(self):
+        """The encoded countries are served with a long max-age"""
+        response = self.client.get("/countries")
+
+        self.assertEqual(len(response.json), len(ISO_3166))
+        self.assertTrue(response.cache_control.public)
+        self.assertEqual(response.cache_control.max_age, COUNTRIES_MAX_AGE)
+        etag = response.headers["ETag"]
+        self.assertEqual(
+            self.client.get(
+                "/countries", headers={"If-None-Match": etag}
+            ).status_code,
+            304,
+        )
+
+    def test_country(self):
+        """A country by code, 404 for an unknown one"""
+        response = self.client.get("/countries/UY")
+
+        self.assertEqual(response.json, {"code": "UY", "name": "Uruguay"})
+        self.assertEqual(self.client.get("/countries/XX").status_code, 404)
+
+    def test_cities_of_a_country(self):
+        """Only the cities of the country are listed"""
+        montevideo = self.city("Montevideo", "UY")
+        self.city("Lyon", "FR")
+
+        response = self.client.get("/countries/UY/cities")
+
+        self.assertEqual([c["id"] for c in response.json], [montevideo.id])
+        self.assertEqual(
+            self.client.get("/countries/XX/cities").status_code, 404
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Tests of the batches of the db repository, over a SQLite file
+"""
+
+import os
+import unittest
+import uuid
+from unittest import mock
+from sqlalchemy import text
+from src import create_app
+from src.models.user import User
+from src.persistence.db import DBRepository
+from src.persistence.query import model_fields
+from src.persistence.repository import model_classes
+from tests.base import TemporaryDirectoryTestCase, created_at
+from tests.test_db_sessions import PooledConfig
+
+
+class TestDBRepository(TemporaryDirectoryTestCase):
+    """Rows matched by the writes of the db repository"""
+
+    def make_repository(self):
+        """Uses the database of the app"""
+        return DBRepository()
+
+    def setUp(self):
+        """Creates the app, the user table and its context"""
+        super().setUp()
+
+        with mock.patch.dict(os.environ, {"REPOSITORY_ENV_VAR": "db"}):
+            self.app = create_app(PooledConfig)
+
+        self.addCleanup(self.app.db_engine.dispose)
+        context = self.app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+
+        fields = ", ".join(model_fields("user"))
+        table = model_classes()["user"].__tablename__
+        self.app.db().execute(
+            text(f'CREATE TABLE "{table}" ({fields}, PRIMARY KEY (id))')
+        )
+        self.changes = []
+        self.repo.add_listener(
+            lambda op, model, objs: self.changes.append((op, len(objs)))
+        )
+
+    def new_user(self, **values) -> User:
+        """Returns a user that isn't saved yet"""
+        values.setdefault("password_hash", "!")
+        return User(
+            email=f"{uuid.uuid4()}@example.com",
+            first_name="Ada",
+            last_name="Lovelace",
+            created_at=created_at(),
+            **values,
+        )
+
+    def stored(self, column: str) -> list:
+        """Returns the values of a column of the stored users"""
+        return [
+            row[0]
+            for row in self.app.db().execute(
+                text(f'SELECT {column} FROM "User" ORDER BY created_at')
+            )
+        ]
+
+    def test_unset_attributes_are_stored_as_null(self):
+        """Columns the instance never set are NULL, not the Column"""
+        user = self.new_user()
+        del user.password_hash
+
+        self.repo.save_many([user])
+
+        self.assertEqual(self.stored("password_hash"), [None])
+
+    def test_update_many_returns_the_matched_objects(self):
+        """Objects without a row are neither updated nor notified"""
+        stored, missing = self.new_user(), self.new_user()
+        self.repo.save_many([stored])
+
+        stored.first_name = "Grace"
+        updated = self.repo.update_many([stored, missing])
+
+        self.assertEqual(updated, [stored])
+        self.assertEqual(self.stored("first_name"), ["Grace"])
+        self.assertEqual(self.changes[-1], ("update", 1))
+
+    def test_delete_counts_the_deleted_rows(self):
+        """Missing and repeated objects aren't counted"""
+        first, second, missing = (self.new_user() for _ in range(3))
+        self.repo.save_many([first, second])
+
+        self.assertEqual(self.repo.delete_many([first, first, missing]), 1)
+        self.assertEqual(self.changes[-1], ("delete", 1))
+        self.assertFalse(self.repo.delete(missing))
+        self.assertTrue(self.repo.delete(second))
+        self.assertEqual(self.stored("id"), [])
+        self.assertEqual(self.changes.count(("delete", 1)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Tests of the sessions and the connection pool of the db repository
+"""
+
+import importlib
+import os
+import threading
+import unittest
+from unittest import mock
+from sqlalchemy import text
+import src.config
+from src import create_app
+from src.persistence.db import DBRepository
+from tests.base import TemporaryDirectoryTestCase
+
+
+class PooledConfig(src.config.TestingConfig):
+    """SQLite file, which gets a sized pool"""
+
+    SQLALCHEMY_DATABASE_URI = "sqlite:///pooled.db"
+    SQLALCHEMY_ENGINE_OPTIONS = {"pool_size": 2, "max_overflow": 1}
+
+
+class TestDBSessions(TemporaryDirectoryTestCase):
+    """Sessions per thread, removed with the app context"""
+
+    def setUp(self):
+        """Creates an app using the db repository"""
+        super().setUp()
+
+        with mock.patch.dict(os.environ, {"REPOSITORY_ENV_VAR": "db"}):
+            self.app = create_app(PooledConfig)
+
+        self.addCleanup(self.app.db_engine.dispose)
+        self.db = DBRepository()
+
+    def test_session_per_thread(self):
+        """Every thread gets its own session"""
+        sessions = []
+
+        with self.app.app_context():
+            sessions.append(self.app.db())
+            self.assertIs(self.app.db(), sessions[0])
+
+            thread = threading.Thread(
+                target=lambda: sessions.append(self.app.db())
+            )
+            thread.start()
+            thread.join()
+
+        self.assertIsNot(sessions[0], sessions[1])
+
+    def test_teardown_gives_the_connection_back(self):
+        """The session is removed, and its connection pooled, at the end"""
+        with self.app.app_context():
+            self.app.db().execute(text("SELECT 1"))
+            self.assertEqual(self.db.pool_stats()["checked_out"], 1)
+
+        self.assertFalse(self.app.db.registry.has())
+
+        with self.app.app_context():
+            stats = self.db.pool_stats()
+
+        self.assertEqual(
+            (stats["size"], stats["checked_out"], stats["checked_in"]),
+            (2, 0, 1),
+        )
+
+    def test_stats_of_pools_without_a_size(self):
+        """In memory SQLite has a single connection pool, without sizes"""
+        with mock.patch.dict(os.environ, {"REPOSITORY_ENV_VAR": "db"}):
+            app = create_app("src.config.TestingConfig")
+
+        with app.app_context():
+            self.assertEqual(list(self.db.pool_stats()), ["status"])
+
+
+class TestPoolOptions(unittest.TestCase):
+    """Configuration read from the environment"""
+
+    def tearDown(self):
+        """Reads the configuration of the real environment again"""
+        importlib.reload(src.config)
+
+    def test_pool_options(self):
+        """DB_POOL_* variables size the pool"""
+        environ = {
+            "DB_POOL_SIZE": "20",
+            "DB_MAX_OVERFLOW": "0",
+            "DB_POOL_TIMEOUT": "5",
+            "DB_POOL_RECYCLE": "60",
+            "DB_POOL_PRE_PING": "false",
+        }
+
+        with mock.patch.dict(os.environ, environ):
+            config = importlib.reload(src.config)
+
+        self.assertEqual(
+            config.DevelopmentConfig.SQLALCHEMY_ENGINE_OPTIONS,
+            {
+                "pool_size": 20,
+                "max_overflow": 0,
+                "pool_timeout": 5,
+                "pool_recycle": 60,
+                "pool_pre_ping": False,
+            },
+        )
+
+    def test_development_database_needs_no_server(self):
+        """Without DATABASE_URL development uses a local SQLite file"""
+        with mock.patch.dict(os.environ):
+            os.environ.pop("DATABASE_URL", None)
+            config = importlib.reload(src.config)
+
+        self.assertEqual(
+            config.DevelopmentConfig.SQLALCHEMY_DATABASE_URI,
+            "sqlite:///hbnb_dev.db",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
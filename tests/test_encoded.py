@@ -0,0 +1,77 @@
+"""
+Tests of the cache of encoded objects
+"""
+
+import json
+import unittest
+from src.controllers.encoded import EncodedCache, encode_list, encode_with
+from tests.base import AppTestCase
+
+
+class TestEncodedCache(AppTestCase):
+    """Objects encoded once per update"""
+
+    def setUp(self):
+        """Runs every test in a request of the app, with an empty cache"""
+        super().setUp()
+        context = self.app.test_request_context()
+        context.push()
+        self.addCleanup(context.pop)
+        self.cache = EncodedCache()
+
+    def test_encoded_once_per_update(self):
+        """Unchanged objects are spliced from the cache"""
+        user = self.user()
+
+        first = self.cache.encode(user)
+        self.assertIs(self.cache.encode(user), first)
+        self.assertEqual(json.loads(first), user.to_dict())
+
+        user.first_name = "Grace"
+        self.repo.update(user)
+        encoded = json.loads(self.cache.encode(user))
+        self.assertEqual(encoded["first_name"], "Grace")
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+        self.assertEqual(self.cache.stats()["entries"], 1)
+
+    def test_derived_attributes_refresh_the_entry(self):
+        """A new review re-encodes its place, which shows its rating"""
+        place = self.place()
+        self.cache.encode(place)
+
+        self.review(place, 4)
+
+        self.assertEqual(
+            json.loads(self.cache.encode(place))["rating"],
+            {"count": 1, "mean": 4.0},
+        )
+
+    def test_size_is_bounded(self):
+        """The least recently used objects are evicted past max_bytes"""
+        users = [self.user() for _ in range(3)]
+        size = len(self.cache.encode(users[0]))
+        self.cache.max_bytes = size * 2 + size // 2
+
+        for user in users[1:]:
+            self.cache.encode(user)
+
+        self.assertEqual(self.cache.stats()["entries"], 2)
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertLessEqual(self.cache.size, self.cache.max_bytes)
+
+    def test_splicing(self):
+        """Lists and extra fields are built around the cached bytes"""
+        users = [self.user() for _ in range(2)]
+
+        self.assertEqual(
+            json.loads(encode_list(users)), [u.to_dict() for u in users]
+        )
+        self.assertEqual(json.loads(encode_list([])), [])
+        self.assertEqual(
+            json.loads(encode_with(users[0], {"distance_km": 1.5})),
+            users[0].to_dict() | {"distance_km": 1.5},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+Tests of the JSON file and pickle repositories, with and without the
+journal
+"""
+
+import json
+import os
+import unittest
+from src.persistence.file import FileRepository
+from src.persistence.pickled import PickleRepository
+from tests.base import TemporaryDirectoryTestCase
+from utils.constants import (
+    FILE_JOURNAL_FILENAME,
+    FILE_STORAGE_FILENAME,
+    PICKLE_STORAGE_FILENAME,
+)
+
+
+def journal_lines() -> list[dict]:
+    """Returns the entries of the journal file"""
+    with open(FILE_JOURNAL_FILENAME) as file:
+        return [json.loads(line) for line in file]
+
+
+class TestFileRepository(TemporaryDirectoryTestCase):
+    """Whole file rewrites on every change"""
+
+    def make_repository(self):
+        """Writes data.json on every change"""
+        return FileRepository()
+
+    def test_changes_survive_a_reload(self):
+        """Saved, updated and deleted objects are read back as they were"""
+        kept, gone = self.user(), self.user()
+        kept.first_name = "Grace"
+        self.repo.update(kept)
+        self.repo.delete(gone)
+
+        reloaded = self.make_repository()
+
+        self.assertEqual(reloaded.get("user", kept.id).first_name, "Grace")
+        self.assertIsNone(reloaded.get("user", gone.id))
+        self.assertEqual(
+            [u.id for u in reloaded.find_by("user", email=kept.email)],
+            [kept.id],
+        )
+
+    def test_no_temporary_file_is_left(self):
+        """The file is written aside and renamed over the old one"""
+        self.user()
+
+        self.assertTrue(os.path.exists(FILE_STORAGE_FILENAME))
+        self.assertFalse(os.path.exists(f"{FILE_STORAGE_FILENAME}.tmp"))
+
+
+class TestJournalFileRepository(TemporaryDirectoryTestCase):
+    """Changes appended to the journal, compacted into the snapshot"""
+
+    def make_repository(self, compact_threshold: int = 100):
+        """Appends the changes to data.journal"""
+        return FileRepository(
+            journal=True, compact_threshold=compact_threshold
+        )
+
+    def test_every_change_appends_one_line(self):
+        """Saves, updates and deletes are journaled, not rewritten"""
+        with open(FILE_STORAGE_FILENAME) as file:
+            snapshot = file.read()
+
+        user = self.user()
+        self.repo.update(user)
+        self.repo.delete(user)
+
+        entries = journal_lines()
+        self.assertEqual(
+            [entry["op"] for entry in entries], ["save", "update", "delete"]
+        )
+        self.assertEqual(entries[2], {"op": "delete", "model": "user",
+                                      "id": user.id})
+        with open(FILE_STORAGE_FILENAME) as file:
+            self.assertEqual(file.read(), snapshot)
+
+    def test_reload_replays_the_journal(self):
+        """The journal is applied over the snapshot on reload"""
+        kept, gone = self.user(), self.user()
+        kept.last_name = "Hopper"
+        self.repo.update(kept)
+        self.repo.delete(gone)
+
+        reloaded = self.make_repository()
+
+        self.assertEqual(reloaded.get("user", kept.id).last_name, "Hopper")
+        self.assertIsNone(reloaded.get("user", gone.id))
+
+    def test_compaction_empties_the_journal(self):
+        """Past the threshold the snapshot is rewritten"""
+        self.repo = self.make_repository(compact_threshold=3)
+        users = [self.user() for _ in range(4)]
+
+        self.assertEqual(len(journal_lines()), 1)
+
+        reloaded = self.make_repository()
+
+        for user in users:
+            self.assertIsNotNone(reloaded.get("user", user.id))
+
+    def test_torn_line_is_dropped(self):
+        """A half written last line is skipped and compacted away"""
+        user = self.user()
+
+        with open(FILE_JOURNAL_FILENAME, "a") as file:
+            file.write('{"op": "save", "model": "us')
+
+        reloaded = self.make_repository()
+
+        self.assertIsNotNone(reloaded.get("user", user.id))
+        self.assertEqual(journal_lines(), [])
+
+        # Appends after the repair are whole lines again
+        self.repo = reloaded
+        self.user()
+        self.assertEqual(len(journal_lines()), 1)
+
+
+class TestPickleRepository(TemporaryDirectoryTestCase):
+    """Pickle file rewrites on every change"""
+
+    def make_repository(self):
+        """Writes data.pkl on every change"""
+        return PickleRepository()
+
+    def test_changes_survive_a_reload(self):
+        """Saved and deleted objects are read back as they were"""
+        kept, gone = self.user(), self.user()
+        self.repo.delete(gone)
+
+        reloaded = self.make_repository()
+
+        self.assertTrue(os.path.exists(PICKLE_STORAGE_FILENAME))
+        self.assertEqual(reloaded.get("user", kept.id).email, kept.email)
+        self.assertIsNone(reloaded.get("user", gone.id))
+
+    def test_versions_survive_a_reload(self):
+        """The versions are saved, a new run changes them on its first write"""
+        self.user()
+        version = self.repo.version("user")[0]
+
+        reloaded = self.make_repository()
+
+        self.assertEqual(reloaded.version("user")[0], version)
+        self.repo = reloaded
+        self.city()
+        self.assertNotEqual(reloaded.version("user")[0], version)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+"""
+Tests of the Flusher and the group durability of the file repositories
+"""
+
+import atexit
+import os
+import threading
+import unittest
+from src.persistence.file import FileRepository
+from src.persistence.flusher import Flusher
+from tests.base import TemporaryDirectoryTestCase
+from utils.constants import FILE_JOURNAL_FILENAME
+
+
+class TestFlusher(unittest.TestCase):
+    """When the Flusher calls its write function"""
+
+    def setUp(self):
+        """Counts the writes"""
+        self.writes = 0
+        self.written = threading.Event()
+
+    def write(self):
+        """Records a write"""
+        self.writes += 1
+        self.written.set()
+
+    def group(self, **options) -> Flusher:
+        """Returns a group Flusher, closed at the end of the test"""
+        flusher = Flusher(self.write, "group", **options)
+        atexit.unregister(flusher.close)
+        self.addCleanup(flusher.close)
+        return flusher
+
+    def test_sync_writes_every_change(self):
+        """Sync durability writes right away"""
+        flusher = Flusher(self.write)
+
+        flusher.changed()
+        flusher.changed()
+
+        self.assertEqual(self.writes, 2)
+        self.assertEqual(flusher.dirty, 0)
+
+    def test_unknown_durability(self):
+        """Only sync and group exist"""
+        with self.assertRaises(ValueError):
+            Flusher(self.write, "never")
+
+    def test_group_coalesces_the_changes(self):
+        """Group durability holds the changes until flushed"""
+        flusher = self.group(interval=60, threshold=100)
+
+        flusher.changed(3)
+        flusher.changed()
+        self.assertEqual((self.writes, flusher.dirty), (0, 4))
+
+        flusher.flush()
+        flusher.flush()
+        self.assertEqual((self.writes, flusher.dirty), (1, 0))
+
+    def test_threshold_wakes_the_thread(self):
+        """Reaching the threshold writes before the interval"""
+        flusher = self.group(interval=60, threshold=5)
+
+        flusher.changed(5)
+
+        self.assertTrue(self.written.wait(5))
+        self.assertEqual(self.writes, 1)
+
+    def test_close_writes_the_pending_changes(self):
+        """Closing stops the thread and writes what is left"""
+        flusher = self.group(interval=60, threshold=100)
+        flusher.changed()
+
+        flusher.close()
+        flusher.close()
+
+        self.assertEqual(self.writes, 1)
+        self.assertFalse(flusher._thread.is_alive())
+
+    def test_thread_survives_a_failed_write(self):
+        """A failing write is logged, kept dirty and tried again"""
+        calls = []
+        retried = threading.Event()
+
+        def write():
+            """Fails the first time only"""
+            calls.append(1)
+
+            if len(calls) == 1:
+                raise RuntimeError("disk on fire")
+
+            retried.set()
+
+        flusher = Flusher(write, "group", interval=0.05, threshold=100)
+        atexit.unregister(flusher.close)
+        self.addCleanup(flusher.close)
+
+        with self.assertLogs("src.persistence.flusher", "ERROR") as logs:
+            flusher.changed()
+            self.assertTrue(retried.wait(5))
+
+        self.assertIn("Repository flush failed", logs.output[0])
+        self.assertTrue(flusher._thread.is_alive())
+        self.assertEqual(flusher.dirty, 0)
+
+
+class TestGroupFileRepository(TemporaryDirectoryTestCase):
+    """The journal of a repository with group durability"""
+
+    def make_repository(self):
+        """Journals the changes and flushes them in groups"""
+        repo = FileRepository(
+            journal=True,
+            durability="group",
+            flush_interval=60,
+            flush_threshold=100,
+        )
+        atexit.unregister(repo._flusher.close)
+        self.addCleanup(repo.close)
+        return repo
+
+    def test_changes_are_written_on_flush(self):
+        """Nothing is appended until the repository is flushed"""
+        user = self.user()
+        self.assertFalse(os.path.exists(FILE_JOURNAL_FILENAME))
+
+        self.repo.flush()
+
+        self.assertIsNotNone(self.make_repository().get("user", user.id))
+
+    def test_close_flushes(self):
+        """Closing the repository writes its pending changes"""
+        user = self.user()
+
+        self.repo.close()
+
+        self.assertIsNotNone(self.make_repository().get("user", user.id))
+
+
+if __name__ == "__main__":
+    unittest.main()
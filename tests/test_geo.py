@@ -0,0 +1,155 @@
+"""
+Tests of the grid index of the places and of /places/nearby and
+/places/within
+"""
+
+import random
+import unittest
+from src.indexes import derived_index
+from src.indexes.geo import PlaceGrid, haversine_km
+from tests.base import AppTestCase
+
+MONTEVIDEO = (-34.9011, -56.1645)
+BUENOS_AIRES = (-34.6037, -58.3816)
+
+
+class TestPlaceGrid(AppTestCase):
+    """Radius and bounding box searches"""
+
+    def located(self, lat: float, lon: float):
+        """Saves a place at a point"""
+        return self.place(latitude=lat, longitude=lon)
+
+    def test_nearby_matches_a_full_scan(self):
+        """The cells only narrow the candidates, distances decide"""
+        generator = random.Random(17)
+        places = [
+            self.located(
+                MONTEVIDEO[0] + generator.uniform(-1, 1),
+                MONTEVIDEO[1] + generator.uniform(-1, 1),
+            )
+            for _ in range(200)
+        ]
+        grid = derived_index(PlaceGrid)
+
+        total, nearest = grid.nearby(*MONTEVIDEO, 40, limit=10)
+
+        expected = sorted(
+            (haversine_km(*MONTEVIDEO, p.latitude, p.longitude), p.id)
+            for p in places
+        )
+        expected = [match for match in expected if match[0] <= 40]
+        self.assertEqual(total, len(expected))
+        self.assertEqual(nearest, expected[:10])
+        self.assertEqual(
+            grid.nearby(*MONTEVIDEO, 40, offset=10, limit=5)[1],
+            expected[10:15],
+        )
+
+    def test_nearby_across_the_antimeridian(self):
+        """Places on the other side of 180 degrees are found"""
+        east = self.located(-17.0, 179.95)
+        west = self.located(-17.0, -179.95)
+
+        total, nearest = derived_index(PlaceGrid).nearby(-17.0, 180.0, 10)
+
+        self.assertEqual(total, 2)
+        self.assertCountEqual([i for _, i in nearest], [east.id, west.id])
+
+    def test_nearby_a_pole(self):
+        """Searches reaching a pole cover every longitude"""
+        places = [self.located(89.95, lon) for lon in (-170, 0, 90)]
+
+        total, _ = derived_index(PlaceGrid).nearby(90.0, 0.0, 20)
+
+        self.assertEqual(total, len(places))
+
+    def test_within(self):
+        """Places inside the box, nearest to its center first"""
+        inside = self.located(-34.5, -57.7)
+        edge = self.located(*BUENOS_AIRES)
+        self.located(*MONTEVIDEO)
+
+        total, found = derived_index(PlaceGrid).within(-59, -35, -56.5, -34)
+
+        self.assertEqual(total, 2)
+        self.assertEqual([i for _, i in found], [inside.id, edge.id])
+
+    def test_within_across_the_antimeridian(self):
+        """A west greater than east wraps around 180 degrees"""
+        fiji = self.located(-17.7, 178.0)
+        samoa = self.located(-13.8, -172.0)
+        self.located(-17.7, 170.0)
+
+        total, found = derived_index(PlaceGrid).within(175, -20, -170, -10)
+
+        self.assertEqual(total, 2)
+        self.assertCountEqual([i for _, i in found], [fiji.id, samoa.id])
+
+    def test_follows_the_repository(self):
+        """Moved and deleted places leave their cells"""
+        place = self.located(*MONTEVIDEO)
+        grid = derived_index(PlaceGrid)
+
+        place.latitude, place.longitude = BUENOS_AIRES
+        self.repo.update(place)
+        self.assertEqual(grid.nearby(*MONTEVIDEO, 10)[0], 0)
+        self.assertEqual(grid.nearby(*BUENOS_AIRES, 10)[0], 1)
+
+        self.repo.delete(place)
+        self.assertEqual(grid.nearby(*BUENOS_AIRES, 10)[0], 0)
+
+
+class TestGeoEndpoints(AppTestCase):
+    """GET /places/nearby and /places/within"""
+
+    def test_nearby(self):
+        """Nearest first, with their distance"""
+        near = self.place(latitude=-34.91, longitude=-56.17)
+        far = self.place(latitude=-34.8, longitude=-56.0)
+        self.place(latitude=BUENOS_AIRES[0], longitude=BUENOS_AIRES[1])
+
+        response = self.client.get(
+            "/places/nearby?lat=-34.9011&lon=-56.1645&radius_km=50&limit=1"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p["id"] for p in response.json], [near.id])
+        self.assertAlmostEqual(
+            response.json[0]["distance_km"],
+            haversine_km(*MONTEVIDEO, -34.91, -56.17),
+            places=3,
+        )
+        self.assertEqual(response.headers["X-Total-Count"], "2")
+
+        following = self.client.get(response.headers["Link"][1:-13])
+        self.assertEqual([p["id"] for p in following.json], [far.id])
+
+    def test_within(self):
+        """Bounding boxes, around the given center"""
+        near = self.place(latitude=-34.91, longitude=-56.17)
+        far = self.place(latitude=-34.8, longitude=-56.0)
+
+        response = self.client.get(
+            "/places/within?bbox=-57,-35,-55,-34&lat=-34.8&lon=-56"
+        )
+
+        self.assertEqual([p["id"] for p in response.json], [far.id, near.id])
+
+    def test_invalid_arguments(self):
+        """Coordinates out of range, missing or malformed are refused"""
+        for url in (
+            "/places/nearby?lat=91&lon=0&radius_km=1",
+            "/places/nearby?lat=0&lon=0",
+            "/places/nearby?lat=0&lon=east&radius_km=1",
+            "/places/nearby?lat=0&lon=0&radius_km=30000",
+            "/places/within?bbox=1,2,3",
+            "/places/within?bbox=0,10,1,5",
+            "/places/within?bbox=0,0,1,1&lat=0",
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
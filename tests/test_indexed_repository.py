@@ -0,0 +1,182 @@
+"""
+Tests of the id and secondary indexes of the in-memory repositories
+"""
+
+import unittest
+from src.persistence.file import FileRepository
+from src.persistence.memory import MemoryRepository
+from tests.base import RepositoryTestCase, TemporaryDirectoryTestCase
+
+
+class TestIndexedRepository(RepositoryTestCase):
+    """Storage of the objects by id and by indexed fields"""
+
+    def test_get_by_id(self):
+        """Objects are found by id, the missing ones are None"""
+        user = self.user()
+
+        self.assertIs(self.repo.get("user", user.id), user)
+        self.assertIsNone(self.repo.get("user", "missing"))
+
+    def test_find_by_uses_the_index(self):
+        """find_by answers from the secondary index of the field"""
+        city = self.city()
+        other = self.city("Salto")
+        places = [self.place(city) for _ in range(3)]
+        self.place(other)
+
+        found = self.repo.find_by("place", city_id=city.id)
+
+        self.assertCountEqual(found, places)
+        self.assertEqual(self.repo.find_by("place", city_id="missing"), [])
+
+    def test_find_by_checks_the_fields_outside_the_index(self):
+        """The criteria no index covers are checked on the matches"""
+        city = self.city()
+        cheap = self.place(city, price_per_night=50)
+        self.place(city, price_per_night=500)
+
+        found = self.repo.find_by("place", city_id=city.id, price_per_night=50)
+
+        self.assertEqual(found, [cheap])
+
+    def test_find_by_without_index(self):
+        """Fields without an index are scanned"""
+        place = self.place(name="Loft")
+        self.place(name="House")
+
+        self.assertEqual(self.repo.find_by("place", name="Loft"), [place])
+
+    def test_update_moves_the_object_between_index_entries(self):
+        """Updating an indexed field reindexes the object"""
+        city, other = self.city(), self.city("Salto")
+        place = self.place(city)
+
+        place.city_id = other.id
+        self.repo.update(place)
+
+        self.assertEqual(self.repo.find_by("place", city_id=city.id), [])
+        self.assertEqual(
+            [p.id for p in self.repo.find_by("place", city_id=other.id)],
+            [place.id],
+        )
+
+    def test_delete_unindexes_the_object(self):
+        """Deleted objects are gone from every index"""
+        place = self.place()
+
+        self.assertTrue(self.repo.delete(place))
+        self.assertFalse(self.repo.delete(place))
+        self.assertIsNone(self.repo.get("place", place.id))
+        self.assertEqual(
+            self.repo.find_by("place", city_id=place.city_id), []
+        )
+
+    def test_get_all_keeps_the_insertion_order(self):
+        """get_all returns the objects in the order they were saved"""
+        users = [self.user() for _ in range(5)]
+
+        self.assertEqual(self.repo.get_all("user"), users)
+
+    def test_version_counts_the_changes(self):
+        """Every change of a model bumps its version, only its own"""
+        version, modified = self.repo.version("place")
+        self.assertIsNone(modified)
+
+        place = self.place()
+        after_save = self.repo.version("place")
+        self.assertNotEqual(after_save[0], version)
+        self.assertIsNotNone(after_save[1])
+
+        users = self.repo.version("user")
+        self.repo.update(place)
+        self.assertNotEqual(self.repo.version("place"), after_save)
+        self.assertEqual(self.repo.version("user"), users)
+
+
+class TestCompactIndexedRepository(TestIndexedRepository):
+    """The same, with the objects stored in their compact form"""
+
+    def make_repository(self):
+        """Stores slotted objects"""
+        return MemoryRepository(compact=True)
+
+    def test_get_by_id(self):
+        """Objects are found by id, as compact copies"""
+        user = self.user()
+
+        self.assertEqual(self.repo.get("user", user.id).email, user.email)
+        self.assertIsNone(self.repo.get("user", "missing"))
+
+    def test_find_by_uses_the_index(self):
+        """find_by answers from the secondary index of the field"""
+        city = self.city()
+        places = [self.place(city) for _ in range(3)]
+        self.place(self.city("Salto"))
+
+        found = self.repo.find_by("place", city_id=city.id)
+
+        self.assertCountEqual([p.id for p in found], [p.id for p in places])
+
+    def test_find_by_checks_the_fields_outside_the_index(self):
+        """The criteria no index covers are checked on the matches"""
+        city = self.city()
+        cheap = self.place(city, price_per_night=50)
+        self.place(city, price_per_night=500)
+
+        found = self.repo.find_by("place", city_id=city.id, price_per_night=50)
+
+        self.assertEqual([p.id for p in found], [cheap.id])
+
+    def test_find_by_without_index(self):
+        """Fields without an index are scanned"""
+        place = self.place(name="Loft")
+        self.place(name="House")
+
+        found = self.repo.find_by("place", name="Loft")
+
+        self.assertEqual([p.id for p in found], [place.id])
+
+    def test_get_all_keeps_the_insertion_order(self):
+        """get_all returns the objects in the order they were saved"""
+        users = [self.user() for _ in range(5)]
+
+        self.assertEqual(
+            [u.id for u in self.repo.get_all("user")], [u.id for u in users]
+        )
+
+
+class TestFailingListener(TemporaryDirectoryTestCase):
+    """Listeners raising while the repository changes"""
+
+    def make_repository(self):
+        """Writes data.json on every change"""
+        return FileRepository()
+
+    def test_changes_are_made_and_persisted(self):
+        """A failing listener is logged, the change isn't half applied"""
+        calls = []
+
+        def failing(op, model, objs):
+            """Raises like a broken derived index"""
+            raise RuntimeError("broken index")
+
+        self.repo.add_listener(failing)
+        self.repo.add_listener(lambda op, model, objs: calls.append(op))
+
+        with self.assertLogs("src.persistence.repository", "ERROR") as logs:
+            kept, gone = self.user(), self.user()
+            kept.first_name = "Grace"
+            self.repo.update(kept)
+            self.repo.delete(gone)
+
+        self.assertEqual(len(logs.records), 4)
+        self.assertEqual(calls, ["save", "save", "update", "delete"])
+
+        reloaded = FileRepository()
+        self.assertEqual(reloaded.get("user", kept.id).first_name, "Grace")
+        self.assertIsNone(reloaded.get("user", gone.id))
+
+
+if __name__ == "__main__":
+    unittest.main()
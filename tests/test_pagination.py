@@ -0,0 +1,80 @@
+"""
+Tests of the keyset pagination of the list endpoints
+"""
+
+import unittest
+from urllib.parse import parse_qs, urlsplit
+from src.controllers.listing import encode_cursor
+from tests.base import AppTestCase
+
+
+class TestPagination(AppTestCase):
+    """Pages of /users, linked by their `after` cursor"""
+
+    def setUp(self):
+        """Saves some users"""
+        super().setUp()
+        self.users = [self.user() for _ in range(5)]
+
+    def next_link(self, response) -> str | None:
+        """Returns the URL of the next page, if any"""
+        link = response.headers.get("Link")
+
+        if link is None:
+            return None
+
+        self.assertTrue(link.endswith('>; rel="next"'))
+        return link[1:link.index(">")]
+
+    def test_pages_follow_each_other(self):
+        """Following the Link headers walks every user once, in order"""
+        url, ids = "/users?limit=2", []
+
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.json), 2)
+            ids += [user["id"] for user in response.json]
+            url = self.next_link(response)
+
+        self.assertEqual(ids, [user.id for user in self.users])
+
+    def test_link_keeps_the_filters(self):
+        """The next page keeps the other arguments of the query string"""
+        response = self.client.get("/users?limit=1&last_name=Lovelace")
+
+        args = parse_qs(urlsplit(self.next_link(response)).query)
+
+        self.assertEqual(args["last_name"], ["Lovelace"])
+        self.assertEqual(args["limit"], ["1"])
+        self.assertEqual(args["after"], [encode_cursor(self.users[0])])
+
+    def test_last_page_has_no_link(self):
+        """A page reaching the end has no next one"""
+        response = self.client.get("/users?limit=5")
+
+        self.assertEqual(len(response.json), 5)
+        self.assertIsNone(self.next_link(response))
+
+    def test_new_objects_dont_shift_the_pages(self):
+        """Objects created meanwhile land after the cursor, not twice"""
+        first = self.client.get("/users?limit=2")
+        self.user()
+
+        second = self.client.get(self.next_link(first))
+
+        self.assertEqual(
+            [user["id"] for user in second.json],
+            [user.id for user in self.users[2:4]],
+        )
+
+    def test_invalid_arguments(self):
+        """Broken cursors and page sizes are refused"""
+        for args in ("after=garbage", "limit=0", "limit=many", "limit=5000"):
+            with self.subTest(args=args):
+                response = self.client.get(f"/users?{args}")
+                self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
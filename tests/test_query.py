@@ -0,0 +1,166 @@
+"""
+Tests of the Query builder and of its evaluation by the in-memory
+repositories
+"""
+
+from datetime import datetime
+import unittest
+from src.models.place import Place
+from src.persistence.query import Query, args_conditions
+from tests.base import RepositoryTestCase
+
+
+class TestQueryBuilder(unittest.TestCase):
+    """Building queries"""
+
+    def test_queries_are_immutable(self):
+        """Every builder method returns a new query"""
+        query = Query("place")
+        filtered = query.where(name="Loft")
+
+        self.assertEqual(query.filters, ())
+        self.assertEqual(filtered.filters, (("name", "eq", "Loft"),))
+        self.assertEqual(filtered.limit(5).limit_count, 5)
+        self.assertIsNone(filtered.limit_count)
+
+    def test_unknown_fields_and_operators(self):
+        """Conditions and orderings are checked against the model"""
+        with self.assertRaises(ValueError):
+            Query("place").where(colour="red")
+        with self.assertRaises(ValueError):
+            Query("place").where(name__like="Lo%")
+        with self.assertRaises(ValueError):
+            Query("place").order_by("-colour")
+
+    def test_after_needs_one_direction(self):
+        """Keyset cursors need a value per field, all in one direction"""
+        query = Query("place").order_by("created_at", "-id")
+
+        with self.assertRaises(ValueError):
+            query.after(datetime.now(), "id")
+        with self.assertRaises(ValueError):
+            Query("place").order_by("created_at").after(1, 2)
+
+    def test_id_lookup(self):
+        """The first id condition is taken out of the query"""
+        query = Query("place").where(name="Loft", id__in=["a", "b"])
+
+        ids, rest = query.id_lookup()
+
+        self.assertEqual(ids, ["a", "b"])
+        self.assertEqual(rest.filters, (("name", "eq", "Loft"),))
+        self.assertEqual(Query("place").where(id="a").id_lookup()[0], ["a"])
+        self.assertIsNone(Query("place").where(id__ne="a").id_lookup())
+
+    def test_args_conditions(self):
+        """Query string values are converted to the column types"""
+        conditions = args_conditions(
+            "place",
+            {
+                "price_per_night__lte": "100",
+                "latitude__gt": "-34.5",
+                "city_id__in": "a,b",
+                "limit": "10",
+            },
+            ignore=("limit",),
+        )
+
+        self.assertEqual(
+            conditions,
+            {
+                "price_per_night__lte": 100,
+                "latitude__gt": -34.5,
+                "city_id__in": ["a", "b"],
+            },
+        )
+        with self.assertRaises(ValueError):
+            args_conditions("place", {"price_per_night": "cheap"})
+        with self.assertRaises(ValueError):
+            args_conditions("place", {"colour": "red"})
+
+
+class TestMemoryQuery(RepositoryTestCase):
+    """Queries run by the in-memory repository"""
+
+    def setUp(self):
+        """Saves places with different prices in two cities"""
+        super().setUp()
+        self.city_a, self.city_b = self.city(), self.city("Salto")
+        host = self.user()
+        self.places = [
+            self.place(
+                (self.city_a, self.city_b)[i % 2],
+                host,
+                price_per_night=price,
+            )
+            for i, price in enumerate((50, 150, 100, 200, 75, 25))
+        ]
+
+    def ids(self, query) -> list:
+        """Runs a query, returning the ids of its results"""
+        return [place.id for place in query.all()]
+
+    def test_filter_sort_and_limit(self):
+        """Conditions are combined and the results sorted and limited"""
+        query = (
+            Place.query()
+            .where(price_per_night__gte=50, price_per_night__lt=200)
+            .order_by("-price_per_night")
+        )
+
+        self.assertEqual(
+            self.ids(query),
+            [self.places[i].id for i in (1, 2, 4, 0)],
+        )
+        self.assertEqual(
+            self.ids(query.offset(1).limit(2)),
+            [self.places[i].id for i in (2, 4)],
+        )
+
+    def test_creation_order_walk(self):
+        """Queries in creation order walk the sorted (created_at, id)"""
+        query = Place.query().order_by("created_at", "id")
+        cheap = query.where(price_per_night__lte=100)
+
+        self.assertEqual(self.ids(query), [p.id for p in self.places])
+        self.assertEqual(
+            self.ids(cheap.limit(2)),
+            [self.places[i].id for i in (0, 2)],
+        )
+
+        last = self.places[2]
+        self.assertEqual(
+            self.ids(cheap.after(last.created_at, last.id)),
+            [self.places[i].id for i in (4, 5)],
+        )
+
+    def test_indexed_equality(self):
+        """Conditions a secondary index covers are answered from it"""
+        query = Place.query().where(city_id=self.city_b.id).order_by(
+            "created_at", "id"
+        )
+
+        self.assertEqual(
+            self.ids(query), [self.places[i].id for i in (1, 3, 5)]
+        )
+
+    def test_batches(self):
+        """batches walks the whole result, a page at a time"""
+        batches = list(Place.query().batches(4))
+
+        self.assertEqual([len(batch) for batch in batches], [4, 2])
+        self.assertEqual(
+            [p.id for batch in batches for p in batch],
+            [p.id for p in self.places],
+        )
+
+    def test_first(self):
+        """first returns one object or None"""
+        query = Place.query().order_by("price_per_night")
+
+        self.assertEqual(query.first().id, self.places[5].id)
+        self.assertIsNone(query.where(price_per_night__gt=1000).first())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Tests of the rankings of the places of every city and of
+/cities/<id>/top-places
+"""
+
+import unittest
+from src.indexes import derived_index
+from src.indexes.rankings import CityRankings
+from tests.base import AppTestCase
+from utils.constants import RANKING_PRIOR_MEAN, RANKING_PRIOR_WEIGHT
+
+
+class TestCityRankings(AppTestCase):
+    """Best places of a city"""
+
+    def setUp(self):
+        """Saves three places of a city and one of another"""
+        super().setUp()
+        self.city_ = self.city()
+        self.places = [self.place(self.city_) for _ in range(3)]
+        self.elsewhere = self.place(self.city("Salto"))
+
+    def ids(self, top) -> list:
+        """Returns the place ids of a ranking"""
+        return [place_id for place_id, _, _ in top]
+
+    def test_many_good_reviews_beat_a_single_perfect_one(self):
+        """The Bayesian average pulls the lone ratings to the prior"""
+        single, many, bad = self.places
+        self.review(single, 5)
+        for _ in range(30):
+            self.review(many, 4.8)
+        self.review(bad, 1)
+        self.review(self.elsewhere, 5)
+
+        top = derived_index(CityRankings).top(self.city_.id, 10)
+
+        self.assertEqual(self.ids(top), [many.id, single.id, bad.id])
+        self.assertAlmostEqual(
+            top[1][1],
+            (RANKING_PRIOR_MEAN * RANKING_PRIOR_WEIGHT + 5)
+            / (RANKING_PRIOR_WEIGHT + 1),
+        )
+        self.assertEqual(top[0][2], 30)
+
+    def test_count_score(self):
+        """Places ranked by their number of reviews"""
+        for place, reviews in zip(self.places, (1, 3, 2)):
+            for _ in range(reviews):
+                self.review(place, 3)
+
+        top = derived_index(CityRankings).top(self.city_.id, 2, "count")
+
+        self.assertEqual(
+            self.ids(top), [self.places[1].id, self.places[2].id]
+        )
+        with self.assertRaises(ValueError):
+            derived_index(CityRankings).top(self.city_.id, 2, "price")
+
+    def test_reranked_on_every_change(self):
+        """Reviews, moves and deletes rerank the places"""
+        rankings = derived_index(CityRankings)
+        first, second, _ = self.places
+        review = self.review(first, 5)
+        self.assertEqual(self.ids(rankings.top(self.city_.id, 1)), [first.id])
+
+        review.place_id = second.id
+        self.repo.update(review)
+        self.assertEqual(
+            self.ids(rankings.top(self.city_.id, 1)), [second.id]
+        )
+
+        second.city_id = self.elsewhere.city_id
+        self.repo.update(second)
+        self.assertNotIn(second.id, self.ids(rankings.top(self.city_.id, 5)))
+        self.assertEqual(
+            self.ids(rankings.top(self.elsewhere.city_id, 1)), [second.id]
+        )
+
+        self.repo.delete(second)
+        self.assertEqual(
+            self.ids(rankings.top(self.elsewhere.city_id, 5)),
+            [self.elsewhere.id],
+        )
+
+
+class TestTopPlacesEndpoint(AppTestCase):
+    """GET /cities/<id>/top-places"""
+
+    def test_top_places(self):
+        """The best places, with their score"""
+        city = self.city()
+        good, bad = self.place(city), self.place(city)
+        self.review(good, 5)
+        self.review(bad, 1)
+
+        response = self.client.get(f"/cities/{city.id}/top-places?k=1")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p["id"] for p in response.json], [good.id])
+        self.assertIn("score", response.json[0])
+
+    def test_etag_follows_the_reviews(self):
+        """A new review gives the ranking a new ETag"""
+        city = self.city()
+        self.review(self.place(city), 3)
+        url = f"/cities/{city.id}/top-places"
+        etag = self.client.get(url).headers["ETag"]
+
+        self.assertEqual(
+            self.client.get(url, headers={"If-None-Match": etag}).status_code,
+            304,
+        )
+        self.review(self.place(city), 5)
+        self.assertEqual(
+            self.client.get(url, headers={"If-None-Match": etag}).status_code,
+            200,
+        )
+
+    def test_invalid_arguments(self):
+        """Unknown cities, scores and sizes are refused"""
+        city = self.city()
+
+        self.assertEqual(
+            self.client.get("/cities/missing/top-places").status_code, 404
+        )
+        for args in ("k=0", "k=many", "score=price"):
+            with self.subTest(args=args):
+                response = self.client.get(
+                    f"/cities/{city.id}/top-places?{args}"
+                )
+                self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
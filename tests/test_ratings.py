@@ -0,0 +1,209 @@
+"""
+Tests of the rating aggregates, of /places/<id>/rating and of their
+repair
+"""
+
+import io
+import unittest
+import urllib.error
+from unittest import mock
+from click.testing import CliRunner
+from flask_jwt_extended import create_access_token
+from src.indexes import derived_index
+from src.indexes.ratings import RatingAggregates, stars
+from tests.base import AppTestCase
+
+
+class TestRatingAggregates(AppTestCase):
+    """Aggregates per place and per host"""
+
+    def setUp(self):
+        """Saves two places of the same host"""
+        super().setUp()
+        self.host = self.user()
+        self.first = self.place(host=self.host)
+        self.second = self.place(host=self.host)
+        self.ratings = derived_index(RatingAggregates)
+
+    def test_reviews_are_counted(self):
+        """Every review counts for its place and its host"""
+        self.review(self.first, 5)
+        self.review(self.first, 4)
+        self.review(self.second, 1.4)
+
+        first = self.ratings.place(self.first.id).to_dict()
+        self.assertEqual((first["count"], first["mean"]), (2, 4.5))
+        self.assertEqual(
+            first["histogram"], {"1": 0, "2": 0, "3": 0, "4": 1, "5": 1}
+        )
+        host = self.ratings.host(self.host.id)
+        self.assertEqual(host.count, 3)
+        self.assertAlmostEqual(host.total, 10.4)
+
+    def test_updates_and_deletes(self):
+        """Changing a review moves its rating, deleting it removes it"""
+        review = self.review(self.first, 5)
+
+        review.rating = 2
+        self.repo.update(review)
+        self.assertEqual(
+            self.ratings.place(self.first.id).summary(),
+            {"count": 1, "mean": 2.0},
+        )
+
+        review.place_id = self.second.id
+        self.repo.update(review)
+        self.assertEqual(self.ratings.place(self.first.id).count, 0)
+        self.assertEqual(self.ratings.place(self.second.id).count, 1)
+
+        self.repo.delete(review)
+        self.assertEqual(self.ratings.host(self.host.id).count, 0)
+
+    def test_place_moving_to_another_host(self):
+        """The aggregate of a place follows it to its new host"""
+        self.review(self.first, 3)
+        other = self.user()
+
+        self.first.host_id = other.id
+        self.repo.update(self.first)
+
+        self.assertEqual(self.ratings.host(self.host.id).count, 0)
+        self.assertEqual(self.ratings.host(other.id).count, 1)
+
+    def test_every_change_is_a_new_revision(self):
+        """The revision tells the caches the aggregate changed"""
+        before = self.ratings.place(self.first.id).revision
+        self.review(self.first, 3)
+        after = self.ratings.place(self.first.id).revision
+
+        self.assertGreater(after, before)
+
+    def test_rebuild_counts_the_drifted_aggregates(self):
+        """A rebuild from the reviews repairs the aggregates"""
+        self.review(self.first, 3)
+        self.ratings.place(self.first.id).add(5)
+
+        self.assertEqual(self.ratings.rebuild(), 1)
+        self.assertEqual(self.ratings.place(self.first.id).total, 3)
+        self.assertEqual(self.ratings.rebuild(), 0)
+
+    def test_stars(self):
+        """Ratings are bucketed to 1 to 5 stars"""
+        self.assertEqual(
+            [stars(rating) for rating in (0, 1.4, 2.6, 5, 7)], [1, 1, 3, 5, 5]
+        )
+
+
+class TestRatingEndpoints(AppTestCase):
+    """GET /places/<id>/rating and POST /admin/ratings/repair"""
+
+    def setUp(self):
+        """Saves a reviewed place"""
+        super().setUp()
+        self.place_ = self.place()
+        self.review(self.place_, 4)
+
+    def token(self, is_admin: bool) -> dict:
+        """Returns the headers of a request by an admin or not"""
+        with self.app.app_context():
+            token = create_access_token(
+                identity="someone@example.com",
+                additional_claims={"is_admin": is_admin},
+            )
+
+        return {"Authorization": f"Bearer {token}"}
+
+    def test_rating_of_a_place(self):
+        """The aggregate of the place and the one of its host"""
+        response = self.client.get(f"/places/{self.place_.id}/rating")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["count"], 1)
+        self.assertEqual(
+            response.json["host"]["host_id"], self.place_.host_id
+        )
+        self.assertEqual(
+            self.client.get("/places/missing/rating").status_code, 404
+        )
+
+    def test_rating_etag_follows_the_reviews(self):
+        """A new review gives the rating a new ETag"""
+        url = f"/places/{self.place_.id}/rating"
+        etag = self.client.get(url).headers["ETag"]
+
+        self.assertEqual(
+            self.client.get(url, headers={"If-None-Match": etag}).status_code,
+            304,
+        )
+        self.review(self.place_, 2)
+        self.assertEqual(
+            self.client.get(url, headers={"If-None-Match": etag}).status_code,
+            200,
+        )
+
+    def test_repair_needs_an_admin(self):
+        """Only admins can repair the aggregates"""
+        url = "/admin/ratings/repair"
+
+        self.assertEqual(self.client.post(url).status_code, 401)
+        self.assertEqual(
+            self.client.post(url, headers=self.token(False)).status_code, 403
+        )
+
+    def test_repair_in_the_server(self):
+        """The aggregates of the serving process are rebuilt"""
+        derived_index(RatingAggregates).place(self.place_.id).add(1)
+
+        response = self.client.post(
+            "/admin/ratings/repair", headers=self.token(True)
+        )
+
+        self.assertEqual(response.json, {"drifted": 1})
+        self.assertEqual(
+            self.client.get(f"/places/{self.place_.id}/rating").json["mean"],
+            4.0,
+        )
+
+    def test_repair_command(self):
+        """manage.py repair-ratings calls the endpoint of the server"""
+        from manage import cli
+
+        derived_index(RatingAggregates).place(self.place_.id).add(1)
+
+        def urlopen(request):
+            """Sends the request of the command to the test client"""
+            self.assertEqual(
+                request.full_url, "http://server/admin/ratings/repair"
+            )
+            response = self.client.post(
+                "/admin/ratings/repair", headers=dict(request.header_items())
+            )
+            return io.BytesIO(response.data)
+
+        token = self.token(True)["Authorization"].split()[1]
+        args = ["--url", "http://server/", "--token", token]
+
+        with mock.patch("urllib.request.urlopen", urlopen):
+            result = CliRunner().invoke(cli, ["repair-ratings", *args])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("1 had drifted", result.output)
+
+    def test_repair_command_without_server(self):
+        """An unreachable server is reported"""
+        from manage import cli
+
+        with mock.patch(
+            "urllib.request.urlopen",
+            side_effect=urllib.error.URLError("refused"),
+        ):
+            result = CliRunner().invoke(
+                cli, ["repair-ratings", "--token", "token"]
+            )
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("Repair failed", result.output)
+
+
+if __name__ == "__main__":
+    unittest.main()
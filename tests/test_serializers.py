@@ -0,0 +1,75 @@
+"""
+Tests of the generated model serializers and of the JSON provider
+"""
+
+from datetime import datetime
+import json
+import unittest
+from src.json_provider import JSONProvider
+from src.models.serializer import record, serializer
+from src.models.user import User
+from tests.base import AppTestCase
+
+
+class TestSerializers(unittest.TestCase):
+    """to_dict and record, generated from the columns"""
+
+    def setUp(self):
+        """Builds a user"""
+        self.user = User(
+            email="ada@example.com",
+            first_name="Ada",
+            last_name="Lovelace",
+            password_hash="hash",
+            created_at=datetime(2024, 1, 2, 3, 4, 5),
+        )
+
+    def test_to_dict_leaves_the_secrets_out(self):
+        """serialize_exclude columns aren't in to_dict"""
+        values = self.user.to_dict()
+
+        self.assertEqual(values["created_at"], "2024-01-02T03:04:05")
+        self.assertNotIn("password_hash", values)
+        self.assertNotIn("is_admin", values)
+        self.assertIs(serializer(User), serializer(User))
+
+    def test_record_keeps_every_column(self):
+        """record is what the repositories store"""
+        values = record(self.user)
+
+        self.assertEqual(values["password_hash"], "hash")
+        self.assertIs(values["is_admin"], False)
+        self.assertEqual(values["email"], "ada@example.com")
+
+
+class TestJSONProvider(AppTestCase):
+    """The JSON provider of the app"""
+
+    def test_same_json_as_the_standard_provider(self):
+        """Keys are sorted and datetimes are HTTP dates"""
+        provider = JSONProvider(self.app)
+        value = {"b": 1, "a": [datetime(2024, 1, 2), None, 1.5]}
+
+        self.assertEqual(
+            json.loads(provider.dumps(value)),
+            {"a": ["Tue, 02 Jan 2024 00:00:00 GMT", None, 1.5], "b": 1},
+        )
+        self.assertEqual(list(json.loads(provider.dumps(value))), ["a", "b"])
+
+    def test_big_integers(self):
+        """Integers orjson can't encode fall back to the stdlib"""
+        provider = JSONProvider(self.app)
+
+        self.assertEqual(provider.dumps(2 ** 70), str(2 ** 70))
+
+    def test_responses(self):
+        """jsonify answers go through the provider"""
+        self.user()
+        response = self.client.post("/login", json={})
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json, {"error": "Wrong email or password"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Tests of the sqlite3 repository
+"""
+
+import threading
+import unittest
+from src.persistence.query import Query
+from src.persistence.repository import DuplicateError
+from src.persistence.sqlite import MAX_IN_PARAMS, SQLiteRepository
+from tests.base import TemporaryDirectoryTestCase
+
+
+class TestSQLiteRepository(TemporaryDirectoryTestCase):
+    """Reads and writes of the SQLite backend"""
+
+    def make_repository(self):
+        """Opens a new database in the temporary directory"""
+        return SQLiteRepository("test.db")
+
+    def test_objects_round_trip(self):
+        """Stored objects come back with their types"""
+        user = self.user(is_admin=True)
+        place = self.place(price_per_night=80, latitude=1.5)
+
+        read = SQLiteRepository("test.db").get("user", user.id)
+        self.assertEqual(read.email, user.email)
+        self.assertIs(read.is_admin, True)
+        self.assertEqual(read.created_at, user.created_at)
+
+        read = self.repo.get("place", place.id)
+        self.assertEqual(read.price_per_night, 80)
+        self.assertEqual(read.latitude, 1.5)
+        self.assertIsNone(self.repo.get("place", "missing"))
+
+    def test_countries_are_loaded(self):
+        """The ISO 3166 countries are created with the tables"""
+        self.assertEqual(self.repo.get("country", "UY").name, "Uruguay")
+
+    def test_update_and_delete(self):
+        """Missing objects are neither updated nor deleted"""
+        user = self.user()
+        user.first_name = "Grace"
+
+        self.assertIs(self.repo.update(user), user)
+        self.assertEqual(self.repo.get("user", user.id).first_name, "Grace")
+        self.assertTrue(self.repo.delete(user))
+        self.assertFalse(self.repo.delete(user))
+        self.assertIsNone(self.repo.update(user))
+
+    def test_save_refuses_a_taken_id(self):
+        """Saving an existing id doesn't overwrite it"""
+        city = self.city("Montevideo")
+        version = self.repo.version("city")[0]
+        city.name = "Salto"
+
+        with self.assertRaises(DuplicateError) as raised:
+            self.repo.save(city)
+        with self.assertRaises(DuplicateError):
+            self.repo.save_many([self.user(), city])
+
+        self.assertEqual(raised.exception.fields, ("id",))
+        self.assertEqual(self.repo.get("city", city.id).name, "Montevideo")
+        self.assertEqual(self.repo.version("city")[0], version)
+
+    def test_find_by(self):
+        """find_by matches every criterion, unknown fields are refused"""
+        city = self.city()
+        place = self.place(city, name="Loft")
+        self.place(city, name="House")
+
+        found = self.repo.find_by("place", city_id=city.id, name="Loft")
+
+        self.assertEqual([p.id for p in found], [place.id])
+        with self.assertRaises(ValueError):
+            self.repo.find_by("place", colour="red")
+
+    def test_query(self):
+        """Filters, ordering, limit and offset are compiled to SQL"""
+        city = self.city()
+        places = [self.place(city, price_per_night=p) for p in (30, 10, 20)]
+        query = Query("place").where(city_id=city.id)
+
+        cheap = query.where(price_per_night__lte=20).order_by(
+            "price_per_night"
+        )
+        self.assertEqual(
+            [p.id for p in self.repo.query(cheap)],
+            [places[1].id, places[2].id],
+        )
+        self.assertEqual(
+            [p.id for p in self.repo.query(cheap.offset(1).limit(5))],
+            [places[2].id],
+        )
+
+        newest = query.order_by("-created_at", "-id")
+        first = self.repo.query(newest.limit(1))[0]
+        after = self.repo.query(newest.after(first.created_at, first.id))
+        self.assertEqual(
+            [p.id for p in [first] + after], [p.id for p in places[::-1]]
+        )
+
+    def test_query_with_many_ids(self):
+        """Long `in` lists are passed as one JSON parameter"""
+        users = [self.user() for _ in range(3)]
+        ids = [u.id for u in users] + [
+            f"missing-{i}" for i in range(MAX_IN_PARAMS)
+        ]
+
+        found = self.repo.query(Query("user").where(id__in=ids))
+
+        self.assertCountEqual([u.id for u in found], [u.id for u in users])
+
+    def test_version_counts_the_changes(self):
+        """Writes bump the version of their model in the same transaction"""
+        self.assertEqual(self.repo.version("user"), ("0", None))
+
+        user = self.user()
+        version = self.repo.version("user")
+        self.assertEqual(version[0], "1")
+
+        self.repo.delete(user)
+        self.repo.delete(user)
+        self.assertEqual(self.repo.version("user")[0], "2")
+
+    def test_connection_per_thread(self):
+        """Every thread reads with its own connection"""
+        user = self.user()
+        found = []
+
+        thread = threading.Thread(
+            target=lambda: found.append(self.repo.get("user", user.id))
+        )
+        thread.start()
+        thread.join()
+
+        self.assertEqual(found[0].id, user.id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Tests of the streamed collection responses
+"""
+
+import json
+import unittest
+from unittest import mock
+from tests.base import AppTestCase
+
+
+class TestStreaming(AppTestCase):
+    """Whole collections streamed as a JSON array or as NDJSON"""
+
+    def setUp(self):
+        """Saves more users than a streamed batch holds"""
+        super().setUp()
+        self.users = [self.user() for _ in range(7)]
+        batch_size = mock.patch(
+            "src.controllers.listing.STREAM_BATCH_SIZE", 3
+        )
+        batch_size.start()
+        self.addCleanup(batch_size.stop)
+
+    def ids(self) -> list:
+        """Returns the ids of the saved users, in creation order"""
+        return [user.id for user in self.users]
+
+    def test_json_array(self):
+        """?stream=true returns every object in one JSON array"""
+        response = self.client.get("/users?stream=true")
+
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(
+            [user["id"] for user in json.loads(response.data)], self.ids()
+        )
+
+    def test_ndjson(self):
+        """Accepting NDJSON returns one object per line"""
+        response = self.client.get(
+            "/users", headers={"Accept": "application/x-ndjson"}
+        )
+        lines = response.data.decode().splitlines()
+
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        self.assertEqual(
+            [json.loads(line)["id"] for line in lines], self.ids()
+        )
+
+    def test_stream_after_a_cursor(self):
+        """A stream can start after the cursor of a page"""
+        page = self.client.get("/users?limit=2")
+        after = page.headers["Link"].split("after=")[1].split(">")[0]
+
+        response = self.client.get(f"/users?stream=true&after={after}")
+
+        self.assertEqual(
+            [user["id"] for user in response.json], self.ids()[2:]
+        )
+
+    def test_empty_stream(self):
+        """An empty collection is an empty array"""
+        response = self.client.get("/places?stream=true")
+
+        self.assertEqual(response.json, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
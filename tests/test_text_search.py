@@ -0,0 +1,237 @@
+"""
+Tests of the full-text index of the places and reviews and of /search
+"""
+
+import atexit
+import threading
+import unittest
+from unittest import mock
+from src.indexes import derived_index, text
+from src.indexes.text import TextIndex, tokenize
+from src.persistence.file import FileRepository
+from tests.base import AppTestCase, TemporaryDirectoryTestCase
+
+
+class TestTextIndex(AppTestCase):
+    """BM25 ranking of the places and reviews"""
+
+    def setUp(self):
+        """Saves places and reviews about beaches"""
+        super().setUp()
+        self.beach = self.place(
+            name="Beach house", description="Steps from the beach"
+        )
+        self.cafe = self.place(name="Café", description="Above a bakery")
+        self.review_ = self.review(
+            self.cafe, 4, "Far from the beach, near the old town"
+        )
+
+    def ids(self, found) -> list:
+        """Returns the (model, id) of search results"""
+        return [(model, obj_id) for _, model, obj_id in found]
+
+    def test_best_match_first(self):
+        """More occurrences in a shorter text rank higher"""
+        total, found = derived_index(TextIndex).search("beach")
+
+        self.assertEqual(total, 2)
+        self.assertEqual(
+            self.ids(found),
+            [("place", self.beach.id), ("review", self.review_.id)],
+        )
+        self.assertGreater(found[0][0], found[1][0])
+
+    def test_words_without_case_or_accents(self):
+        """Queries and texts are compared as lowercase unaccented words"""
+        self.assertEqual(tokenize("Café, BAKERY!"), ["cafe", "bakery"])
+        self.assertEqual(
+            self.ids(derived_index(TextIndex).search("CAFE")[1]),
+            [("place", self.cafe.id)],
+        )
+        self.assertEqual(derived_index(TextIndex).search("sauna"), (0, []))
+
+    def test_pages_and_models(self):
+        """Results are paged and can be limited to some models"""
+        index = derived_index(TextIndex)
+
+        self.assertEqual(
+            self.ids(index.search("beach", offset=1, limit=1)[1]),
+            [("review", self.review_.id)],
+        )
+        self.assertEqual(
+            self.ids(index.search("beach", models=("review",))[1]),
+            [("review", self.review_.id)],
+        )
+
+    def test_follows_the_repository(self):
+        """Changed and deleted documents are reindexed"""
+        index = derived_index(TextIndex)
+
+        self.beach.description = "A quiet farm"
+        self.beach.name = "Farm"
+        self.repo.update(self.beach)
+        self.assertEqual(index.search("beach")[0], 1)
+        self.assertEqual(
+            self.ids(index.search("farm")[1]), [("place", self.beach.id)]
+        )
+
+        self.repo.delete(self.review_)
+        self.assertEqual(index.search("beach"), (0, []))
+
+    def test_scores_without_numpy(self):
+        """The pure Python scoring ranks like the NumPy one"""
+        for i in range(20):
+            self.review(self.beach, 3, "beach " * (i % 4) + f"word{i}")
+
+        index = derived_index(TextIndex)
+        with_numpy = index.search("beach old", limit=8)
+
+        with mock.patch.object(text, "np", None):
+            without = index.search("beach old", limit=8)
+
+        self.assertEqual(with_numpy[0], without[0])
+        self.assertEqual(self.ids(with_numpy[1]), self.ids(without[1]))
+        for (first, _, _), (second, _, _) in zip(with_numpy[1], without[1]):
+            self.assertAlmostEqual(first, second)
+
+
+class TestTextIndexSnapshot(TemporaryDirectoryTestCase):
+    """Index saved next to the snapshot of the file repository"""
+
+    def make_repository(self):
+        """Writes data.json on every change"""
+        return FileRepository()
+
+    def index(self, repo) -> TextIndex:
+        """Builds an index that is not saved on exit"""
+        index = TextIndex(repo)
+        atexit.unregister(index._exit)
+        return index
+
+    def test_loaded_when_up_to_date(self):
+        """An index matching the data is loaded, not rebuilt"""
+        self.review(self.place(name="Beach house"), 5, "Lovely beach")
+        saved = self.index(self.repo)
+        saved.save(self.repo.snapshot_path())
+
+        with mock.patch.object(TextIndex, "add") as add:
+            loaded = self.index(FileRepository())
+
+        add.assert_not_called()
+        self.assertEqual(loaded.search("beach"), saved.search("beach"))
+
+    def test_rebuilt_when_the_data_changed(self):
+        """A snapshot of older data is ignored"""
+        place = self.place(name="Beach house")
+        self.index(self.repo).save(self.repo.snapshot_path())
+        self.review(place, 5, "Lovely beach")
+
+        loaded = self.index(FileRepository())
+
+        self.assertEqual(loaded.search("lovely")[0], 1)
+
+    def test_rebuilt_after_a_change_keeping_the_count(self):
+        """Replacing a place by an older one still changes the versions"""
+        old = self.place(name="Barn")
+        newest = self.place(name="Loft")
+        self.index(self.repo).save(self.repo.snapshot_path())
+
+        self.repo.delete(old)
+        self.place(name="Cabin", updated_at=newest.updated_at)
+        loaded = self.index(FileRepository())
+
+        self.assertEqual(loaded.search("barn"), (0, []))
+        self.assertEqual(loaded.search("cabin")[0], 1)
+
+    def test_capture_reads_no_object(self):
+        """Snapshots are taken without scanning the repository"""
+        self.place(name="Beach house")
+        index = self.index(self.repo)
+
+        with mock.patch.object(
+            self.repo, "get_all", side_effect=AssertionError
+        ):
+            state, _ = index._capture()
+
+        self.assertEqual(state["fingerprint"][0], text.FORMAT)
+
+    def test_bursts_share_one_writer(self):
+        """A single daemon thread writes the latest snapshot"""
+        self.place(name="Beach house")
+        index = self.index(self.repo)
+        before = set(threading.enumerate())
+
+        with mock.patch.object(text, "TEXT_INDEX_SAVE_INTERVAL", 0):
+            for i in range(20):
+                self.place(name=f"Loft {i}")
+
+        writers = [
+            thread
+            for thread in threading.enumerate()
+            if thread not in before and thread.name == "text-index-save"
+        ]
+        self.assertEqual(writers, [index.writer])
+        self.assertTrue(index.writer.daemon)
+
+        # The latest snapshot is written now if the writer hasn't yet
+        index._exit()
+        with index.write_lock:
+            self.assertEqual(index.written, index.captured)
+
+        with mock.patch.object(TextIndex, "add") as add:
+            loaded = self.index(FileRepository())
+
+        add.assert_not_called()
+        self.assertEqual(loaded.search("loft")[0], 20)
+
+
+class TestSearchEndpoint(AppTestCase):
+    """GET /search"""
+
+    def setUp(self):
+        """Saves a place and a review about beaches"""
+        super().setUp()
+        self.beach = self.place(name="Beach house")
+        self.review_ = self.review(self.beach, 5, "Great beach")
+
+    def test_search(self):
+        """Every result has its type, score and object"""
+        response = self.client.get("/search?q=beach&limit=1")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Total-Count"], "2")
+        self.assertIn("Link", response.headers)
+        (result,) = response.json
+        self.assertEqual(set(result), {"type", "score", "object"})
+        self.assertIn(result["type"], ("place", "review"))
+
+    def test_type(self):
+        """?type= searches a single model"""
+        response = self.client.get("/search?q=beach&type=review")
+
+        self.assertEqual(
+            [(r["type"], r["object"]["id"]) for r in response.json],
+            [("review", self.review_.id)],
+        )
+
+    def test_etag_follows_the_reviews(self):
+        """A new review gives the results a new ETag"""
+        etag = self.client.get("/search?q=beach").headers["ETag"]
+        self.review(self.beach, 4, "Beach nearby")
+
+        response = self.client.get(
+            "/search?q=beach", headers={"If-None-Match": etag}
+        )
+
+        self.assertEqual(len(response.json), 3)
+
+    def test_invalid_arguments(self):
+        """Missing queries and unknown types are refused"""
+        for args in ("", "q=%20", "q=beach&type=city"):
+            with self.subTest(args=args):
+                response = self.client.get(f"/search?{args}")
+                self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+Tests of the unique index of the emails, of sign-up and of /login
+"""
+
+import unittest
+from flask_jwt_extended import decode_token
+from src.models.user import User
+from src.persistence.repository import DuplicateError
+from src.persistence.sqlite import SQLiteRepository
+from tests.base import AppTestCase, TemporaryDirectoryTestCase, created_at
+
+
+class TestUniqueEmails(TemporaryDirectoryTestCase):
+    """Writes breaking the unique index of the emails"""
+
+    def new_user(self, email: str) -> User:
+        """Returns a user that isn't saved yet"""
+        return User(
+            email=email,
+            first_name="Ada",
+            last_name="Lovelace",
+            password_hash="!",
+            created_at=created_at(),
+        )
+
+    def emails(self) -> list[str]:
+        """Returns the stored emails"""
+        return sorted(user.email for user in self.repo.get_all("user"))
+
+    def test_duplicate_save(self):
+        """A second user with a taken email is refused"""
+        self.user("ada@example.com")
+
+        with self.assertRaises(DuplicateError) as raised:
+            self.repo.save(self.new_user("ada@example.com"))
+
+        self.assertEqual(raised.exception.fields, ("email",))
+        self.assertEqual(self.emails(), ["ada@example.com"])
+
+    def test_batch_is_stored_whole_or_not_at_all(self):
+        """Duplicates in a batch, or with stored users, store nothing"""
+        self.user("ada@example.com")
+
+        for emails in (
+            ["new@example.com", "new@example.com"],
+            ["new@example.com", "ada@example.com"],
+        ):
+            with self.subTest(emails=emails):
+                with self.assertRaises(DuplicateError):
+                    self.repo.save_many([self.new_user(e) for e in emails])
+
+                self.assertEqual(self.emails(), ["ada@example.com"])
+
+    def test_update_to_a_taken_email(self):
+        """Taking the email of another user leaves both unchanged"""
+        ada = self.user("ada@example.com")
+        grace = self.user("grace@example.com")
+
+        # A new version of the user, the memory backends store the object
+        taking = self.new_user("ada@example.com")
+        taking.id = grace.id
+        with self.assertRaises(DuplicateError):
+            self.repo.update(taking)
+
+        self.assertEqual(
+            self.emails(), ["ada@example.com", "grace@example.com"]
+        )
+        ada.first_name = "Augusta"
+        self.repo.update(ada)
+        self.assertEqual(self.repo.get("user", ada.id).first_name, "Augusta")
+
+
+class TestSQLiteUniqueEmails(TestUniqueEmails):
+    """Same tests through the UNIQUE index of SQLite"""
+
+    def make_repository(self):
+        """Opens a new database in the temporary directory"""
+        return SQLiteRepository("test.db")
+
+
+class TestSignUpAndLogin(AppTestCase):
+    """POST /users, User.update and POST /login"""
+
+    def sign_up(self, email: str, password: str = "secret"):
+        """Posts a new user"""
+        return self.client.post(
+            "/users",
+            json={
+                "email": email,
+                "first_name": "Ada",
+                "last_name": "Lovelace",
+                "password": password,
+            },
+        )
+
+    def test_emails_are_normalized(self):
+        """Emails are stored trimmed and lowercase, and compared so"""
+        response = self.sign_up("  Ada@Example.COM ")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json["email"], "ada@example.com")
+        self.assertEqual(
+            User.get_by_email("ADA@example.com").id, response.json["id"]
+        )
+        self.assertEqual(self.sign_up("ada@EXAMPLE.com").status_code, 400)
+        self.assertEqual(len(self.repo.get_all("user")), 1)
+
+    def test_update_to_a_taken_email(self):
+        """A user can't take the email of another one"""
+        self.user("ada@example.com")
+        grace = self.user("grace@example.com")
+
+        with self.assertRaises(ValueError):
+            User.update(grace.id, {"email": " ADA@example.com"})
+
+        self.assertEqual(
+            self.repo.get("user", grace.id).email, "grace@example.com"
+        )
+        self.assertEqual(
+            User.update(grace.id, {"email": "Grace@example.com"}).email,
+            "grace@example.com",
+        )
+
+    def test_login(self):
+        """Right credentials get a token, wrong ones a 401"""
+        self.sign_up("ada@example.com", "secret")
+
+        response = self.client.post(
+            "/login", json={"email": "Ada@Example.com", "password": "secret"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        with self.app.app_context():
+            claims = decode_token(response.json["access_token"])
+        self.assertEqual(
+            (claims["sub"], claims["is_admin"]), ("ada@example.com", False)
+        )
+
+        for credentials in (
+            {"email": "ada@example.com", "password": "wrong"},
+            {"email": "grace@example.com", "password": "secret"},
+            {"email": "ada@example.com"},
+            {},
+        ):
+            with self.subTest(credentials=credentials):
+                response = self.client.post("/login", json=credentials)
+                self.assertEqual(response.status_code, 401)
+
+    def test_users_without_a_password_cant_log_in(self):
+        """A stored hash no password matches is refused"""
+        self.user("ada@example.com")
+
+        response = self.client.post(
+            "/login", json={"email": "ada@example.com", "password": "!"}
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,3 +3,28 @@
 REPOSITORY_ENV_VAR = "db"
 FILE_STORAGE_FILENAME = "data.json"
 PICKLE_STORAGE_FILENAME = "data.pkl"
+SQLITE_STORAGE_FILENAME = "data.db"
+FILE_JOURNAL_FILENAME = "data.journal"
+FILE_JOURNAL_COMPACT_THRESHOLD = 10000
+FLUSH_INTERVAL = 1.0
+FLUSH_DIRTY_THRESHOLD = 1000
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+CACHE_MAX_ENTRIES = 10000
+CACHE_TTL = 0
+ENCODED_CACHE_MAX_BYTES = 64 * 1024 * 1024
+GEO_CELL_DEGREES = 0.1
+GEO_MAX_RADIUS_KM = 20038
+CLUSTER_MAX_ZOOM = 14
+CLUSTER_ZOOM_OFFSET = 3
+MAX_MAP_ZOOM = 22
+RANKING_PRIOR_MEAN = 3.0
+RANKING_PRIOR_WEIGHT = 5
+TOP_PLACES_DEFAULT = 10
+TEXT_INDEX_SAVE_INTERVAL = 60
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+AUTOCOMPLETE_SCAN_LIMIT = 200
+AUTOCOMPLETE_CACHE_SIZE = 4096
+COUNTRIES_MAX_AGE = 24 * 60 * 60
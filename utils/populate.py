@@ -4,14 +4,9 @@ from src.persistence.repository import Repository
 
 
 def populate_db(repo: Repository) -> None:
-    """Populates the db with a dummy country"""
-    from src.models.country import Country
+    """Populates the db with the countries of ISO 3166"""
+    from src.models.country import COUNTRIES
 
-    countries = [
-        Country(name="Uruguay", code="UY"),
-    ]
-
-    for country in countries:
-        repo.save(country)
+    repo.save_many(list(COUNTRIES.values()))
 
     print("Memory DB populated")